@@ -1,5 +1,7 @@
 import streamlit as st
 from PIL import Image
+from utils.download_queue import get_download_queue
+from utils.tokenizer_pool import prewarm_tokenizers
 
 def get_server_ip():
     host = st.context.headers.get("host", None)
@@ -19,6 +21,12 @@ def main():
     st.title("RoboTF LLM Tools for LocalAI usage!")
     st.logo("images/robotf-small.png", size="large", icon_image="images/robotf-small.png")
 
+    # serve.py already started both at boot; under plain `streamlit run` the first visit does.
+    # Resume HuggingFace downloads that were queued before the last restart
+    get_download_queue()
+    # Load the configured tokenizers (TOKENIZER_PREWARM) before anyone asks for them
+    prewarm_tokenizers()
+
     try:
         image = Image.open("images/robotf-tools.jpg")
         st.image(image, width=300, caption="RoboTF LLM Tools")
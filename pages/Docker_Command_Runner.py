@@ -1,5 +1,32 @@
+import shlex
+import time
 import streamlit as st
-import subprocess
+from utils.command_jobs import get_job_manager
+from utils.docker_client import get_client
+
+JOB_STATUS_ICONS = {"running": "🟡", "done": "🟢", "failed": "🔴", "cancelled": "⚪", "timeout": "🟠", "pending": "⚪"}
+
+# Function to start a docker command as a background job and show it
+def start_docker_job(docker_command, timeout=None):
+    try:
+        job = get_job_manager().submit(["docker"] + shlex.split(docker_command), timeout=timeout)
+        st.session_state.active_job = job.id
+    except Exception as e:
+        st.error(f"Error running Docker command: {e}")
+
+# Live view of the selected job; the fragment polls the in-memory buffer so the script never waits on the process
+@st.fragment(run_every=1)
+def show_job_output():
+    job_id = st.session_state.get('active_job')
+    job = get_job_manager().get(job_id) if job_id else None
+    if not job:
+        return
+    st.subheader(f"{JOB_STATUS_ICONS.get(job.status, '')} Job #{job.id}: {job.command}")
+    st.caption(f"Status: {job.status} | Return code: {job.returncode} | "
+               f"{job.duration:.1f}s | {job.total_lines} lines")
+    st.text_area("Job Output", value="\n".join(job.tail()) or "No output yet", height=300)
+    if job.running and st.button("Cancel", key=f"cancel_{job.id}"):
+        job.cancel()
 
 def main():
     st.set_page_config(layout="wide")
@@ -18,78 +45,50 @@ def main():
         "ps"
     )
 
-    if st.button("Run Command"):
-        try:
-            result = subprocess.run(
-                ["docker"] + docker_command.split(),
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            st.subheader("Standard Output")
-            st.text_area("Output", value=result.stdout or "No output", height=200)
+    timeout = st.number_input("Timeout in seconds (0 = none)", min_value=0, value=0, step=30)
 
-            if result.stderr:
-                st.subheader("Standard Error")
-                st.text_area("Error", value=result.stderr, height=200)
-        except Exception as e:
-            st.error(f"Error running Docker command: {e}")
+    if st.button("Run Command"):
+        start_docker_job(docker_command, timeout=timeout or None)
 
     if st.button("Restart LocalAI"):
         try:
-            docker_command = "restart localai"
-            result = subprocess.run(
-                ["docker"] + docker_command.split(),
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            st.subheader("Standard Output")
-            st.text_area("Output", value=result.stdout or "No output", height=200)
-
-            if result.stderr:
-                st.subheader("Standard Error")
-                st.text_area("Error", value=result.stderr, height=200)
+            get_client().restart_container("localai")
+            st.success("Container localai restarted successfully")
         except Exception as e:
-            st.error(f"Error running Docker command: {e}")
-            
+            st.error(f"Error restarting LocalAI: {e}")
+
     if st.button("LocalAI Logs"):
         try:
-            # Split the input into arguments and run the docker command
-            docker_command = "logs localai"
-            result = subprocess.run(
-                ["docker"] + docker_command.split(),
-                capture_output=True,
-                text=True,
-                check=False  # Don't raise exception on non-zero exit
-            )
+            logs = get_client().container_logs("localai", tail="all")
             st.subheader("Standard Output")
-            st.text_area("Output", value=result.stdout or "No output", height=200)
-
-            if result.stderr:
-                st.subheader("Standard Error")
-                st.text_area("Error", value=result.stderr, height=200)
+            st.text_area("Output", value=logs or "No output", height=200)
         except Exception as e:
-            st.error(f"Error running Docker command: {e}")
+            st.error(f"Error getting LocalAI logs: {e}")
             
     if st.button("LocalAI Nvidia-SMI"):
-        try:
-            # Split the input into arguments and run the docker command
-            docker_command = "exec -i localai nvidia-smi"
-            result = subprocess.run(
-                ["docker"] + docker_command.split(),
-                capture_output=True,
-                text=True,
-                check=False  # Don't raise exception on non-zero exit
-            )
-            st.subheader("Standard Output")
-            st.text_area("Output", value=result.stdout or "No output", height=200)
+        start_docker_job("exec -i localai nvidia-smi", timeout=60)
 
-            if result.stderr:
-                st.subheader("Standard Error")
-                st.text_area("Error", value=result.stderr, height=200)
-        except Exception as e:
-            st.error(f"Error running Docker command: {e}")
+    show_job_output()
+
+    jobs = get_job_manager().jobs()
+    if jobs:
+        st.subheader("Job History")
+        st.table([
+            {
+                "Job": job.id,
+                "Status": f"{JOB_STATUS_ICONS.get(job.status, '')} {job.status}",
+                "Command": job.command,
+                "Started": time.strftime("%H:%M:%S", time.localtime(job.started_at)) if job.started_at else "",
+                "Seconds": round(job.duration, 1),
+                "Return Code": job.returncode,
+            }
+            for job in jobs
+        ])
+        selected_job = st.selectbox("Show output of job", [job.id for job in jobs],
+                                    format_func=lambda job_id: f"#{job_id}")
+        if st.button("Show Job Output"):
+            st.session_state.active_job = selected_job
+            st.rerun()
 
     st.divider()
 
@@ -1,84 +1,104 @@
+import uuid
 import streamlit as st
-import json
 from streamlit_autorefresh import st_autorefresh
-import subprocess
-import time
-from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
+from utils.docker_client import get_client
+from utils.container_metrics import over_threshold, top_containers
+from utils.formatting import human_size
+from utils.container_inventory import get_inventory
+from utils.docker_events import get_event_subscriber
+from utils.bulk_actions import ACTIONS, BULK_ACTION_ORDER, BULK_ACTION_WORKERS, iter_bulk_action
+from utils.stats_collector import get_stats_collector
+from utils.log_stream import get_log_buffer
 
 def get_container_info():
     try:
-        # Get running containers with JSON format
-        running_containers_output = subprocess.run(
-            ["docker", "ps", "--format", "{{json .}}"],
-            capture_output=True,
-            text=True
-        ).stdout
-        
-        # Split the output into lines and parse each as JSON
-        running_containers = []
-        for line in running_containers_output.split('\n'):
-            line = line.strip()
-            if line:
-                try:
-                    container = json.loads(line)
-                    running_containers.append(container)
-                except json.JSONDecodeError:
-                    continue
-        
-        # Get all containers (running and stopped)
-        all_containers_output = subprocess.run(
-            ["docker", "ps", "-a", "--format", "{{json .}}"],
-            capture_output=True,
-            text=True
-        ).stdout
-        
-        # Split the output into lines and parse each as JSON
-        all_containers = []
-        for line in all_containers_output.split('\n'):
-            line = line.strip()
-            if line:
-                try:
-                    container = json.loads(line)
-                    all_containers.append(container)
-                except json.JSONDecodeError:
-                    continue
-        
-        return running_containers, all_containers
+        snapshot = get_inventory().get()
+        st.session_state.inventory_version = snapshot.version
+        return snapshot.running, snapshot.stopped
     except Exception as e:
         st.error(f"Error getting container information: {e}")
         return None, None
 
-# Function to get container metrics
+# Cheap fragment that reruns the whole page only when the events stream changed the inventory
+@st.fragment(run_every=2)
+def watch_for_changes():
+    seen_version = st.session_state.get('inventory_version')
+    if seen_version is not None and get_inventory().version != seen_version:
+        st.rerun()
+
+# Function to get container metrics from the background stats collector
 def get_container_metrics(container_id):
     try:
-        # Get detailed metrics using docker stats
-        metrics = subprocess.run(
-            ["docker", "stats", container_id, "--no-stream"],
-            capture_output=True,
-            text=True
-        ).stdout.split('\n')
-        
-        if metrics:
-            return metrics[1].strip().split()
-        return None
+        return get_stats_collector().latest(container_id)
     except Exception as e:
         st.error(f"Error getting container metrics: {e}")
         return None
 
-# Function to get container logs
-def get_container_logs(container_id, tail_lines=100):
+# Function to get the recent CPU/memory history of a container
+def get_container_history(container_id):
+    series = get_stats_collector().series(container_id)
+    if not series or len(series) < 2:
+        return None
+    return {
+        "CPU %": series.history("cpu_percent"),
+        "Mem MiB": [value / (1024 * 1024) for value in series.history("mem_usage")],
+    }
+
+# Function to get container logs, only fetching lines newer than the last call
+def get_container_logs(container_id, tail_lines=100, pattern=None):
     try:
-        logs = subprocess.run(
-            ["docker", "logs", container_id, "--tail", str(tail_lines)],
-            capture_output=True,
-            text=True
-        ).stdout
-        return logs
+        log_buffer = get_log_buffer(container_id)
+        if not log_buffer.following:
+            log_buffer.fetch(initial_tail=tail_lines)
+        return "\n".join(log_buffer.view(pattern))
     except Exception as e:
         st.error(f"Error getting logs for {container_id}: {e}")
         return None
 
+# Sidebar log viewer for the container picked with a "View Logs" button
+def show_logs_sidebar():
+    container_name = st.session_state.get('log_container')
+    if not container_name:
+        return
+    with st.sidebar:
+        st.subheader(f"Logs: {container_name}")
+        log_buffer = get_log_buffer(container_name)
+        # Buffers are shared by all sessions; follow and stop only count for this one
+        viewer = st.session_state.setdefault('log_viewer', uuid.uuid4().hex)
+        follow = st.checkbox("Follow", value=log_buffer.is_following(viewer), key="log_follow",
+                             help="Stream new lines in the background between refreshes")
+        if follow:
+            log_buffer.follow(viewer)
+        else:
+            log_buffer.stop(viewer)
+        pattern = st.text_input("Filter (text or regex)", key="log_filter")
+        logs = get_container_logs(container_name, pattern=pattern or None)
+        st.text_area("Logs", value=logs or "No logs available", height=400)
+        col_refresh, col_close = st.columns(2)
+        with col_refresh:
+            if st.button("Refresh Logs"):
+                st.rerun()
+        with col_close:
+            if st.button("Close Logs"):
+                log_buffer.stop(viewer)
+                st.session_state.log_container = None
+                st.rerun()
+
+# Function to get inspect details for a stopped container, cached since they no longer change.
+# Errors are raised rather than returned so st.cache_data does not keep a failed lookup.
+@st.cache_data(ttl=300, show_spinner=False)
+def get_stopped_container_details(container_id):
+    client = get_client()
+    info = client.inspect_container(container_id)
+    state = info.get('State', {})
+    image = client.inspect_image(info.get('Image', ''))
+    return {
+        'exit_code': state.get('ExitCode'),
+        'finished_at': state.get('FinishedAt'),
+        'image_size': human_size(image.get('Size', 0)),
+    }
+
 def get_container_status(container):
     status = container.get('Status', 'Unknown')
     if 'Up' in status:
@@ -90,38 +110,62 @@ def get_container_status(container):
 # Function to handle container actions
 def handle_container_action(container_name, action):
     try:
+        client = get_client()
         if action == "stop":
-            subprocess.run(
-                ["docker", "stop", container_name],
-                check=True
-            )
+            client.stop_container(container_name)
             st.success(f"Container {container_name} stopped successfully")
         elif action == "start":
-            subprocess.run(
-                ["docker", "start", container_name],
-                check=True
-            )
+            client.start_container(container_name)
             st.success(f"Container {container_name} started successfully")
         elif action == "restart":
-            subprocess.run(
-                ["docker", "restart", container_name],
-                check=True
-            )
+            client.restart_container(container_name)
             st.success(f"Container {container_name} restarted successfully")
+        get_inventory().invalidate()
     except Exception as e:
         st.error(f"Error performing action on {container_name}: {e}")
 
 # Function to delete a container
 def delete_container(container_name):
     try:
-        subprocess.run(
-            ["docker", "rm", container_name],
-            check=True
-        )
+        get_client().remove_container(container_name)
+        get_inventory().invalidate()
         st.success(f"Container {container_name} deleted successfully")
     except Exception as e:
         st.error(f"Error deleting container {container_name}: {e}")
 
+# Bulk start/stop/restart/remove with per-container progress
+def show_bulk_actions(containers):
+    with st.expander("Bulk Actions", expanded=False):
+        names = [container.get('Names') for container in containers if container.get('Names')]
+        selected = st.multiselect("Containers", names, key="bulk_containers")
+        col_action, col_workers = st.columns(2)
+        with col_action:
+            action = st.selectbox("Action", ACTIONS, key="bulk_action")
+        with col_workers:
+            workers = st.slider("Parallel actions", min_value=1, max_value=16, value=BULK_ACTION_WORKERS)
+        order = st.text_input(
+            "Dependency order (optional)", value=BULK_ACTION_ORDER,
+            help="Tiers separated by ';', containers in a tier by ',' e.g. 'postgres,chromadb;localai;open-webui'. "
+                 "Start/restart follow the order, stop/remove run it in reverse."
+        )
+        if st.button(f"Run {action} on {len(selected)} containers", disabled=not selected):
+            progress = st.progress(0.0)
+            rows = []
+            table = st.empty()
+            for done, result in enumerate(iter_bulk_action(selected, action, order, workers), start=1):
+                rows.append({
+                    "Container": result.container,
+                    "Result": "✅ ok" if result.ok else f"❌ {result.error}",
+                    "Seconds": round(result.seconds, 1),
+                })
+                progress.progress(done / len(selected), text=f"{done}/{len(selected)} {result.container}")
+                table.table(rows)
+            failed = sum(1 for row in rows if not row["Result"].startswith("✅"))
+            if failed:
+                st.error(f"{failed} of {len(rows)} containers failed to {action}")
+            else:
+                st.success(f"{action.capitalize()} completed for {len(rows)} containers")
+
 # Main page
 def main():
     st.set_page_config(layout="wide")
@@ -144,118 +188,152 @@ def main():
         st.header("Settings")
         auto_refresh_enabled = st.slider("Auto-refresh", min_value=0, max_value=1, value=1, 
                                          help="0 = Off, 1 = On")
+        refresh_mode = st.radio("Refresh Mode", ["Docker events", "Interval"],
+                                help="Docker events reruns the page only when a container changes state")
         refresh_interval = st.select_slider("Refresh Interval (seconds)", 
                                            options=[30, 60, 120, 300], 
-                                           value=60)
+                                           value=60,
+                                           disabled=refresh_mode != "Interval")
+        st.header("Alerts")
+        cpu_alert = st.number_input("CPU % alert threshold", min_value=0, max_value=1000, value=90)
+        mem_alert = st.number_input("Memory % alert threshold", min_value=0, max_value=100, value=90)
 
     # Container status dashboard
     st.header("Container Status Dashboard")
     
     # Get container information
-    running_containers, all_containers = get_container_info()
+    running_containers, stopped_containers = get_container_info()
+
+    if running_containers:
+        metrics_by_name = {
+            container.get('Names', container.get('ID')): get_container_metrics(container.get('ID'))
+            for container in running_containers
+        }
+        for name, reason in over_threshold(metrics_by_name, cpu_percent=cpu_alert, mem_percent=mem_alert):
+            st.warning(f"⚠️ {name}: {reason}")
+
+        col_top_mem, col_top_cpu = st.columns(2)
+        with col_top_mem:
+            st.subheader("Top 5 by Memory")
+            st.table([
+                {"Container": name, "Memory": human_size(m.mem_usage, binary=True), "Mem %": f"{m.mem_percent:.1f}%"}
+                for name, m in top_containers(metrics_by_name, "mem_usage")
+            ])
+        with col_top_cpu:
+            st.subheader("Top 5 by CPU")
+            st.table([
+                {"Container": name, "CPU %": m.cpu_display}
+                for name, m in top_containers(metrics_by_name, "cpu_percent")
+            ])
     
+    show_bulk_actions((running_containers or []) + (stopped_containers or []))
+
     # Create columns for running and stopped containers
     col_running, col_stopped = st.columns(2)
     
     with col_running:
         st.subheader("Running Containers")
         if running_containers:
-            container_ids = [container.get('ID') for container in running_containers]
-            
-            # Use ThreadPoolExecutor to gather metrics in parallel
-            with ThreadPoolExecutor() as executor:
-                # Submit tasks to gather metrics for all containers
-                futures = {executor.submit(get_container_metrics, cid): container 
-                        for container, cid in zip(running_containers, container_ids)}
-                
-                for future in futures:
-                    container = futures[future]
+            for container in running_containers:
+                try:
+                    metrics = get_container_metrics(container.get('ID'))
+                    status = get_container_status(container)
+                    with st.expander(f"[{status}] {container.get('Names', 'Unnamed Container')}", expanded=False):
+                        st.write(f"📸 Image: {container.get('Image', 'Unknown')}")
+                        st.write(f"🔄 Status: {container.get('Status', 'Unknown')}")
+                        st.write(f"📋 Ports: {container.get('Ports', 'None')}")
+                        
+                        if metrics:
+                            st.subheader("Metrics")
+                            st.write(f"CPU %: {metrics.cpu_display}")
+                            st.write(f"Mem Usage: {metrics.memory_display}")
+                            st.write(f"Net I/O: {metrics.net_io_display}")
+                            st.write(f"Block I/O: {metrics.block_io_display}")
+                            history = get_container_history(container.get('ID'))
+                            if history:
+                                st.line_chart(history, height=150)
+                        else:
+                            st.write("Collecting metrics...")
+                        
+                        # Action buttons
+                        col_btn1, col_btn2, col_btn3 = st.columns(3)
+                        with col_btn1:
+                            if st.button(f"Stop {container.get('Names', 'Unnamed Container')}", on_click=None):
+                                handle_container_action(container.get('Names'), "stop")
+                        with col_btn2:
+                            if st.button(f"Restart {container.get('Names', 'Unnamed Container')}", on_click=None):
+                                handle_container_action(container.get('Names'), "restart")
+                        with col_btn3:
+                            if st.button(f"View Logs {container.get('Names', 'Unnamed Container')}", on_click=None):
+                                st.session_state.log_container = container.get('Names')
+                except Exception as e:
+                    st.error(f"Error processing container {container.get('Names', 'Unnamed Container')}: {e}")
+        else:
+            st.write("No running containers found.")
+    
+    with col_stopped:
+        st.subheader("Stopped Containers")
+        if stopped_containers is not None:
+            if stopped_containers:
+                page_size = st.selectbox("Containers per page", [10, 25, 50], key="stopped_page_size")
+                total_pages = (len(stopped_containers) + page_size - 1) // page_size
+                page = st.number_input("Page", min_value=1, max_value=max(1, total_pages), value=1,
+                                       key="stopped_page")
+                st.caption(f"{len(stopped_containers)} stopped containers, page {page} of {total_pages}")
+                page_containers = stopped_containers[(page - 1) * page_size:page * page_size]
+
+                for container in page_containers:
                     try:
-                        metrics = future.result()
                         status = get_container_status(container)
                         with st.expander(f"[{status}] {container.get('Names', 'Unnamed Container')}", expanded=False):
                             st.write(f"📸 Image: {container.get('Image', 'Unknown')}")
                             st.write(f"🔄 Status: {container.get('Status', 'Unknown')}")
                             st.write(f"📋 Ports: {container.get('Ports', 'None')}")
-                            
-                            if metrics and len(metrics) >= 8:
-                                st.subheader("Metrics")
-                                st.write(f"CPU %: {metrics[2]}")
-                                st.write(f"Mem Usage: {metrics[3]}")
-                                st.write(f"Net I/O: {metrics[5]}")
-                                st.write(f"Block I/O: {metrics[7]}")
+
+                            # Inspect data is only fetched once the user asks for it
+                            if st.toggle("Show details", key=f"details_{container.get('ID')}"):
+                                try:
+                                    details = get_stopped_container_details(container.get('ID'))
+                                except Exception as e:
+                                    st.error(f"Error getting details for {container.get('ID')}: {e}")
+                                    details = None
+                                if details:
+                                    st.write(f"🔚 Exit Code: {details['exit_code']}")
+                                    st.write(f"🕒 Finished At: {details['finished_at']}")
+                                    st.write(f"💾 Image Size: {details['image_size']}")
                             
                             # Action buttons
-                            col_btn1, col_btn2, col_btn3 = st.columns(3)
-                            with col_btn1:
-                                if st.button(f"Stop {container.get('Names', 'Unnamed Container')}", on_click=None):
-                                    handle_container_action(container.get('Names'), "stop")
-                            with col_btn2:
-                                if st.button(f"Restart {container.get('Names', 'Unnamed Container')}", on_click=None):
-                                    handle_container_action(container.get('Names'), "restart")
-                            with col_btn3:
+                            col_btn = st.columns(3)
+                            with col_btn[0]:
+                                if st.button(f"Start {container.get('Names', 'Unnamed Container')}", on_click=None):
+                                    handle_container_action(container.get('Names'), "start")
+                            with col_btn[1]:
                                 if st.button(f"View Logs {container.get('Names', 'Unnamed Container')}", on_click=None):
-                                    logs = get_container_logs(container.get('Names'))
-                                    with st.sidebar:
-                                        st.subheader("Logs")
-                                        st.text_area("Logs", value=logs or "No logs available", height=400)
+                                    st.session_state.log_container = container.get('Names')
+                            with col_btn[2]:
+                                if st.button(f"Delete {container.get('Names', 'Unnamed Container')}", on_click=None):
+                                    delete_container(container.get('Names'))
                     except Exception as e:
                         st.error(f"Error processing container {container.get('Names', 'Unnamed Container')}: {e}")
-        else:
-            st.write("No running containers found.")
-    
-    with col_stopped:
-        st.subheader("Stopped Containers")
-        if all_containers:
-            stopped_containers = [container for container in all_containers 
-                                if container.get('Status', '').startswith("Exited")]
-            
-            if stopped_containers:
-                container_ids = [container.get('ID') for container in stopped_containers]
-                
-                # Use ThreadPoolExecutor to gather metrics in parallel
-                with ThreadPoolExecutor() as executor:
-                    # Submit tasks to gather metrics for all containers
-                    futures = {executor.submit(get_container_metrics, cid): container 
-                            for container, cid in zip(stopped_containers, container_ids)}
-                    
-                    for future in futures:
-                        container = futures[future]
-                        try:
-                            metrics = future.result()
-                            status = get_container_status(container)
-                            with st.expander(f"[{status}] {container.get('Names', 'Unnamed Container')}", expanded=False):
-                                st.write(f"📸 Image: {container.get('Image', 'Unknown')}")
-                                st.write(f"🔄 Status: {container.get('Status', 'Unknown')}")
-                                st.write(f"📋 Ports: {container.get('Ports', 'None')}")
-                                
-                                # Action buttons
-                                col_btn = st.columns(3)
-                                with col_btn[0]:
-                                    if st.button(f"Start {container.get('Names', 'Unnamed Container')}", on_click=None):
-                                        handle_container_action(container.get('Names'), "start")
-                                with col_btn[1]:
-                                    if st.button(f"View Logs {container.get('Names', 'Unnamed Container')}", on_click=None):
-                                        logs = get_container_logs(container.get('Names'))
-                                        with st.sidebar:
-                                            st.subheader("Logs")
-                                            st.text_area("Logs", value=logs or "No logs available", height=400)
-                                with col_btn[2]:
-                                    if st.button(f"Delete {container.get('Names', 'Unnamed Container')}", on_click=None):
-                                        delete_container(container.get('Names'))
-                        except Exception as e:
-                            st.error(f"Error processing container {container.get('Names', 'Unnamed Container')}: {e}")
             st.write("Note: Containers marked as 'Exited' are stopped.")
         else:
             st.write("No containers found.")
 
+    show_logs_sidebar()
+
     # Refresh button
     if st.button("Refresh Dashboard"):
         st.rerun()
 
     # Auto-refresh configuration
     if auto_refresh_enabled > 0:
-        st_autorefresh(interval=refresh_interval * 1000)
+        if refresh_mode == "Docker events":
+            subscriber = get_event_subscriber()
+            if not subscriber.connected:
+                st.caption("Waiting for the Docker events stream...")
+            watch_for_changes()
+        else:
+            st_autorefresh(interval=refresh_interval * 1000)
 
     st.divider()
 
@@ -1,6 +1,12 @@
 import streamlit as st
 import os
-from huggingface_hub import HfApi, hf_hub_download, snapshot_download
+from utils.download_queue import get_download_queue
+from utils.formatting import human_size
+from utils.hf_download import HF_DOWNLOAD_CHUNK_WORKERS, HF_DOWNLOAD_FILE_WORKERS
+from utils.hub_search import SORT_OPTIONS, get_search_cache
+from utils.integrity import verify_models_dir
+from utils.model_store import MODEL_STORE_MIN_FREE, get_model_store
+from utils.repo_index import get_repo_index_cache
 
 def get_default_output_dir():
     """Get default output directory from MODELS_PATH environment variable"""
@@ -9,58 +15,196 @@ def get_default_output_dir():
         return models_path
     return "./models"
 
-def search_repositories(repo_type, **kwargs):
-    """Search repositories of a given type with filters"""
-    api = HfApi()
-    if repo_type == "model":
-        return list(api.list_models(**kwargs))  # Convert generator to list
-    elif repo_type == "dataset":
-        return list(api.list_datasets(**kwargs))  # Convert generator to list
-    elif repo_type == "space":
-        return list(api.list_spaces(**kwargs))  # Convert generator to list
-    else:
-        raise ValueError("Invalid repository type. Must be 'model', 'dataset', or 'space'.")
+def search_repositories(repo_type, page_size=20, **kwargs):
+    """Start or reuse a lazy, paginated search of repositories of a given type"""
+    return get_search_cache().search(repo_type, kwargs, page_size)
 
-def list_repository_files(repo_id):
-    """List all files and directories in a given repository"""
+def get_repository_index(repo_id, revision=None, refresh=False):
+    """Get the cached file index (sizes, hashes, quant tags) of a repository"""
     try:
-        api = HfApi()
-        files = api.list_repo_files(repo_id)
-        # Convert file objects to their filenames
-        file_paths = [file.filename if isinstance(file, dict) else file for file in files]
-        return file_paths
+        return get_repo_index_cache().get(repo_id, revision or None, refresh=refresh)
     except Exception as e:
         st.error(f"Error listing files: {str(e)}")
-        return []
+        return None
+
+def list_repository_files(repo_id, revision=None):
+    """List all files and directories in a given repository"""
+    index = get_repository_index(repo_id, revision)
+    return index.paths if index else []
+
+def display_file_table(index, files):
+    """Display files with their size, quantization and LFS hash"""
+    st.dataframe(
+        [
+            {
+                "File": remote.path,
+                "Size": human_size(remote.size or 0),
+                "Quant": index.quants.get(remote.path) or "",
+                "SHA256": (remote.sha256 or "")[:16],
+            }
+            for remote in files
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+def display_download_plan(files, target_dir):
+    """Show how much of a download is new, already on disk or shared from the model store"""
+    plan = get_model_store().plan(files, target_dir)
+    st.write(
+        f"📦 {human_size(plan.needed_bytes)} to download, {human_size(plan.linked_bytes)} shared from the "
+        f"model store, {human_size(plan.present_bytes)} already present — {human_size(plan.free_bytes)} free"
+    )
+    if not plan.fits:
+        st.error(f"Not enough disk space: keep at least {human_size(MODEL_STORE_MIN_FREE)} free after downloading.")
+    return plan
 
-def download_repository(repo_id, output_dir):
-    """Download entire repository"""
+def display_model_store(models_dir):
+    """Model store usage, duplicate detection and cleanup"""
+    store = get_model_store()
+    st.header("Local Model Store")
+    count, stored = store.usage()
+    st.write(f"🗄️ {count} blobs, {human_size(stored)} stored in {store.root}, "
+             f"{human_size(store.free_space(models_dir))} free")
+    col_scan, col_dedupe, col_prune = st.columns(3)
+    with col_scan:
+        if st.button("Find Duplicate Files"):
+            with st.spinner("Hashing candidate files..."):
+                st.session_state.duplicate_groups = store.find_duplicates(models_dir)
+    groups = st.session_state.get("duplicate_groups")
+    with col_dedupe:
+        if st.button("Deduplicate", disabled=not groups):
+            freed = store.deduplicate(groups)
+            st.session_state.duplicate_groups = []
+            st.success(f"Freed {human_size(freed)}")
+            groups = []
+    with col_prune:
+        if st.button("Prune Unused Blobs"):
+            st.success(f"Freed {human_size(store.prune(models_dir))}")
+    if st.button("Verify Model Files"):
+        with st.spinner("Hashing model files..."):
+            st.session_state.verify_results = verify_models_dir(models_dir)
+    display_verify_results(st.session_state.get("verify_results"), models_dir)
+    if groups is not None:
+        if groups:
+            st.write(f"{len(groups)} duplicated files, {human_size(sum(g.wasted_bytes for g in groups))} reclaimable")
+            st.dataframe(
+                [
+                    {"SHA256": group.sha256[:16], "Size": human_size(group.size), "Copies": "\n".join(group.paths)}
+                    for group in groups
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+        else:
+            st.write("No duplicate files found.")
+
+def display_verify_results(results, models_dir):
+    """Summary and table of the last integrity check of the models directory"""
+    if results is None:
+        return
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    cached = sum(1 for result in results if result.cached)
+    st.write(
+        f"✅ {counts.get('ok', 0)} ok, ❌ {counts.get('mismatch', 0)} mismatched, "
+        f"❔ {counts.get('unverified', 0)} without a known hash, ⚠️ {counts.get('error', 0) + counts.get('missing', 0)} "
+        f"unreadable — {cached} of {len(results)} answered from the manifest"
+    )
+    bad = [result for result in results if result.status != "ok"]
+    if bad:
+        st.dataframe(
+            [
+                {
+                    "File": os.path.relpath(result.path, models_dir),
+                    "Size": human_size(result.size),
+                    "Status": result.status,
+                    "SHA256": (result.sha256 or "")[:16],
+                    "Expected": (result.expected or "")[:16],
+                }
+                for result in bad
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+def format_rate(bytes_per_second):
+    """Format a throughput value for display"""
+    return f"{human_size(bytes_per_second)}/s"
+
+def format_eta(seconds):
+    """Format an ETA in seconds as h:mm:ss"""
+    if seconds is None:
+        return "-"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
+
+def download_repository(repo_id, output_dir, file_workers=HF_DOWNLOAD_FILE_WORKERS,
+                        chunk_workers=HF_DOWNLOAD_CHUNK_WORKERS, revision=None, flat=False):
+    """Queue a download of the entire repository"""
     try:
         if not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
             st.warning(f"Output directory {output_dir} created.")
-            
-        repo_dir = snapshot_download(repo_id, cache_dir=output_dir, progress_bar=True)
-        st.success(f"Repository downloaded to: {repo_dir}")
-        return repo_dir
+
+        job = get_download_queue().submit(repo_id, output_dir, file_workers=file_workers,
+                                          chunk_workers=chunk_workers, revision=revision, flat=flat)
+        st.success(f"Queued download #{job.id} of {repo_id} to: {job.target_dir}")
+        return job
     except Exception as e:
-        st.error(f"Error downloading repository: {str(e)}")
+        st.error(f"Error queueing repository download: {str(e)}")
         return None
 
-def download_file(repo_id, filename, output_dir):
-    """Download a single file from repository"""
+def download_file(repo_id, filename, output_dir, file_workers=HF_DOWNLOAD_FILE_WORKERS,
+                  chunk_workers=HF_DOWNLOAD_CHUNK_WORKERS, revision=None, flat=False):
+    """Queue a download of one file (or a list of files) from repository"""
     try:
         if not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
             st.warning(f"Output directory {output_dir} created.")
-            
-        file_path = hf_hub_download(repo_id, filename, cache_dir=output_dir)
-        st.success(f"File downloaded to: {file_path}")
-        return file_path
+
+        filenames = [filename] if isinstance(filename, str) else list(filename)
+        job = get_download_queue().submit(repo_id, output_dir, filenames=filenames,
+                                          file_workers=file_workers, chunk_workers=chunk_workers,
+                                          revision=revision, flat=flat)
+        st.success(f"Queued download #{job.id} of {', '.join(filenames)} to: {job.target_dir}")
+        return job
     except Exception as e:
-        st.error(f"Error downloading file: {str(e)}")
+        st.error(f"Error queueing file download: {str(e)}")
         return None
 
+@st.fragment(run_every=2)
+def display_download_queue():
+    """Live view of the server-side download queue"""
+    download_queue = get_download_queue()
+    jobs = download_queue.jobs()
+    st.header("Download Queue")
+    if not jobs:
+        st.write("No downloads queued.")
+        return
+    for job in jobs:
+        icon = {"pending": "⏳", "running": "⬇️", "verifying": "🔍", "done": "✅", "failed": "❌", "cancelled": "⚪"}.get(job.status, "")
+        st.write(f"{icon} **#{job.id}** {job.description} — {job.status}")
+        if job.status == "running":
+            st.progress(job.fraction, text=(
+                f"{human_size(job.bytes_done)} / {human_size(job.bytes_total)} at {format_rate(job.rate)}, "
+                f"ETA {format_eta(job.eta)}"
+            ))
+        if job.error:
+            st.caption(job.error)
+        if job.status in ("pending", "running", "verifying"):
+            if st.button("Cancel", key=f"cancel_download_{job.id}"):
+                download_queue.cancel(job.id)
+        elif job.status in ("failed", "cancelled"):
+            if job.active:
+                st.caption("Stopping...")
+            elif st.button("Retry", key=f"retry_download_{job.id}"):
+                download_queue.retry(job.id)
+    if st.button("Clear Finished Downloads"):
+        download_queue.clear_finished()
+
 def get_repository_description(repo, repo_type):
     """Get the description of a repository based on its type"""
     if repo_type == "model":
@@ -76,17 +220,20 @@ def get_repository_description(repo, repo_type):
 
 def display_repository_info(repo, repo_type):
     """Display repository information"""
-    st.subheader(repo.modelId if repo_type == "model" else repo.id)
+    st.subheader(repo.id)
     if hasattr(repo, 'downloads'):
         st.write(f"📊 Downloads: {repo.downloads}")
     st.markdown("---")
 
-def display_paginated_results(results, page, page_size, repo_type):
-    """Display paginated search results"""
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    displayed_results = results[start_idx:end_idx]
-    
+def display_paginated_results(pager, page, repo_type):
+    """Display one page of search results, fetching it from the Hub on first view"""
+    try:
+        displayed_results = pager.page(page)
+    except Exception as e:
+        st.error(f"Error searching repositories: {str(e)}")
+        return
+    if not displayed_results:
+        st.write("No results on this page.")
     for repo in displayed_results:
         display_repository_info(repo, repo_type)
 
@@ -112,10 +259,20 @@ def main():
     library = st.text_input("Library (e.g., 'pytorch')")
     dataset = st.text_input("Trained dataset (e.g., 'imagenet')")
     
+    # Result options passed through to the Hub API
+    col_sort, col_limit, col_full = st.columns(3)
+    with col_sort:
+        sort_label = st.selectbox("Sort by", list(SORT_OPTIONS))
+    with col_limit:
+        limit = st.number_input("Max results (0 = no limit)", min_value=0, value=0, step=100)
+    with col_full:
+        full = st.checkbox("Fetch full repository info", value=False)
+    page_size = 20
+
     # Search button
     if st.button("Search"):
         # Build filters
-        filters = {}
+        filters = {"sort": SORT_OPTIONS[sort_label], "direction": -1}
         if search_query:
             filters["search"] = search_query
         if author:
@@ -126,31 +283,50 @@ def main():
             filters["library"] = library
         if dataset:
             filters["trained_dataset"] = dataset
-        
-        # Perform search
+        if limit:
+            filters["limit"] = limit
+        if full:
+            filters["full"] = True
+
+        try:
+            search_key, _ = search_repositories(repo_type, page_size, **filters)
+            st.session_state.search_key = search_key
+            st.session_state.search_page = 1
+        except Exception as e:
+            st.error(f"Error searching repositories: {str(e)}")
+
+    # Results stay available across reruns, e.g. when changing the page
+    search_key = st.session_state.get("search_key")
+    pager = get_search_cache().get(search_key) if search_key else None
+    if pager:
         st.header("Search Results")
-        results = search_repositories(repo_type, **filters)
-        
-        # Pagination controls
-        page_size = 20
-        total_results = len(results)
-        total_pages = (total_results + page_size - 1) // page_size
-        page = st.number_input("Page", min_value=1, max_value=max(1, total_pages), value=1)
-        
-        display_paginated_results(results, page, page_size, repo_type)
+        max_page = pager.known_pages + (1 if pager.has_more else 0)
+        # The last page can turn out to be empty, which shrinks max_page below the page the user was on
+        if st.session_state.get("search_page", 1) > max_page:
+            st.session_state.search_page = max_page
+        page = st.number_input("Page", min_value=1, max_value=max_page, key="search_page")
+        display_paginated_results(pager, page, search_key[0])
+        st.caption(f"{len(pager.items)} results loaded" + ("" if pager.exhausted else ", more available"))
     
     # Repository selection and file download
     st.header("Repository Selection & Download")
     repo_id = st.text_input("Enter repository ID (e.g., 'bert-base-uncased')")
     
+    revision = st.text_input("Revision (branch, tag or commit, optional)", value="")
+    
     if repo_id:
         # List files in repository
-        if st.button("List Files in Repository"):
-            files = list_repository_files(repo_id)
-            if files:
+        col_list, col_reload = st.columns(2)
+        with col_list:
+            show_files = st.button("List Files in Repository")
+        with col_reload:
+            if st.button("Reload File Index"):
+                get_repository_index(repo_id, revision, refresh=True)
+        index = get_repository_index(repo_id, revision)
+        if show_files:
+            if index and index.files:
                 st.subheader("Files and Directories in Repository:")
-                for file in files:
-                    st.write(f"📄 {file}")
+                display_file_table(index, index.files)
             else:
                 st.warning("No files found in repository.")
         
@@ -162,20 +338,56 @@ def main():
             "Output directory",
             value=get_default_output_dir()
         )
+        flat = st.checkbox("Save files directly in the output directory (flat LocalAI layout)", value=False)
+        target_dir = output_dir if flat else os.path.join(output_dir, repo_id)
+        st.caption(f"Files are saved under {target_dir}")
+
+        col_files, col_chunks = st.columns(2)
+        with col_files:
+            file_workers = st.slider("Files in parallel", min_value=1, max_value=8, value=HF_DOWNLOAD_FILE_WORKERS)
+        with col_chunks:
+            chunk_workers = st.slider("Connections per file", min_value=1, max_value=16, value=HF_DOWNLOAD_CHUNK_WORKERS)
         
         if download_type == "Entire Repository":
+            if index:
+                st.write(f"Total repository size: {human_size(index.total_size(index.files))} "
+                         f"in {len(index.files)} files")
+                display_download_plan(index.files, target_dir)
             if st.button("Download Entire Repository"):
-                download_repository(repo_id, output_dir)
+                download_repository(repo_id, output_dir, file_workers, chunk_workers, revision or None, flat)
         else:
-            files = list_repository_files(repo_id)
-            if files:
-                st.subheader("Select File to Download:")
-                filename = st.selectbox("Files", files)
-                if st.button("Download Selected File"):
-                    download_file(repo_id, filename, output_dir)
+            if index and index.files:
+                col_pattern, col_quant = st.columns(2)
+                with col_pattern:
+                    pattern = st.text_input("Filter by glob (e.g. '*Q4_K_M*.gguf')")
+                with col_quant:
+                    quant = st.selectbox("Quantization", ["Any"] + index.available_quants)
+                matching = index.filter(pattern or None, None if quant == "Any" else quant)
+                st.write(f"{len(matching)} matching files, {human_size(index.total_size(matching))} total")
+                if matching:
+                    display_download_plan(matching, target_dir)
+                    st.subheader("Select File to Download:")
+                    sizes = {remote.path: remote.size or 0 for remote in matching}
+                    filename = st.selectbox(
+                        "Files", list(sizes),
+                        format_func=lambda path: f"{path} ({human_size(sizes[path])})"
+                    )
+                    col_one, col_all = st.columns(2)
+                    with col_one:
+                        if st.button("Download Selected File"):
+                            download_file(repo_id, filename, output_dir, file_workers, chunk_workers,
+                                          revision or None, flat)
+                    with col_all:
+                        if st.button(f"Download All {len(matching)} Matching Files"):
+                            download_file(repo_id, list(sizes), output_dir, file_workers, chunk_workers,
+                                          revision or None, flat)
             else:
                 st.warning("No files found in repository.")
 
+    display_download_queue()
+
+    display_model_store(get_default_output_dir())
+
     st.divider()
 
     # Social Media Icons and Links
@@ -1,6 +1,208 @@
+import os
 import streamlit as st
 from PIL import Image
-from autotiktokenizer import AutoTikTokenizer
+from utils.context_fit import context_fit
+from utils.incremental_tokens import get_token_counter
+from utils.config_catalog import get_config_catalog
+from utils.model_configs import MODELS_PATH
+from utils.formatting import human_size
+from utils.token_batch import (
+    TOKEN_EXPORT_MAX_BYTES,
+    TOKEN_TABLE_PREVIEW_ROWS,
+    TokenStats,
+    count_tokens,
+    iter_documents,
+    remove_table,
+)
+from utils.tokenizer_pool import (
+    TOKENIZER_CACHE_DIR,
+    cached_tokenizers,
+    compare_token_counts,
+    get_tokenizer_pool,
+    parse_model_names,
+    prewarm_tokenizers,
+)
+
+
+def iter_uploaded_documents(uploaded_files, text_column):
+    """Chain the documents of every uploaded file into one stream"""
+    for uploaded_file in uploaded_files:
+        uploaded_file.seek(0)
+        yield from iter_documents(uploaded_file.name, uploaded_file, text_column)
+
+
+def show_model_comparison(rows, cleaned_input):
+    """Table of token counts for the same text across several models"""
+    counts = [row["tokens"] for row in rows if row["tokens"] is not None]
+    fewest = min(counts) if counts else None
+    st.dataframe(
+        [
+            {
+                "Model": row["model"],
+                "Tokens": row["tokens"],
+                "vs. fewest": f"+{row['tokens'] - fewest} ({(row['tokens'] / fewest - 1) * 100:.1f}%)"
+                if row["tokens"] is not None and fewest else "",
+                "Characters per token": round(len(cleaned_input) / row["tokens"], 2) if row["tokens"] else None,
+                "Error": row["error"],
+            }
+            for row in rows
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
+def show_context_fit():
+    """Check a request against the context window and chat template of a LocalAI model config"""
+    # The catalog re-parses a YAML only when it changes, instead of every config on every rerun
+    configs = get_config_catalog(MODELS_PATH).model_configs()
+    if not configs:
+        st.info(f"No LocalAI model configs found in '{MODELS_PATH}'.")
+        return
+    st.write("Applies the model's chat template around your messages and checks the total against its `context_size`.")
+    with st.form(key='context_fit_form'):
+        config = st.selectbox(
+            "LocalAI model config", configs,
+            format_func=lambda c: f"{c.name} ({c.context_size or 'no'} context_size)"
+        )
+        model_name = st.text_input(
+            "Tokenizer model on Hugging Face: (org/model_name)",
+            placeholder="mistralai/Mistral-7B-Instruct-v0.3"
+        )
+        system_prompt = st.text_area("System prompt (optional):", height=68)
+        user_input = st.text_area("User message:", height=200)
+        completion_tokens = st.number_input(
+            "Expected completion tokens", min_value=0, value=config.max_tokens or 512, step=128
+        )
+        submit_button = st.form_submit_button(label='Check Context Fit')
+
+    if not submit_button:
+        return
+    if not model_name:
+        st.warning("Please enter a tokenizer model name to proceed.")
+        return
+    try:
+        tokenizer = get_tokenizer_pool().get(model_name)
+    except Exception as e:
+        st.error(f"Error loading tokenizer for model '{model_name}': {e}")
+        return
+    messages = ([("system", system_prompt)] if system_prompt else []) + [("user", user_input)]
+    prompt, fit = context_fit(tokenizer, config, messages, int(completion_tokens))
+
+    st.subheader("Results")
+    col_prompt, col_overhead, col_total, col_headroom = st.columns(4)
+    col_prompt.metric("Prompt tokens", fit.prompt_tokens)
+    col_overhead.metric("Template overhead", fit.template_overhead)
+    col_total.metric("Prompt + completion", fit.total_tokens)
+    col_headroom.metric("Headroom", "-" if fit.headroom is None else fit.headroom)
+    if fit.context_size is None:
+        st.warning(f"'{config.name}' has no context_size set, LocalAI will use its backend default.")
+    elif not fit.fits:
+        st.error(
+            f"Prompt plus completion needs {fit.total_tokens} tokens but '{config.name}' has a context_size of "
+            f"{fit.context_size}. The request will be truncated or fail."
+        )
+    elif fit.tight:
+        st.warning(f"Uses {fit.total_tokens / fit.context_size:.0%} of the {fit.context_size} token context window.")
+    else:
+        st.success(f"Fits in the {fit.context_size} token context window.")
+    with st.expander("Rendered prompt"):
+        st.code(prompt, language=None)
+
+
+def show_batch_counter():
+    """Count tokens across many uploaded documents, with aggregate statistics and CSV export"""
+    st.write("Upload text files, a zip of documents, or JSONL/CSV files with one document per row.")
+    with st.form(key='batch_token_count_form'):
+        model_name = st.text_input(
+            "Enter the Hugging Face model name: (org/model_name)",
+            placeholder="mistralai/Mistral-7B-Instruct-v0.3"
+        )
+        uploaded_files = st.file_uploader(
+            "Documents", accept_multiple_files=True,
+            type=["txt", "md", "rst", "html", "json", "jsonl", "csv", "zip", "py", "yaml", "yml"]
+        )
+        text_column = st.text_input("Text column for JSONL/CSV rows", value="text")
+        submit_button = st.form_submit_button(label='Count Tokens in Files')
+
+    if submit_button:
+        if not model_name:
+            st.warning("Please enter a model name to proceed.")
+            return
+        if not uploaded_files:
+            st.warning("Please upload at least one file.")
+            return
+        try:
+            tokenizer = get_tokenizer_pool().get(model_name)
+        except Exception as e:
+            st.error(f"Error loading tokenizer for model '{model_name}': {e}")
+            return
+
+        progress = st.empty()
+        stats = TokenStats()
+        try:
+            for stats in count_tokens(tokenizer, iter_uploaded_documents(uploaded_files, text_column), stats):
+                progress.write(f"Counted {stats.documents} documents, {stats.total_tokens} tokens so far...")
+        except Exception as e:
+            st.error(f"Error reading documents: {e}")
+        progress.empty()
+        previous = st.session_state.get("batch_token_results")
+        if previous:
+            remove_table(previous["csv_path"])
+        stats.close()
+        # Only the path is kept in the session; the table itself stays on disk
+        st.session_state.batch_token_results = {
+            "model_name": model_name,
+            "summary": stats.summary(),
+            "preview": [
+                {"Document": row.name, "Characters": row.characters, "Tokens": row.tokens}
+                for row in stats.preview
+            ],
+            "csv_path": stats.table_path,
+        }
+
+    results = st.session_state.get("batch_token_results")
+    if results:
+        summary = results["summary"]
+        st.subheader("Results")
+        st.write(f"**Model:** {results['model_name']}")
+        if not summary["documents"]:
+            st.warning("No documents found in the uploaded files.")
+            return
+        col_docs, col_total, col_mean, col_max = st.columns(4)
+        col_docs.metric("Documents", summary["documents"])
+        col_total.metric("Total tokens", summary["total_tokens"])
+        col_mean.metric("Mean tokens", summary["mean"])
+        col_max.metric("Max tokens", summary["max"])
+        st.dataframe([summary], hide_index=True)
+        if summary["documents"] > len(results["preview"]):
+            st.caption(f"Showing the first {TOKEN_TABLE_PREVIEW_ROWS} documents; the export has all of them.")
+        st.dataframe(results["preview"], use_container_width=True, hide_index=True)
+        show_table_export(results["csv_path"])
+
+
+def show_table_export(csv_path):
+    """Offer the per-document CSV, reading it from disk only on the rerun that asked for it"""
+    try:
+        size = os.path.getsize(csv_path)
+    except OSError:
+        st.warning("The per-document table is no longer available; count the files again to export it.")
+        return
+    if size > TOKEN_EXPORT_MAX_BYTES:
+        st.info(f"The per-document table is {human_size(size, binary=True)}, too large to download "
+                f"through the browser. It is saved on the server at {csv_path}")
+        return
+    if not st.button(f"Prepare CSV Export ({human_size(size, binary=True)})"):
+        return
+    with open(csv_path, "rb") as f:
+        # on_click="ignore" keeps the download from triggering a rerun that would read the file again
+        st.download_button(
+            "Download per-document token counts (CSV)",
+            data=f,
+            file_name="token_counts.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
 
 
 def main():
@@ -34,54 +236,93 @@ def main():
     st.markdown("For private Huggingface repos you will need to set the ")
     st.markdown("Hope you find useful and can find the Github project here: [RoboTF LLM Token Estimator](https://github.com/kkacsh321/robotf-llm-token-estimator)")
 
-    # Function to load tokenizer with caching
-    @st.cache_resource
-    def load_tokenizer(model_name):
-        return AutoTikTokenizer.from_pretrained(model_name)
-    
-    # Create a form for the inputs and button
-    with st.form(key='token_count_form'):
-        # Text input for the model name
-        model_name = st.text_area(
-            "Enter the Hugging Face model name: (org/model_name)",
-            placeholder="mistralai/Mistral-7B-Instruct-v0.3", height=68  # Default model name
-        )
+    # Tokenizers are kept converted on disk, so cached models load instantly and offline
+    prewarm_tokenizers()
+    with st.expander("Tokenizer cache"):
+        st.write(f"**In memory:** {', '.join(get_tokenizer_pool().loaded) or 'none'}")
+        st.write(f"**On disk ({TOKENIZER_CACHE_DIR}):** {', '.join(cached_tokenizers()) or 'none'}")
+        st.caption("Set TOKENIZER_PREWARM to a comma separated list of models to load them at startup.")
+
+    single_tab, batch_tab, fit_tab = st.tabs(["Single Text", "Batch Files", "Context Fit"])
+
+    with single_tab:
+        # Create a form for the inputs and button
+        with st.form(key='token_count_form'):
+            # Text input for the model names, one per line to compare several
+            model_name = st.text_area(
+                "Enter one or more Hugging Face model names: (org/model_name, one per line)",
+                placeholder="mistralai/Mistral-7B-Instruct-v0.3", height=68  # Default model name
+            )
         
-        # Text area for the user's input text
-        user_input = st.text_area("Your text:", height=200)
+            # Text area for the user's input text
+            user_input = st.text_area("Your text:", height=200)
         
-        # Submit button
-        submit_button = st.form_submit_button(label='Count Tokens')
+            # Unchanged paragraphs are answered from a cache; this also re-counts everything to compare
+            verify_exact = st.checkbox("Verify against a full encode", value=False)
+
+            # Submit button
+            submit_button = st.form_submit_button(label='Count Tokens')
     
-    # When the form is submitted
-    if submit_button:
-        if model_name:
-            # Initialize the tokenizer
-            try:
-                tokenizer = load_tokenizer(model_name)
-            except Exception as e:
-                st.error(f"Error loading tokenizer for model '{model_name}': {e}")
-                st.stop()
+        # When the form is submitted
+        if submit_button:
+            model_names = parse_model_names(model_name)
+            if len(model_names) > 1:
+                if user_input:
+                    cleaned_input = user_input.replace('\n', ' ')
+
+                    # Load every tokenizer concurrently and count the same text with each
+                    with st.spinner(f"Loading {len(model_names)} tokenizers..."):
+                        rows = compare_token_counts(model_names, cleaned_input)
+
+                    st.subheader("Results")
+                    show_model_comparison(rows, cleaned_input)
+                    st.write(f"**Original Text Length:** {len(user_input)} characters")
+                    st.write(f"**Cleaned Text Length:** {len(cleaned_input)} characters")
+                else:
+                    st.warning("Please enter some text to count tokens.")
+            elif model_names:
+                model_name = model_names[0]
+                # Initialize the tokenizer
+                try:
+                    tokenizer = get_tokenizer_pool().get(model_name)
+                except Exception as e:
+                    st.error(f"Error loading tokenizer for model '{model_name}': {e}")
+                    st.stop()
             
-            if user_input:
-                # Replace newlines with spaces in the user input
-                cleaned_input = user_input.replace('\n', ' ')
+                if user_input:
+                    # Replace newlines with spaces in the user input
+                    cleaned_input = user_input.replace('\n', ' ')
                 
-                # Tokenize the cleaned input text
-                tokens = tokenizer.encode(cleaned_input)
-                token_count = len(tokens)
+                    # Tokenize the input, re-encoding only the chunks changed since the last submit
+                    counted = get_token_counter().count(model_name, tokenizer, user_input, verify=verify_exact)
+                    token_count = counted.tokens
                 
-                # Display results
-                st.subheader("Results")
-                st.write(f"**Model:** {model_name}")
-                st.write(f"**Estimated Token count:** {token_count}")
-                st.write(f"**Original Text Length:** {len(user_input)} characters")
-                st.write(f"**Cleaned Text Length:** {len(cleaned_input)} characters")
+                    # Display results
+                    st.subheader("Results")
+                    st.write(f"**Model:** {model_name}")
+                    st.write(f"**Estimated Token count:** {token_count}")
+                    st.write(f"**Original Text Length:** {len(user_input)} characters")
+                    st.write(f"**Cleaned Text Length:** {len(cleaned_input)} characters")
+                    st.caption(
+                        f"Re-used {counted.reused_chunks} of {counted.chunks} cached chunks, "
+                        f"encoded {counted.encoded_chars} characters"
+                    )
+                    if counted.verified and not counted.exact:
+                        st.caption("Chunked count differed from a full encode for this tokenizer, "
+                                   "it will be counted in full from now on.")
+                    elif counted.verified:
+                        st.caption("Chunked count matches a full encode.")
                 
+                else:
+                    st.warning("Please enter some text to count tokens.")
             else:
-                st.warning("Please enter some text to count tokens.")
-        else:
-            st.warning("Please enter a model name to proceed.")
+                st.warning("Please enter a model name to proceed.")
+
+    with batch_tab:
+        show_batch_counter()
+
+    with fit_tab:
+        show_context_fit()
 
     st.divider()
 
@@ -4,36 +4,254 @@ import yaml
 import os
 import pandas as pd
 from dotenv import load_dotenv
-from yamllint.config import YamlLintConfig
-from yamllint import linter
 from code_editor import code_editor
 from PIL import Image
+from utils.config_catalog import SORT_FIELDS, get_config_catalog
+from utils.config_edits import apply_bulk_edit, backup_dir_for, parse_edits, plan_bulk_edit, write_atomic
+from utils.config_validation import REMOTE_MODEL_PREFIXES, get_config_validator, lint_yaml
+from utils.formatting import human_size
+from utils.memory_estimate import estimate_memory
+from utils.model_configs import ModelConfig
+from utils.weights_index import get_weights_index
 
 # Uncomment to use locally
 load_dotenv('.env')
 
 MODELS_PATH = os.getenv('MODELS_PATH', default='models')
 TEMPLATE_FILE = 'custom_configs/model_template.yaml'
+SEVERITY_ICONS = {"error": "❌", "warning": "⚠️", "info": "ℹ️"}
+
+def show_validation_results(results):
+    """Summarize a validate-all run and list every issue in one table"""
+    issues = [issue for result in results for issue in result.issues]
+    errors = sum(1 for issue in issues if issue.severity == "error")
+    warnings = sum(1 for issue in issues if issue.severity == "warning")
+    failing = sum(1 for result in results if result.errors)
+    cached = sum(1 for result in results if result.cached)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Configurations", len(results))
+    col2.metric("With errors", failing)
+    col3.metric("Errors / warnings", f"{errors} / {warnings}")
+    col4.metric("Unchanged (cached)", cached)
+    if not issues:
+        st.success("All configurations passed validation!")
+        return
+    show_info = st.checkbox("Show unknown keys", value=False)
+    st.dataframe(
+        [
+            {
+                "": SEVERITY_ICONS.get(issue.severity, ""),
+                "File": issue.file,
+                "Line": issue.line,
+                "Check": issue.source,
+                "Problem": issue.message,
+            }
+            for issue in issues
+            if show_info or issue.severity != "info"
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+def show_memory_estimate(selected_model, code):
+    """VRAM/RAM estimate of the config being edited, read from its GGUF header"""
+    try:
+        data = yaml.safe_load(code)
+    except yaml.YAMLError as e:
+        st.error(f"Error parsing YAML: {str(e)}")
+        return
+    entries = [entry for entry in (data if isinstance(data, list) else [data]) if isinstance(entry, dict)]
+    if not entries:
+        st.info("The configuration has no settings to estimate from.")
+        return
+    configs = [ModelConfig.from_dict(entry, os.path.join(MODELS_PATH, selected_model)) for entry in entries]
+    config = configs[0]
+    if len(configs) > 1:
+        config = configs[st.selectbox("Model", range(len(configs)), format_func=lambda index: configs[index].name)]
+    if not config.model_file or not str(config.model_file).endswith(".gguf"):
+        st.info("Estimates need a local GGUF file in parameters.model.")
+        return
+
+    col_layers, col_context = st.columns(2)
+    with col_layers:
+        gpu_layers = st.number_input("gpu_layers", min_value=0, value=config.gpu_layers or 0,
+                                     key=f"estimate_layers_{selected_model}_{config.name}")
+    with col_context:
+        context_size = st.number_input("context_size", min_value=0, value=config.context_size or 0, step=1024,
+                                       key=f"estimate_context_{selected_model}_{config.name}",
+                                       help="0 uses the model's trained context length")
+    try:
+        estimate = estimate_memory(config, MODELS_PATH, gpu_layers=gpu_layers, context_size=context_size or None)
+    except Exception as e:
+        st.error(f"Error reading model file: {str(e)}")
+        return
+
+    st.write(
+        f"**{estimate.architecture or 'unknown'}**, {estimate.block_count} layers, "
+        f"{estimate.context_size} tokens of {estimate.kv_type} KV cache "
+        f"({human_size(estimate.kv_bytes_per_layer, binary=True)} per layer)"
+    )
+    st.dataframe(
+        [
+            {key: (human_size(value, binary=True) if key in ("Weights", "KV cache", "Total") else value)
+             for key, value in row.items()}
+            for row in estimate.rows()
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+    if estimate.layer_bytes:
+        st.caption(f"Each offloaded layer adds about {human_size(max(estimate.layer_bytes), binary=True)} of weights "
+                   f"plus {human_size(estimate.kv_bytes_per_layer, binary=True)} of KV cache. "
+                   "Compute buffers (a few hundred MiB per GPU) are not included.")
+    for note in estimate.notes:
+        st.warning(note)
+
+def show_bulk_editor(catalog):
+    """Select configurations by filter, preview key-path edits as diffs and write them atomically"""
+    st.markdown("## 🛠️ Bulk edit configurations")
+    summaries = catalog.entries()
+    col_query, col_backend = st.columns(2)
+    with col_query:
+        query = st.text_input("Filter (file, name, backend, model file)", key='bulk_query')
+    with col_backend:
+        backends = st.multiselect("Backends", sorted({summary.backend for summary in summaries if summary.backend}))
+    matches = [summary.file for summary in catalog.search(query)
+               if not backends or summary.backend in backends]
+    files = st.multiselect(f"Configurations to edit ({len(matches)} matching)", matches, default=matches)
+    edits_text = st.text_area(
+        "Edits, one per line",
+        placeholder="gpu_layers: 60\ncontext_size: 32768\nflash_attention: true\nparameters.temperature: 0.7\nunset no_kv_offloading",
+        key='bulk_edits',
+    )
+
+    if st.button('Preview Changes', disabled=not files or not edits_text.strip()):
+        try:
+            edits = parse_edits(edits_text)
+        except ValueError as e:
+            st.error(f"Error parsing edits: {str(e)}")
+            edits = None
+        st.session_state.bulk_plans = plan_bulk_edit(MODELS_PATH, files, edits) if edits else None
+
+    plans = st.session_state.get('bulk_plans')
+    if not plans:
+        return
+    changed = [plan for plan in plans if plan.changed]
+    for plan in plans:
+        if plan.error:
+            st.error(f"{plan.file}: {plan.error}")
+    unchanged = len(plans) - len(changed) - sum(1 for plan in plans if plan.error)
+    st.markdown(f"**{len(changed)}** configurations will change, {unchanged} already match")
+    for plan in changed:
+        with st.expander(plan.file):
+            st.code(plan.diff(), language='diff')
+
+    if changed and st.button(f'Apply to {len(changed)} Configurations', type='primary'):
+        backup_dir = backup_dir_for(MODELS_PATH)
+        written, errors = apply_bulk_edit(changed, backup_dir)
+        for file in written + list(errors):
+            catalog.refresh(file)
+        for file, error in errors.items():
+            st.error(f"Error saving {file}: {error}")
+        if written:
+            st.success(f"Updated {len(written)} configurations. Previous versions were saved to '{backup_dir}'.")
+        st.session_state.bulk_plans = None
+
+def show_weights_report(catalog):
+    """Which weight files each config uses, orphaned weights, dangling configs and cleanup"""
+    st.markdown("## 🔗 Configs and model files")
+    index = get_weights_index(MODELS_PATH)
+    report = index.report(catalog.entries())
+    orphans = report.orphans
+    dangling = report.dangling
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Weight files", len(report.weights))
+    col2.metric("Orphaned", len(orphans))
+    col3.metric("Dangling references", len(dangling))
+    col4.metric("Reclaimable", human_size(report.reclaimable_bytes, binary=True))
+    st.caption(f"{report.stats_reused} cached file stats reused, {report.stats_taken} new")
+
+    if dangling:
+        st.markdown("### Configs with missing model files")
+        st.dataframe(
+            [{"Config": link.config, "Model": link.model, "Reference": link.reference} for link in dangling],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    with st.expander(f"All references ({len(report.links)})"):
+        st.dataframe(
+            [
+                {
+                    "Config": link.config,
+                    "Model": link.model,
+                    "Reference": link.reference,
+                    "Files": "remote" if link.remote else len(link.paths),
+                    "Size": human_size(link.size, binary=True),
+                }
+                for link in report.links
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    # Outcome of a delete, kept across the rerun that rescans the directory
+    deleted, errors = st.session_state.pop('weights_deleted', (0, {}))
+    for path, error in errors.items():
+        st.error(f"Error deleting {path}: {error}")
+    if deleted:
+        st.success(f"Deleted {deleted} files.")
+    if report.broken:
+        st.error("These configurations can't be read, so the model files they use are unknown. "
+                 "Fix them before cleaning up orphaned weights:")
+        st.dataframe(
+            [{"Config": file, "Error": error} for file, error in report.broken],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    if not orphans:
+        st.success("Every weight file is used by a configuration.")
+        return
+    st.markdown("### Weight files no configuration uses")
+    st.dataframe(
+        [
+            {
+                "File": weight.path,
+                "Size": human_size(weight.size, binary=True),
+                "Modified": pd.Timestamp(weight.mtime, unit='s'),
+                "Links": "symlink" if weight.symlink else weight.nlink,
+            }
+            for weight in orphans
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+    if report.cleanup_blocked:
+        st.warning("Deleting is disabled while some configurations can't be read; they may use these files.")
+        return
+    selected = st.multiselect("Orphaned files to delete", [weight.path for weight in orphans])
+    if selected:
+        chosen = [weight for weight in orphans if weight.path in selected]
+        st.warning(f"Deleting {len(selected)} files frees about "
+                   f"{human_size(index.reclaimable(chosen, report.weights), binary=True)}. This can't be undone.")
+        if st.button(f'Delete {len(selected)} Files', type='primary'):
+            deleted, errors, _ = index.delete(selected, report)
+            st.session_state.weights_deleted = (len(deleted), errors)
+            st.rerun()
 
 def main():
     if not os.path.exists(MODELS_PATH):
         st.error(f"The model directory '{MODELS_PATH}' does not exist.")
         st.stop()
 
-    model_configs = sorted([f for f in os.listdir(MODELS_PATH) if f.endswith('.yaml')])
+    # Parsed summaries of every YAML, kept current by a file watcher instead of listing MODELS_PATH per rerun
+    catalog = get_config_catalog(MODELS_PATH)
 
     def load_yaml(path):
         with open(path, 'r') as file:
             return yaml.safe_load(file)
 
-    def lint_yaml(yaml_content):
-        config_str = """
-        extends: default
-        """
-        config = YamlLintConfig(config_str)
-        problems = list(linter.run(yaml_content, config))
-        return problems
-
     st.set_page_config(layout="wide")
     
     try:
@@ -57,11 +275,70 @@ def main():
         st.session_state.code_content = ""
         st.rerun()
 
+    search_query = st.sidebar.text_input("Search configurations (file, name, backend, model file)")
+    col_sort, col_order = st.sidebar.columns([2, 1])
+    with col_sort:
+        sort_label = st.selectbox("Sort by", list(SORT_FIELDS))
+    with col_order:
+        descending = st.checkbox("Descending", value=sort_label == "Last modified")
+    summaries = catalog.search(search_query, SORT_FIELDS[sort_label], reverse=descending)
+    model_configs = [summary.file for summary in summaries]
+    # Keep the open file selectable even when the search hides it, unless it is gone
+    if st.session_state.selected_model and st.session_state.selected_model not in model_configs:
+        if catalog.get(st.session_state.selected_model):
+            model_configs.insert(0, st.session_state.selected_model)
+        else:
+            st.session_state.selected_model = ''
+
+    def describe_config(file):
+        summary = catalog.get(file)
+        if not file or summary is None or not summary.name or summary.name == os.path.splitext(file)[0]:
+            return file
+        return f"{file} ({summary.name})"
+
     selected_model = st.sidebar.selectbox(
         'Select a model configuration:',
         [''] + model_configs,
+        format_func=describe_config,
         key='selected_model'
     )
+    st.sidebar.caption(f"{len(summaries)} of {len(catalog.entries())} configurations"
+                       + (" (live)" if catalog.event_driven else ""))
+
+    def start_validation():
+        # Runs before the rerun, while the selectbox state may still be changed
+        st.session_state.selected_model = ''
+        st.session_state.validate_all = True
+
+    st.sidebar.button('Validate All Configurations', on_click=start_validation)
+
+    def start_bulk_edit():
+        st.session_state.selected_model = ''
+        st.session_state.bulk_edit = True
+
+    st.sidebar.button('Bulk Edit Configurations', on_click=start_bulk_edit)
+
+    def start_weights_report():
+        st.session_state.selected_model = ''
+        st.session_state.weights_report = True
+
+    st.sidebar.button('Model Files Report', on_click=start_weights_report)
+
+    selected_summary = catalog.get(selected_model) if selected_model else None
+    if selected_summary:
+        if selected_summary.error:
+            st.sidebar.error(f"YAML error: {selected_summary.error}")
+        else:
+            st.sidebar.markdown(
+                f"**Backend:** {selected_summary.backend or '-'}  \n"
+                f"**Context size:** {selected_summary.context_size or '-'}  \n"
+                f"**GPU layers:** {selected_summary.gpu_layers if selected_summary.gpu_layers is not None else '-'}  \n"
+                f"**Model file:** {selected_summary.model_file or '-'}  \n"
+                f"**Modified:** {pd.Timestamp(selected_summary.mtime, unit='s').strftime('%Y-%m-%d %H:%M:%S')}"
+            )
+            for _, reference in selected_summary.references:
+                if not reference.startswith(REMOTE_MODEL_PREFIXES) and not os.path.exists(os.path.join(MODELS_PATH, reference)):
+                    st.sidebar.warning(f"Referenced file '{reference}' is missing")
 
     new_file_name = st.sidebar.text_input("New File Name (without .yaml)")
     if st.sidebar.button('Create New YAML File'):
@@ -77,6 +354,7 @@ def main():
                 
                 with open(new_file_path, 'w') as new_file:
                     new_file.write(template_content)
+                catalog.refresh(new_file_name)
                 
                 st.sidebar.success(f"New model configuration '{new_file_name}' created.")
                 st.rerun()  # Refresh to include the new file in the list
@@ -86,6 +364,7 @@ def main():
     if selected_model and st.sidebar.button('Remove Selected YAML File'):
         file_to_remove = os.path.join(MODELS_PATH, selected_model)
         os.remove(file_to_remove)
+        catalog.refresh(selected_model)
         st.sidebar.success(f"Model configuration '{selected_model}' has been removed.")
         st.rerun()  # Refresh to update the file list
 
@@ -139,6 +418,9 @@ def main():
         """)
         
         st.markdown("Please see https://localai.io/advanced/ for more configuration values")
+
+        with st.expander("💾 Memory Estimate (VRAM / RAM)"):
+            show_memory_estimate(selected_model, st.session_state.code_content)
         
         st.markdown(f"Hit the Run button in the editor to save changes to server")
 
@@ -170,8 +452,9 @@ def main():
         if response_dict.get('type') == 'submit':
             code = response_dict['text']
             try:
-                with open(os.path.join(MODELS_PATH, selected_model), 'w') as file:
-                    file.write(code)
+                # Temp file plus rename, so LocalAI never reads a half-written config
+                write_atomic(os.path.join(MODELS_PATH, selected_model), code)
+                catalog.refresh(selected_model)
                 st.success(f"The model configuration '{selected_model}' has been saved.")
                 st.session_state.code_content = code
                 st.rerun()  # Refresh the app to reload the saved content
@@ -190,7 +473,50 @@ def main():
 
     else:
         st.markdown("Please see https://localai.io/advanced/ for more configuration values")
+        if st.session_state.get('validate_all'):
+            st.markdown("## 🩺 Validation of all configurations")
+            # Lint and schema results are cached by file hash, so only changed files are checked again
+            files = sorted(entry.file for entry in catalog.entries())
+            with st.spinner(f"Validating {len(files)} configurations..."):
+                results = get_config_validator().validate_all(MODELS_PATH, files)
+            show_validation_results(results)
+            if st.button('Close Validation'):
+                st.session_state.validate_all = False
+                st.rerun()
+            st.divider()
+        if st.session_state.get('bulk_edit'):
+            show_bulk_editor(catalog)
+            if st.button('Close Bulk Edit'):
+                st.session_state.bulk_edit = False
+                st.session_state.bulk_plans = None
+                st.rerun()
+            st.divider()
+        if st.session_state.get('weights_report'):
+            show_weights_report(catalog)
+            if st.button('Close Report'):
+                st.session_state.weights_report = False
+                st.rerun()
+            st.divider()
         st.info("Please select a model configuration to edit.")
+        if summaries:
+            st.dataframe(
+                [
+                    {
+                        "File": summary.file,
+                        "Name": summary.name,
+                        # Hand-edited files may hold numbers here; keep the column one type
+                        "Backend": None if summary.backend is None else str(summary.backend),
+                        "Context Size": summary.context_size,
+                        "GPU Layers": summary.gpu_layers,
+                        "Model File": None if summary.model_file is None else str(summary.model_file),
+                        "Modified": pd.Timestamp(summary.mtime, unit='s'),
+                        "Error": summary.error,
+                    }
+                    for summary in summaries
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
         
 
     st.divider()
@@ -0,0 +1,20 @@
+"""Start the app's background services, then the Streamlit server in the same process
+
+`streamlit run` only executes RoboTF_LLM_Tools.py when the first browser
+session connects, so after a restart queued downloads would not resume and
+tokenizers would not prewarm until someone opened the app. Extra arguments
+are passed on to `streamlit run`, e.g. `python serve.py --server.port 8969`.
+"""
+import sys
+
+from streamlit.web import cli
+
+from utils.download_queue import get_download_queue
+from utils.tokenizer_pool import prewarm_tokenizers
+
+if __name__ == "__main__":
+    # The pages import the same modules, so they find these singletons already running
+    get_download_queue()
+    prewarm_tokenizers()
+    sys.argv = ["streamlit", "run", "RoboTF_LLM_Tools.py", *sys.argv[1:]]
+    sys.exit(cli.main())
@@ -0,0 +1,91 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from utils.container_inventory import get_inventory
+from utils.docker_client import get_client
+
+# Tiers separated by ';', containers within a tier by ',' e.g. "postgres,chromadb;localai;open-webui"
+BULK_ACTION_ORDER = os.getenv("BULK_ACTION_ORDER", "")
+BULK_ACTION_WORKERS = int(os.getenv("BULK_ACTION_WORKERS", "4"))
+ACTIONS = ("start", "stop", "restart", "remove")
+
+
+@dataclass(slots=True)
+class ActionResult:
+    container: str
+    action: str
+    ok: bool
+    error: str = ""
+    seconds: float = 0.0
+
+
+def parse_order(order):
+    """Parse a 'a,b;c;d' dependency order string into a list of tiers"""
+    tiers = []
+    for tier in (order or "").split(";"):
+        names = [name.strip() for name in tier.split(",") if name.strip()]
+        if names:
+            tiers.append(names)
+    return tiers
+
+
+def plan_tiers(containers, action, order=None):
+    """Group containers into tiers that must run one after another
+
+    Containers listed in the order run tier by tier; everything else runs
+    in a final tier. Stop and remove walk the order backwards so
+    dependants go down before what they depend on.
+    """
+    tiers = parse_order(order)
+    remaining = list(dict.fromkeys(containers))
+    planned = []
+    for tier in tiers:
+        members = [c for c in remaining if c in tier]
+        if members:
+            planned.append(members)
+            remaining = [c for c in remaining if c not in members]
+    if action in ("stop", "remove"):
+        planned.reverse()
+        if remaining:
+            planned.insert(0, remaining)
+    elif remaining:
+        planned.append(remaining)
+    return planned
+
+
+def run_action(client, container, action):
+    start = time.monotonic()
+    try:
+        if action == "start":
+            client.start_container(container)
+        elif action == "stop":
+            client.stop_container(container)
+        elif action == "restart":
+            client.restart_container(container)
+        elif action == "remove":
+            client.remove_container(container)
+        else:
+            raise ValueError(f"Invalid action '{action}'. Must be one of {', '.join(ACTIONS)}.")
+        return ActionResult(container, action, True, seconds=time.monotonic() - start)
+    except Exception as e:
+        return ActionResult(container, action, False, str(e), time.monotonic() - start)
+
+
+def iter_bulk_action(containers, action, order=BULK_ACTION_ORDER, max_workers=BULK_ACTION_WORKERS, client=None):
+    """Run an action on many containers concurrently, yielding each result as it finishes
+
+    Results are yielded in the caller's thread so it can update the UI.
+    Each dependency tier finishes before the next one starts; a failure
+    does not stop later tiers.
+    """
+    client = client or get_client()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for tier in plan_tiers(containers, action, order):
+                futures = [executor.submit(run_action, client, container, action) for container in tier]
+                for future in as_completed(futures):
+                    yield future.result()
+    finally:
+        get_inventory().invalidate()
@@ -0,0 +1,164 @@
+import itertools
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+
+JOB_OUTPUT_LINES = int(os.getenv("JOB_OUTPUT_LINES", "2000"))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "50"))
+
+
+class CommandJob:
+    """A child process whose merged stdout/stderr is read line by line into a bounded buffer"""
+
+    def __init__(self, job_id, argv, timeout=None, max_lines=JOB_OUTPUT_LINES):
+        self.id = job_id
+        self.argv = argv
+        self.timeout = timeout
+        self.output = deque(maxlen=max_lines)
+        self.total_lines = 0
+        self.status = "pending"
+        self.returncode = None
+        self.started_at = None
+        self.finished_at = None
+        self._process = None
+        self._lock = threading.Lock()
+
+    @property
+    def command(self):
+        return " ".join(self.argv)
+
+    @property
+    def running(self):
+        return self.status == "running"
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    @property
+    def duration(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def start(self):
+        self.started_at = time.time()
+        try:
+            self._process = subprocess.Popen(
+                self.argv,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+                errors="replace",
+            )
+        except Exception as e:
+            self.output.append(f"Error starting command: {e}")
+            self._finish("failed")
+            return
+        self.status = "running"
+        threading.Thread(target=self._read_output, name=f"job-{self.id}", daemon=True).start()
+        if self.timeout:
+            timer = threading.Timer(self.timeout, self._stop, args=("timeout",))
+            timer.daemon = True
+            timer.start()
+
+    def _read_output(self):
+        for line in self._process.stdout:
+            with self._lock:
+                self.output.append(line.rstrip("\n"))
+                self.total_lines += 1
+        self._process.wait()
+        self._finish("done" if self._process.returncode == 0 else "failed")
+
+    def _finish(self, status):
+        with self._lock:
+            if self.finished_at is None:
+                self.returncode = self._process.returncode if self._process else None
+                self.finished_at = time.time()
+                # A cancel or timeout already decided the final status
+                if self.status in ("pending", "running"):
+                    self.status = status
+
+    def _stop(self, status):
+        with self._lock:
+            if self.status != "running":
+                return
+            self.status = status
+        self._process.terminate()
+        # Waiting for the exit (and killing after the grace period) happens off the caller's thread,
+        # which is the Streamlit script thread when the Cancel button is clicked
+        threading.Thread(target=self._reap, name=f"job-{self.id}-stop", daemon=True).start()
+
+    def _reap(self):
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+
+    def cancel(self):
+        self._stop("cancelled")
+
+    def tail(self, lines=500):
+        with self._lock:
+            return list(self.output)[-lines:]
+
+
+class JobManager:
+    """Process-wide registry of command jobs with a bounded history
+
+    Only finished jobs are evicted, so a running process always stays
+    reachable for cancelling even when more than history_size jobs exist.
+    """
+
+    def __init__(self, history_size=JOB_HISTORY_SIZE):
+        self.history_size = history_size
+        self._jobs = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        excess = len(self._jobs) - self.history_size
+        if excess <= 0:
+            return
+        # Oldest jobs sit at the right end
+        for job in reversed(list(self._jobs)):
+            if excess <= 0:
+                break
+            if job.finished:
+                self._jobs.remove(job)
+                excess -= 1
+
+    def submit(self, argv, timeout=None):
+        """Start a command in the background and return its job immediately"""
+        job = CommandJob(next(self._ids), list(argv), timeout=timeout)
+        with self._lock:
+            self._jobs.appendleft(job)
+            self._evict()
+        job.start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return next((job for job in self._jobs if job.id == job_id), None)
+
+    def jobs(self):
+        """Return all remembered jobs, newest first"""
+        with self._lock:
+            return list(self._jobs)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
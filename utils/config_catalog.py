@@ -0,0 +1,218 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from utils.model_configs import MODELS_PATH, load_config_file
+
+CONFIG_CATALOG_TTL = float(os.getenv("CONFIG_CATALOG_TTL", "30"))
+# Safety full rescan interval while the file watcher keeps the catalog current
+CONFIG_CATALOG_RESYNC = float(os.getenv("CONFIG_CATALOG_RESYNC", "300"))
+CONFIG_EXTENSIONS = (".yaml", ".yml")
+# Reading a file fires opened/closed_no_write events too; reacting to those would loop
+WATCHED_EVENTS = ("created", "modified", "deleted", "moved", "closed")
+SORT_FIELDS = {
+    "File": "file",
+    "Model name": "name",
+    "Last modified": "mtime",
+    "Context size": "context_size",
+    "GPU layers": "gpu_layers",
+    "Backend": "backend",
+}
+
+
+@dataclass(slots=True)
+class ConfigSummary:
+    """What the editor shows about one YAML file without opening it again"""
+
+    file: str
+    path: str
+    mtime: float
+    size: int
+    name: str = ""
+    backend: str = None
+    context_size: int = None
+    gpu_layers: int = None
+    model_file: str = None
+    models: list = field(default_factory=list)
+    references: list = field(default_factory=list)
+    error: str = ""
+    # Parsed ModelConfig entries, so other pages can reuse them without reading the YAML again
+    configs: list = field(default_factory=list, compare=False, repr=False)
+
+    @classmethod
+    def from_file(cls, path, stat):
+        summary = cls(file=os.path.basename(path), path=path, mtime=stat.st_mtime, size=stat.st_size)
+        try:
+            configs = load_config_file(path)
+        except Exception as e:
+            # Whatever is wrong with one file must not take down the editor used to fix it
+            summary.error = str(e).splitlines()[0] if str(e) else type(e).__name__
+            return summary
+        summary.configs = configs
+        summary.models = [config.name for config in configs]
+        summary.references = [(config.name, reference) for config in configs for reference in config.references]
+        if configs:
+            first = configs[0]
+            summary.name = first.name
+            summary.backend = first.backend
+            summary.context_size = first.context_size
+            summary.gpu_layers = first.gpu_layers
+            summary.model_file = first.model_file
+        return summary
+
+    def matches(self, query):
+        query = query.lower()
+        return any(query in str(value).lower() for value in (self.file, self.name, self.backend, self.model_file) if value)
+
+
+def _sort_key(value):
+    """Numbers sort numerically; anything else (e.g. 'backend: 5') as text, so mixed types never compare"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value, "")
+    return (1, 0, str(value).lower())
+
+
+def _is_config(name):
+    return name.endswith(CONFIG_EXTENSIONS) and not name.startswith(".")
+
+
+class ConfigCatalog:
+    """In-memory index of the model YAMLs in a models directory
+
+    The directory is listed with os.scandir and only files whose mtime or
+    size changed are parsed again. While a watchdog observer is running
+    (event_driven) single files are refreshed as they change and the whole
+    directory is only rescanned every resync_interval seconds; without one
+    the catalog falls back to rescanning at most once per ttl.
+    """
+
+    def __init__(self, models_dir=MODELS_PATH, ttl=CONFIG_CATALOG_TTL, resync_interval=CONFIG_CATALOG_RESYNC):
+        self.models_dir = models_dir
+        self.ttl = ttl
+        self.resync_interval = resync_interval
+        self.event_driven = False
+        self.version = 0
+        self._entries = {}
+        self._scanned_at = None
+        self._lock = threading.Lock()
+        self._observer = None
+
+    def _scan(self):
+        entries = {}
+        try:
+            with os.scandir(self.models_dir) as iterator:
+                for entry in iterator:
+                    if not _is_config(entry.name) or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    cached = self._entries.get(entry.name)
+                    if cached and cached.mtime == stat.st_mtime and cached.size == stat.st_size:
+                        entries[entry.name] = cached
+                    else:
+                        entries[entry.name] = ConfigSummary.from_file(entry.path, stat)
+        except OSError:
+            pass
+        if entries != self._entries:
+            self._entries = entries
+            self.version += 1
+        self._scanned_at = time.monotonic()
+
+    def refresh(self, file=None):
+        """Re-read one file (or rescan everything) right away, e.g. after the editor wrote to it"""
+        with self._lock:
+            if file is None or self._scanned_at is None:
+                self._scan()
+                return
+            path = os.path.join(self.models_dir, file)
+            try:
+                summary = ConfigSummary.from_file(path, os.stat(path))
+            except OSError:
+                summary = None
+            if summary is None:
+                changed = self._entries.pop(file, None) is not None
+            else:
+                changed = self._entries.get(file) != summary
+                self._entries[file] = summary
+            if changed:
+                self.version += 1
+
+    def entries(self):
+        """Return all summaries, rescanning only when the current listing is too old"""
+        max_age = self.resync_interval if self.event_driven else self.ttl
+        with self._lock:
+            if self._scanned_at is None or time.monotonic() - self._scanned_at >= max_age:
+                self._scan()
+            return list(self._entries.values())
+
+    def get(self, file):
+        with self._lock:
+            return self._entries.get(file)
+
+    def model_configs(self):
+        """Every ModelConfig in the directory, in file order, parsed only when its file changed"""
+        return [config for entry in sorted(self.entries(), key=lambda entry: entry.file) for config in entry.configs]
+
+    def search(self, query="", sort_by="file", reverse=False):
+        """Filter by a substring of file, model name, backend or model file, then sort"""
+        entries = self.entries()
+        if query:
+            entries = [entry for entry in entries if entry.matches(query)]
+        # Missing values sort last whichever way round
+        present = [entry for entry in entries if getattr(entry, sort_by) is not None]
+        missing = [entry for entry in entries if getattr(entry, sort_by) is None]
+        present.sort(key=lambda entry: _sort_key(getattr(entry, sort_by)), reverse=reverse)
+        return present + sorted(missing, key=lambda entry: entry.file)
+
+    def watch(self):
+        """Keep the catalog in sync with inotify (via watchdog); falls back to the TTL when unavailable"""
+        if self._observer is not None:
+            return self.event_driven
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return False
+
+        catalog = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory or event.event_type not in WATCHED_EVENTS:
+                    return
+                for path in (event.src_path, getattr(event, "dest_path", "")):
+                    name = os.path.basename(path or "")
+                    if _is_config(name):
+                        catalog.refresh(name)
+
+        observer = Observer()
+        try:
+            observer.schedule(Handler(), self.models_dir, recursive=False)
+            observer.daemon = True
+            observer.start()
+        except OSError:
+            # Missing directory, inotify watch limits or a filesystem without notifications
+            return False
+        self._observer = observer
+        self.event_driven = True
+        return True
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+        self.event_driven = False
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_config_catalog(models_dir=MODELS_PATH):
+    """Return the process-wide catalog for a models directory, watching it on first use"""
+    with _catalogs_lock:
+        catalog = _catalogs.get(models_dir)
+        if catalog is None:
+            catalog = _catalogs[models_dir] = ConfigCatalog(models_dir)
+            catalog.watch()
+        return catalog
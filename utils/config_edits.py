@@ -0,0 +1,266 @@
+import difflib
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+
+import yaml
+
+# Backups go to <models dir>/<CONFIG_BACKUP_DIR>/<timestamp>/; the leading dot keeps them out of the catalog
+CONFIG_BACKUP_DIR = os.getenv("CONFIG_BACKUP_DIR", ".config_backups")
+REMOVE_PREFIX = "unset "
+
+
+@dataclass(slots=True)
+class KeyEdit:
+    """Set (or remove) the scalar at a dotted key path such as 'parameters.model'"""
+
+    path: str
+    value: object = None
+    remove: bool = False
+
+    @property
+    def keys(self):
+        return self.path.split(".")
+
+    def __str__(self):
+        return f"{REMOVE_PREFIX}{self.path}" if self.remove else f"{self.path}: {_scalar_text(self.value)}"
+
+
+@dataclass(slots=True)
+class FileEdit:
+    """The planned change of one config file; sha256 is the content the plan was made from"""
+
+    file: str
+    path: str
+    original: str
+    updated: str = None
+    sha256: str = ""
+    error: str = ""
+
+    @property
+    def changed(self):
+        return not self.error and self.updated is not None and self.updated != self.original
+
+    def diff(self):
+        return "".join(difflib.unified_diff(
+            self.original.splitlines(keepends=True),
+            self.updated.splitlines(keepends=True),
+            fromfile=f"a/{self.file}",
+            tofile=f"b/{self.file}",
+        ))
+
+
+def parse_edits(text):
+    """Parse one edit per line: 'key.path: value' sets a value, 'unset key.path' removes the key"""
+    edits = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith(REMOVE_PREFIX):
+            edits.append(KeyEdit(line[len(REMOVE_PREFIX):].strip(), remove=True))
+            continue
+        path, separator, value = line.partition(":")
+        if not separator or not path.strip():
+            raise ValueError(f"Line {number}: expected 'key.path: value' or '{REMOVE_PREFIX}key.path'")
+        try:
+            value = yaml.safe_load(value) if value.strip() else None
+        except yaml.YAMLError as e:
+            raise ValueError(f"Line {number}: invalid value: {e}") from e
+        if isinstance(value, (dict, list)):
+            raise ValueError(f"Line {number}: only single values can be set, not lists or mappings")
+        edits.append(KeyEdit(path.strip(), value))
+    return edits
+
+
+def _scalar_text(value):
+    text = yaml.safe_dump(value, default_flow_style=True, allow_unicode=True, width=float("inf"))
+    if text.endswith("\n...\n"):
+        text = text[:-len("\n...\n")]
+    return text.strip()
+
+
+def _last_line(lines, key_node, value_node):
+    """0-based index of the last line a key's value occupies
+
+    PyYAML ends a block mapping, list or block scalar after the blank and
+    comment lines that follow it, which belong to whatever comes next. So
+    collections are followed down to their last value and trailing blank
+    lines of a block scalar are left out.
+    """
+    node = value_node
+    while isinstance(node, (yaml.MappingNode, yaml.SequenceNode)) and node.value and not node.flow_style:
+        node = node.value[-1][1] if isinstance(node, yaml.MappingNode) else node.value[-1]
+    end = node.end_mark
+    line = end.line - 1 if end.column == 0 and end.line > node.start_mark.line else end.line
+    line = min(line, len(lines) - 1)
+    while line > key_node.start_mark.line and not lines[line].strip():
+        line -= 1
+    return max(line, key_node.start_mark.line)
+
+
+def _replace(text, path, key_node, value_node, value):
+    if not isinstance(value_node, yaml.ScalarNode):
+        kind = "mapping" if isinstance(value_node, yaml.MappingNode) else "list"
+        raise ValueError(f"'{path}' holds a {kind}; only single values can be set")
+    start, end = value_node.start_mark.index, value_node.end_mark.index
+    new = _scalar_text(value)
+    if start == end:
+        # 'key:' with no value ends right after the colon
+        new = f" {new}"
+    elif value_node.style in ("|", ">"):
+        # Block scalars own their line breaks; keep the blank lines after the last one
+        lines = text.splitlines(keepends=True)
+        end = sum(len(line) for line in lines[:_last_line(lines, key_node, value_node) + 1])
+        new += "\n"
+    return text[:start] + new + text[end:]
+
+
+def _remove(text, path, key_node, value_node):
+    lines = text.splitlines(keepends=True)
+    first = key_node.start_mark.line
+    if lines[first][:key_node.start_mark.column].strip():
+        raise ValueError(f"'{path}' starts a list entry and can't be removed on its own")
+    del lines[first:_last_line(lines, key_node, value_node) + 1]
+    return "".join(lines)
+
+
+def _insert(text, mapping, keys, value):
+    lines = text.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    if mapping is None or not mapping.value:
+        indent, position = 0, len(lines)
+    else:
+        indent = mapping.value[0][0].start_mark.column
+        last_key, last_value = mapping.value[-1]
+        position = _last_line(lines, last_key, last_value) + 1
+    new_lines = [f"{' ' * (indent + 2 * depth)}{key}:\n" for depth, key in enumerate(keys[:-1])]
+    new_lines.append(f"{' ' * (indent + 2 * (len(keys) - 1))}{keys[-1]}: {_scalar_text(value)}\n")
+    lines[position:position] = new_lines
+    return "".join(lines)
+
+
+def _edit_document(text, mapping, edit):
+    node = mapping
+    keys = edit.keys
+    for depth, key in enumerate(keys):
+        path = ".".join(keys[:depth + 1])
+        if node is not None and not isinstance(node, yaml.MappingNode):
+            raise ValueError(f"'{'.'.join(keys[:depth])}' is not a mapping")
+        if node is not None and node.flow_style and node.value:
+            raise ValueError(f"'{'.'.join(keys[:depth]) or 'document'}' is written in flow style ({{...}}) and can't be edited in place")
+        found = next(((k, v) for k, v in node.value if k.value == key), None) if node is not None else None
+        if found is None:
+            return text if edit.remove else _insert(text, node, keys[depth:], edit.value)
+        key_node, value_node = found
+        if depth == len(keys) - 1:
+            if edit.remove:
+                return _remove(text, path, key_node, value_node)
+            return _replace(text, path, key_node, value_node, edit.value)
+        node = value_node
+    return text
+
+
+def apply_edits(text, edits):
+    """Apply key-path edits to YAML text, leaving comments, order and formatting of everything else untouched
+
+    Values are spliced into the original text at the positions PyYAML
+    reports for each node, so only the edited lines change. A file holding a
+    list of models gets every edit applied to each entry.
+    """
+    for edit in edits:
+        try:
+            root = yaml.compose(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"YAML error: {str(e).splitlines()[0]}") from e
+        if isinstance(root, yaml.SequenceNode):
+            documents = [item for item in root.value if isinstance(item, yaml.MappingNode)]
+        elif root is None or isinstance(root, yaml.MappingNode):
+            documents = [root]
+        else:
+            raise ValueError("Config is not a mapping of settings")
+        if root is not None and root.flow_style and root.value:
+            raise ValueError("Configs written in flow style can't be edited in place")
+        # Later entries first, so the offsets of earlier ones stay valid
+        for document in reversed(documents):
+            text = _edit_document(text, document, edit)
+    return text
+
+
+def plan_bulk_edit(models_dir, files, edits):
+    """Compute the new content of every selected file without writing anything"""
+    plans = []
+    for file in files:
+        path = os.path.join(models_dir, file)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError as e:
+            plans.append(FileEdit(file, path, "", error=str(e)))
+            continue
+        plan = FileEdit(file, path, "", sha256=hashlib.sha256(content).hexdigest())
+        try:
+            plan.original = content.decode("utf-8")
+            plan.updated = apply_edits(plan.original, edits)
+        except UnicodeDecodeError as e:
+            plan.error = f"Not valid UTF-8: {e.reason} at byte {e.start}"
+        except ValueError as e:
+            plan.error = str(e)
+        plans.append(plan)
+    return plans
+
+
+def backup_dir_for(models_dir):
+    return os.path.join(models_dir, CONFIG_BACKUP_DIR, time.strftime("%Y%m%d-%H%M%S"))
+
+
+def write_atomic(path, text, backup_dir=None):
+    """Replace path with text via a temp file and rename, so readers never see a partial file
+
+    With backup_dir the current file is copied there first; returns the backup path.
+    """
+    directory = os.path.dirname(path) or "."
+    backup = None
+    if backup_dir and os.path.exists(path):
+        os.makedirs(backup_dir, exist_ok=True)
+        backup = os.path.join(backup_dir, os.path.basename(path))
+        shutil.copy2(path, backup)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return backup
+
+
+def apply_bulk_edit(plans, backup_dir):
+    """Write every changed plan, skipping files modified since the plan was made
+
+    Returns (written files, {file: error}).
+    """
+    written, errors = [], {}
+    for plan in plans:
+        if not plan.changed:
+            continue
+        try:
+            with open(plan.path, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() != plan.sha256:
+                    errors[plan.file] = "File changed since the preview; preview again"
+                    continue
+            write_atomic(plan.path, plan.updated, backup_dir)
+            written.append(plan.file)
+        except OSError as e:
+            errors[plan.file] = str(e)
+    return written, errors
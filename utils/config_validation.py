@@ -0,0 +1,337 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+import yaml
+from yamllint import linter
+from yamllint.config import YamlLintConfig
+
+from utils.model_configs import MODELS_PATH
+
+TEMPLATE_FILE = "custom_configs/model_template.yaml"
+VALIDATION_WORKERS = int(os.getenv("CONFIG_VALIDATION_WORKERS", str(os.cpu_count() or 1)))
+# Worker processes are not forked from the threaded Streamlit server where a fork server is available
+VALIDATION_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+LINT_CONFIG = YamlLintConfig("extends: default")
+# Common LocalAI settings the template does not show, so they are not reported as unknown
+EXTRA_KEYS = {
+    "description": str,
+    "usage": str,
+    "threads": int,
+    "mmap": bool,
+    "mmlock": bool,
+    "low_vram": bool,
+    "numa": bool,
+    "embeddings": bool,
+    "main_gpu": str,
+    "tensor_split": str,
+    "system_prompt": str,
+    "known_usecases": list,
+    "download_files": list,
+    "prompt_cache_path": str,
+    "prompt_cache_all": bool,
+    "function": dict,
+    "parameters.temperature": float,
+    "parameters.top_p": float,
+    "parameters.top_k": int,
+    "parameters.max_tokens": int,
+    "parameters.seed": int,
+    "parameters.repeat_penalty": float,
+}
+REQUIRED_KEYS = ("name",)
+# parameters.model values that are fetched by LocalAI rather than read from MODELS_PATH
+REMOTE_MODEL_PREFIXES = ("http://", "https://", "huggingface://", "hf://", "ollama://", "oci://", "github:")
+
+
+@dataclass(slots=True)
+class ValidationIssue:
+    """One problem found in a config file"""
+
+    file: str
+    severity: str
+    message: str
+    line: int = None
+    source: str = "schema"
+
+
+@dataclass(slots=True)
+class FileValidation:
+    """All issues of one file; cached marks results reused from an earlier run"""
+
+    file: str
+    sha256: str = ""
+    issues: list = field(default_factory=list)
+    names: list = field(default_factory=list)
+    model_files: list = field(default_factory=list)
+    cached: bool = False
+
+    @property
+    def errors(self):
+        return sum(1 for issue in self.issues if issue.severity == "error")
+
+
+def lint_yaml(text):
+    """yamllint problems of a YAML document, using the shared lint config"""
+    return list(linter.run(text, LINT_CONFIG))
+
+
+def schema_from_template(template):
+    """Map dotted key paths of the template (e.g. 'parameters.model') to their value types"""
+    schema = {}
+
+    def walk(data, prefix):
+        for key, value in data.items():
+            path = f"{prefix}{key}"
+            schema[path] = type(value)
+            if isinstance(value, dict):
+                walk(value, f"{path}.")
+
+    walk(template or {}, "")
+    for path, value_type in EXTRA_KEYS.items():
+        schema.setdefault(path, value_type)
+    return schema
+
+
+def _key_lines(text):
+    """Map each '<document index>:<dotted key path>' to its 1-based line number"""
+    lines = {}
+
+    def walk(node, prefix):
+        if not isinstance(node, yaml.MappingNode):
+            return
+        for key_node, value_node in node.value:
+            path = f"{prefix}{key_node.value}"
+            lines.setdefault(path, key_node.start_mark.line + 1)
+            walk(value_node, f"{path}.")
+
+    try:
+        root = yaml.compose(text)
+    except yaml.YAMLError:
+        return lines
+    if isinstance(root, yaml.SequenceNode):
+        for index, item in enumerate(root.value):
+            walk(item, f"{index}:")
+    else:
+        walk(root, "0:")
+    return lines
+
+
+def _type_name(value_type):
+    return {str: "a string", int: "a number", float: "a number", bool: "true/false", dict: "a mapping", list: "a list"}.get(
+        value_type, value_type.__name__
+    )
+
+
+def _type_matches(value, expected):
+    if value is None:
+        return True
+    if expected in (int, float):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if expected is str:
+        # LocalAI reads scalars like tensor_split: 90,10 or gpu ids as strings
+        return isinstance(value, (str, int, float))
+    return isinstance(value, expected)
+
+
+def check_schema(file, data, schema, lines, index=0):
+    """Known keys, value types and required keys of one parsed config"""
+    issues = []
+    if not isinstance(data, dict):
+        return [ValidationIssue(file, "error", "Config must be a mapping of settings", lines.get(f"{index}:"))]
+
+    def walk(mapping, prefix):
+        for key, value in mapping.items():
+            path = f"{prefix}{key}"
+            line = lines.get(f"{index}:{path}")
+            expected = schema.get(path)
+            if expected is None:
+                issues.append(ValidationIssue(file, "info", f"Unknown key '{path}'", line))
+            elif not _type_matches(value, expected):
+                issues.append(ValidationIssue(
+                    file, "error", f"'{path}' should be {_type_name(expected)}, got {type(value).__name__}", line
+                ))
+            elif isinstance(value, dict):
+                walk(value, f"{path}.")
+
+    walk(data, "")
+    for path in REQUIRED_KEYS:
+        if data.get(path) in (None, ""):
+            issues.append(ValidationIssue(file, "error", f"Missing required key '{path}'"))
+    return issues
+
+
+def check_content(file, text, schema):
+    """Lint and schema-check one config's text, returning (issues, names, model files)
+
+    Runs in the validation worker processes, so it only uses its arguments
+    and module-level settings.
+    """
+    issues = [
+        ValidationIssue(file, "error" if problem.level == "error" else "warning",
+                        problem.message, problem.line, "lint")
+        for problem in lint_yaml(text)
+    ]
+    try:
+        data = yaml.safe_load(text)
+    except yaml.YAMLError:
+        # yamllint already reported the syntax error with its line
+        return issues, [], []
+    documents = data if isinstance(data, list) else [data]
+    lines = _key_lines(text)
+    names = []
+    model_files = []
+    for index, document in enumerate(documents):
+        issues.extend(check_schema(file, document, schema, lines, index))
+        if not isinstance(document, dict):
+            continue
+        if document.get("name"):
+            names.append(str(document["name"]))
+        parameters = document.get("parameters")
+        model = parameters.get("model") if isinstance(parameters, dict) else None
+        if isinstance(model, str) and model and not model.startswith(REMOTE_MODEL_PREFIXES):
+            model_files.append(model)
+    return issues, names, model_files
+
+
+class ConfigValidator:
+    """Lints and schema-checks every model config, caching results by file content hash
+
+    Lint and schema results only depend on the file content, so they are
+    reused while the hash is unchanged. Whether parameters.model exists and
+    whether names are unique depend on other files and are checked on every run.
+    """
+
+    def __init__(self, template_file=TEMPLATE_FILE, workers=VALIDATION_WORKERS):
+        self.template_file = template_file
+        self.workers = max(1, workers)
+        self._cache = {}
+        self._schema = None
+        self._schema_mtime = None
+        self._lock = threading.Lock()
+
+    @property
+    def schema(self):
+        try:
+            mtime = os.path.getmtime(self.template_file)
+        except OSError:
+            mtime = None
+        with self._lock:
+            if self._schema is None or mtime != self._schema_mtime:
+                try:
+                    with open(self.template_file) as f:
+                        template = yaml.safe_load(f)
+                except (OSError, yaml.YAMLError):
+                    template = {}
+                self._schema = schema_from_template(template if isinstance(template, dict) else {})
+                self._schema_mtime = mtime
+                # A changed template invalidates every schema result
+                self._cache.clear()
+            return self._schema
+
+    def _read(self, path):
+        """Return a FileValidation, cached or failed, or (file, sha256, text) when it needs checking"""
+        file = os.path.basename(path)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError as e:
+            return FileValidation(file, issues=[ValidationIssue(file, "error", str(e), source="io")])
+        sha256 = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            cached = self._cache.get(sha256)
+        if cached is not None:
+            issues, names, model_files = cached
+            # The cache is shared between files with identical content
+            issues = [ValidationIssue(file, i.severity, i.message, i.line, i.source) for i in issues]
+            return FileValidation(file, sha256, issues, list(names), list(model_files), cached=True)
+        return file, sha256, content.decode("utf-8", errors="replace")
+
+    def _store(self, file, sha256, checked):
+        issues, names, model_files = checked
+        with self._lock:
+            self._cache[sha256] = (issues, names, model_files)
+        return FileValidation(file, sha256, list(issues), list(names), list(model_files))
+
+    def _check_all(self, pending, schema):
+        """check_content for each (file, sha256, text), on worker processes when there is more than one
+
+        yamllint and the schema walk are pure Python and hold the GIL, so
+        threads would run them one at a time; processes use every core.
+        """
+        if len(pending) < 2 or self.workers < 2:
+            return [check_content(file, text, schema) for file, _, text in pending]
+        files = [file for file, _, _ in pending]
+        texts = [text for _, _, text in pending]
+        try:
+            context = multiprocessing.get_context(VALIDATION_START_METHOD)
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pending)), mp_context=context) as executor:
+                return list(executor.map(check_content, files, texts, [schema] * len(pending)))
+        except (OSError, NotImplementedError, BrokenProcessPool):
+            # Containers without working semaphores or process limits: check in this process
+            return [check_content(file, text, schema) for file, _, text in pending]
+
+    def validate_file(self, path, schema=None):
+        read = self._read(path)
+        if isinstance(read, FileValidation):
+            return read
+        file, sha256, text = read
+        return self._store(file, sha256, check_content(file, text, schema or self.schema))
+
+    def validate_all(self, models_dir=MODELS_PATH, files=None):
+        """Validate every config in models_dir, checking changed files in parallel, one FileValidation per file"""
+        if files is None:
+            try:
+                files = sorted(
+                    name for name in os.listdir(models_dir)
+                    if name.endswith((".yaml", ".yml")) and not name.startswith(".")
+                )
+            except OSError:
+                return []
+        schema = self.schema
+        results = [self._read(os.path.join(models_dir, name)) for name in files]
+        pending = [read for read in results if not isinstance(read, FileValidation)]
+        checked = iter(self._check_all(pending, schema))
+        results = [
+            read if isinstance(read, FileValidation) else self._store(*read[:2], next(checked))
+            for read in results
+        ]
+
+        # One entry per definition, so a name repeated inside a list-style file counts too
+        owners = {}
+        for result in results:
+            for name in result.names:
+                owners.setdefault(name, []).append(result.file)
+            for model in result.model_files:
+                if not os.path.exists(os.path.join(models_dir, model)):
+                    result.issues.append(ValidationIssue(
+                        result.file, "error", f"parameters.model '{model}' does not exist in {models_dir}", source="fleet"
+                    ))
+        for result in results:
+            for name in dict.fromkeys(result.names):
+                if len(owners[name]) < 2:
+                    continue
+                repeats = result.names.count(name)
+                others = ", ".join(sorted(set(file for file in owners[name] if file != result.file)))
+                if repeats > 1:
+                    message = f"Model name '{name}' is defined {repeats} times in this file"
+                    message += f" and is also used by {others}" if others else ""
+                else:
+                    message = f"Model name '{name}' is also used by {others}"
+                result.issues.append(ValidationIssue(result.file, "error", message, source="fleet"))
+        return results
+
+
+_validator = None
+_validator_lock = threading.Lock()
+
+
+def get_config_validator():
+    global _validator
+    with _validator_lock:
+        if _validator is None:
+            _validator = ConfigValidator()
+        return _validator
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+
+from utils.docker_client import get_client, summarize_container
+
+INVENTORY_TTL = float(os.getenv("DOCKER_INVENTORY_TTL", "5"))
+# Safety full rescan interval while the events stream keeps the inventory current
+INVENTORY_RESYNC = float(os.getenv("DOCKER_INVENTORY_RESYNC", "300"))
+RUNNING_STATES = ("running", "paused", "restarting")
+
+
+class InventorySnapshot:
+    """Point-in-time container listing split into running and stopped"""
+
+    def __init__(self, containers, fetched_at, version=0):
+        self.containers = containers
+        self.fetched_at = fetched_at
+        self.version = version
+        self.running = [c for c in containers if c.get("State") in RUNNING_STATES]
+        self.stopped = [c for c in containers if c.get("State") not in RUNNING_STATES]
+
+    @property
+    def age(self):
+        return time.monotonic() - self.fetched_at
+
+
+class ContainerInventory:
+    """Process-wide container list refreshed at most once per TTL
+
+    Concurrent callers that find the snapshot stale wait on a single
+    refresh instead of each querying Docker. While an events subscriber
+    is attached (event_driven) the snapshot is patched per event and
+    only fully rescanned every resync_interval seconds.
+    """
+
+    def __init__(self, client=None, ttl=INVENTORY_TTL, resync_interval=INVENTORY_RESYNC):
+        self.client = client or get_client()
+        self.ttl = ttl
+        self.resync_interval = resync_interval
+        self.event_driven = False
+        self.version = 0
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+
+    def _fresh(self, snapshot, max_age):
+        return snapshot is not None and snapshot.age < max_age
+
+    def _publish(self, containers, fetched_at, changed=True):
+        if changed:
+            self.version += 1
+        self._snapshot = InventorySnapshot(containers, fetched_at, self.version)
+        return self._snapshot
+
+    def get(self, max_age=None):
+        """Return the current snapshot, refreshing it if older than max_age (default: ttl)"""
+        if max_age is None:
+            max_age = self.resync_interval if self.event_driven else self.ttl
+        snapshot = self._snapshot
+        if self._fresh(snapshot, max_age):
+            return snapshot
+        with self._refresh_lock:
+            # Another caller may have refreshed while we waited for the lock
+            snapshot = self._snapshot
+            if self._fresh(snapshot, max_age):
+                return snapshot
+            containers = [summarize_container(c) for c in self.client.list_containers(all=True)]
+            changed = snapshot is None or containers != snapshot.containers
+            return self._publish(containers, time.monotonic(), changed)
+
+    def update_container(self, container_id):
+        """Re-read a single container and patch it into the snapshot"""
+        listed = self.client.list_containers(all=True, filters={"id": [container_id]})
+        with self._refresh_lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            short_id = container_id[:12]
+            containers = [c for c in snapshot.containers if c.get("ID") != short_id]
+            containers.extend(summarize_container(c) for c in listed)
+            containers.sort(key=lambda c: c.get("Created") or 0, reverse=True)
+            self._publish(containers, snapshot.fetched_at)
+
+    def invalidate(self):
+        """Force the next get() to query Docker, e.g. after a container action"""
+        self._snapshot = None
+
+
+_inventory = None
+_inventory_lock = threading.Lock()
+
+
+def get_inventory():
+    """Return the process-wide inventory shared by every dashboard session"""
+    global _inventory
+    with _inventory_lock:
+        if _inventory is None:
+            _inventory = ContainerInventory()
+        return _inventory
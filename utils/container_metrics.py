@@ -0,0 +1,100 @@
+from dataclasses import dataclass, fields
+
+from utils.formatting import human_size
+
+
+@dataclass(slots=True)
+class ContainerMetrics:
+    """One parsed stats sample; sizes are bytes and CPU time is nanoseconds"""
+
+    timestamp: float = 0.0
+    cpu_percent: float = 0.0
+    cpu_total_ns: float = 0.0
+    mem_usage: float = 0.0
+    mem_limit: float = 0.0
+    net_rx: float = 0.0
+    net_tx: float = 0.0
+    block_read: float = 0.0
+    block_write: float = 0.0
+
+    @classmethod
+    def from_stats(cls, stats, timestamp=0.0):
+        """Parse a raw /containers/{id}/stats API sample"""
+        cpu = stats.get("cpu_stats") or {}
+        precpu = stats.get("precpu_stats") or {}
+        cpu_total = (cpu.get("cpu_usage") or {}).get("total_usage", 0)
+        cpu_delta = cpu_total - (precpu.get("cpu_usage") or {}).get("total_usage", 0)
+        system_delta = cpu.get("system_cpu_usage", 0) - precpu.get("system_cpu_usage", 0)
+        online_cpus = cpu.get("online_cpus") or len((cpu.get("cpu_usage") or {}).get("percpu_usage") or []) or 1
+        cpu_percent = cpu_delta / system_delta * online_cpus * 100.0 if system_delta > 0 and cpu_delta > 0 else 0.0
+
+        memory = stats.get("memory_stats") or {}
+        mem_stats = memory.get("stats") or {}
+        # Match the CLI, which excludes reclaimable page cache from usage
+        mem_usage = memory.get("usage", 0) - mem_stats.get("total_inactive_file", mem_stats.get("inactive_file", 0))
+
+        networks = list((stats.get("networks") or {}).values())
+
+        block_read = block_write = 0
+        for entry in (stats.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []:
+            op = entry.get("op", "").lower()
+            if op == "read":
+                block_read += entry.get("value", 0)
+            elif op == "write":
+                block_write += entry.get("value", 0)
+
+        return cls(
+            timestamp=timestamp,
+            cpu_percent=cpu_percent,
+            cpu_total_ns=cpu_total,
+            mem_usage=max(mem_usage, 0),
+            mem_limit=memory.get("limit", 0),
+            net_rx=sum(n.get("rx_bytes", 0) for n in networks),
+            net_tx=sum(n.get("tx_bytes", 0) for n in networks),
+            block_read=block_read,
+            block_write=block_write,
+        )
+
+    @property
+    def mem_percent(self):
+        return self.mem_usage / self.mem_limit * 100.0 if self.mem_limit else 0.0
+
+    @property
+    def cpu_display(self):
+        return f"{self.cpu_percent:.2f}%"
+
+    @property
+    def memory_display(self):
+        return f"{human_size(self.mem_usage, binary=True)} / {human_size(self.mem_limit, binary=True)}"
+
+    @property
+    def net_io_display(self):
+        return f"{human_size(self.net_rx)} / {human_size(self.net_tx)}"
+
+    @property
+    def block_io_display(self):
+        return f"{human_size(self.block_read)} / {human_size(self.block_write)}"
+
+
+# Numeric fields stored per sample by the stats collector
+METRIC_FIELDS = tuple(f.name for f in fields(ContainerMetrics) if f.name != "timestamp")
+
+
+def top_containers(metrics_by_name, key, limit=5):
+    """Return the (name, metrics) pairs with the highest value of the given field"""
+    ranked = [(name, m) for name, m in metrics_by_name.items() if m is not None]
+    ranked.sort(key=lambda item: getattr(item[1], key), reverse=True)
+    return ranked[:limit]
+
+
+def over_threshold(metrics_by_name, cpu_percent=None, mem_percent=None):
+    """Return (name, reason) pairs for containers above the given CPU or memory percentage"""
+    alerts = []
+    for name, m in metrics_by_name.items():
+        if m is None:
+            continue
+        if cpu_percent is not None and m.cpu_percent >= cpu_percent:
+            alerts.append((name, f"CPU {m.cpu_display}"))
+        if mem_percent is not None and m.mem_percent >= mem_percent:
+            alerts.append((name, f"Memory {m.mem_percent:.1f}% ({m.memory_display})"))
+    return alerts
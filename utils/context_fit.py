@@ -0,0 +1,278 @@
+import ast
+import re
+from dataclasses import dataclass
+
+# Leave this share of the window free before warning, sampling rarely stops exactly on budget
+CONTEXT_WARN_RATIO = 0.9
+_ACTION_RE = re.compile(r"\{\{(-?)\s*(.*?)\s*(-?)\}\}", re.DOTALL)
+
+
+def _parse(template):
+    """Split a Go template into text and action tokens, applying '{{-' / '-}}' trimming"""
+    tokens = []
+    position = 0
+    trim_next = False
+    for match in _ACTION_RE.finditer(template):
+        text = template[position:match.start()]
+        if trim_next:
+            text = text.lstrip()
+        if match.group(1):
+            text = text.rstrip()
+        if text:
+            tokens.append(("text", text))
+        action = match.group(2)
+        if not action.startswith("/*"):
+            tokens.append(("action", action))
+        trim_next = bool(match.group(3))
+        position = match.end()
+    text = template[position:]
+    if trim_next:
+        text = text.lstrip()
+    if text:
+        tokens.append(("text", text))
+    return tokens
+
+
+def _build(tokens, index=0):
+    """Turn the token list into nested nodes; returns (nodes, index, terminating action)"""
+    nodes = []
+    while index < len(tokens):
+        kind, value = tokens[index]
+        index += 1
+        if kind == "text":
+            nodes.append(("text", value))
+            continue
+        keyword = value.split(None, 1)[0] if value else ""
+        if keyword in ("end", "else"):
+            return nodes, index, value
+        if keyword in ("if", "with", "range"):
+            branches = []
+            condition = value[len(keyword):].strip()
+            while True:
+                body, index, terminator = _build(tokens, index)
+                branches.append((condition, body))
+                if terminator is None or terminator == "end":
+                    break
+                # 'else' or 'else if <cond>'
+                condition = terminator[4:].strip()
+                condition = condition[2:].strip() if condition.startswith("if") else None
+            nodes.append((keyword, branches))
+        else:
+            nodes.append(("expr", value))
+    return nodes, index, None
+
+
+def _unquote(literal):
+    """Value of a Go string literal: "..." with escapes, or `...` raw"""
+    if literal.startswith("`"):
+        return literal[1:-1]
+    try:
+        # Go and Python share the escapes templates use (\n, \t, \", \\, \u....)
+        return ast.literal_eval(literal)
+    except (ValueError, SyntaxError):
+        return literal[1:-1]
+
+
+def _tokenize(expression):
+    """Split an action into words, string literals (('str', value) tuples) and nested lists for (...) groups"""
+    root = []
+    stack = [root]
+    index = 0
+    while index < len(expression):
+        char = expression[index]
+        if char.isspace():
+            index += 1
+        elif char == "(":
+            group = []
+            stack[-1].append(group)
+            stack.append(group)
+            index += 1
+        elif char == ")":
+            if len(stack) > 1:
+                stack.pop()
+            index += 1
+        elif char in "\"`":
+            end = index + 1
+            while end < len(expression) and expression[end] != char:
+                end += 2 if char == '"' and expression[end] == "\\" else 1
+            stack[-1].append(("str", _unquote(expression[index:end + 1])))
+            index = end + 1
+        else:
+            end = index
+            while end < len(expression) and not expression[end].isspace() and expression[end] not in "()":
+                end += 1
+            stack[-1].append(expression[index:end])
+            index = end
+    return root
+
+
+def _value(argument, dot, context):
+    if argument == ".":
+        return dot
+    if argument.startswith("$."):
+        argument = argument[1:]
+        dot = context
+    if argument.startswith("."):
+        value = dot
+        for part in argument[1:].split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+    if argument in ("true", "false"):
+        return argument == "true"
+    try:
+        return int(argument)
+    except ValueError:
+        return None
+
+
+def _operand(argument, dot, context):
+    if isinstance(argument, list):
+        return _call(argument, dot, context)
+    if isinstance(argument, tuple):
+        return argument[1]
+    return _value(argument, dot, context)
+
+
+def _call(args, dot, context):
+    """Evaluate a tokenized command: a function applied to its operands, or a single operand"""
+    if not args:
+        return None
+    function, rest = args[0], args[1:]
+    if not isinstance(function, str) or function not in _FUNCTIONS:
+        return _operand(function, dot, context)
+    values = [_operand(arg, dot, context) for arg in rest]
+    if function == "eq":
+        return bool(values) and any(values[0] == other for other in values[1:])
+    if function == "ne":
+        return len(values) == 2 and values[0] != values[1]
+    if function == "not":
+        return not (values[0] if values else None)
+    # Like Go, and/or return the deciding operand rather than a bool
+    if function == "and":
+        return next((value for value in values if not value), values[-1] if values else None)
+    if function == "or":
+        return next((value for value in values if value), values[-1] if values else None)
+    if function == "len":
+        return len(values[0]) if values and values[0] is not None else 0
+    if function == "print":
+        return "".join(str(value) for value in values if value is not None)
+    return None
+
+
+_FUNCTIONS = ("eq", "ne", "not", "and", "or", "len", "print")
+
+
+def _evaluate(expression, dot, context):
+    return _call(_tokenize(expression), dot, context)
+
+
+def _render(nodes, dot, context):
+    output = []
+    for kind, value in nodes:
+        if kind == "text":
+            output.append(value)
+        elif kind == "expr":
+            result = _evaluate(value, dot, context)
+            if result is not None and not isinstance(result, bool):
+                output.append(str(result))
+            elif isinstance(result, bool):
+                output.append("true" if result else "false")
+        elif kind == "if":
+            for condition, body in value:
+                if condition is None or _evaluate(condition, dot, context):
+                    output.append(_render(body, dot, context))
+                    break
+        elif kind in ("with", "range"):
+            (expression, body), *rest = value
+            subject = _evaluate(expression, dot, context)
+            if subject and kind == "with":
+                output.append(_render(body, subject, context))
+            elif subject and kind == "range":
+                for item in subject:
+                    output.append(_render(body, item, context))
+            elif rest:
+                output.append(_render(rest[0][1], dot, context))
+    return "".join(output)
+
+
+def render_template(template, context):
+    """Render the subset of Go templates LocalAI chat templates use
+
+    Handles field output, if/else if/else, with and range blocks, the
+    eq/ne/not/and/or/len functions and whitespace trimming. Anything else
+    renders as empty, which is close enough for counting tokens.
+    """
+    nodes, _, _ = _build(_parse(template))
+    return _render(nodes, context, context)
+
+
+def build_prompt(config, messages, models_dir=None):
+    """Render messages [(role, content)] the way LocalAI would for a chat completion"""
+    chat_message = config.template("chat_message", models_dir)
+    rendered = []
+    for index, (role, content) in enumerate(messages):
+        role_prefix = config.roles.get(role, "")
+        if chat_message:
+            rendered.append(render_template(chat_message, {
+                "RoleName": role,
+                "Role": role_prefix,
+                "Content": content,
+                # Not set by LocalAI, but older templates (including ours) still use it
+                "Input": content,
+                "MessageIndex": index,
+                "LastMessage": index == len(messages) - 1,
+            }))
+        elif role_prefix:
+            rendered.append(f"{role_prefix} {content}")
+        else:
+            rendered.append(content)
+    joined = "\n".join(rendered)
+    chat = config.template("chat", models_dir)
+    if chat:
+        system = next((content for role, content in messages if role == "system"), "")
+        return render_template(chat, {"Input": joined, "SystemPrompt": system, "Functions": None})
+    return joined
+
+
+@dataclass(slots=True)
+class ContextFit:
+    """Token budget of one request against a model's configured context window"""
+
+    content_tokens: int
+    prompt_tokens: int
+    completion_tokens: int
+    context_size: int = None
+
+    @property
+    def template_overhead(self):
+        return self.prompt_tokens - self.content_tokens
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def headroom(self):
+        return None if self.context_size is None else self.context_size - self.total_tokens
+
+    @property
+    def fits(self):
+        return self.headroom is None or self.headroom >= 0
+
+    @property
+    def tight(self):
+        return self.context_size is not None and self.fits and self.total_tokens > self.context_size * CONTEXT_WARN_RATIO
+
+
+def context_fit(tokenizer, config, messages, completion_tokens, models_dir=None):
+    """Count a request's tokens with and without the model's chat template"""
+    prompt = build_prompt(config, messages, models_dir)
+    content_tokens = sum(len(tokenizer.encode(content, disallowed_special=())) for _, content in messages)
+    # Template markers like <s> or <|im_start|> are real special tokens at inference time
+    prompt_tokens = len(tokenizer.encode(prompt, allowed_special="all"))
+    return prompt, ContextFit(
+        content_tokens=content_tokens,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        context_size=config.context_size,
+    )
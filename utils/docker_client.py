@@ -0,0 +1,279 @@
+import http.client
+import json
+import os
+import queue
+import socket
+import struct
+import threading
+from urllib.parse import quote, urlencode
+
+DOCKER_SOCKET = os.getenv("DOCKER_SOCKET", "/var/run/docker.sock")
+DOCKER_API_VERSION = os.getenv("DOCKER_API_VERSION", "")
+# Use the client's timeout; passing None instead means no timeout at all
+DEFAULT_TIMEOUT = object()
+
+
+class DockerAPIError(Exception):
+    """Error returned by the Docker Engine API"""
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection that talks to a unix domain socket instead of TCP"""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def _demux_stream(data):
+    """Strip the 8 byte multiplexing headers Docker adds to non-TTY log output"""
+    if len(data) < 8 or data[0] not in (0, 1, 2) or data[1:4] != b"\x00\x00\x00":
+        return data
+    chunks = []
+    offset = 0
+    while offset + 8 <= len(data):
+        _, size = struct.unpack(">BxxxL", data[offset:offset + 8])
+        offset += 8
+        chunks.append(data[offset:offset + size])
+        offset += size
+    return b"".join(chunks)
+
+
+class DockerClient:
+    """Small Docker Engine API client using pooled keep-alive connections"""
+
+    def __init__(self, socket_path=DOCKER_SOCKET, pool_size=8, timeout=30):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _url(self, path, params=None):
+        if DOCKER_API_VERSION:
+            path = f"/v{DOCKER_API_VERSION}{path}"
+        if params:
+            params = {k: v for k, v in params.items() if v is not None}
+            path = f"{path}?{urlencode(params)}"
+        return path
+
+    def _new_connection(self, timeout=DEFAULT_TIMEOUT):
+        return UnixHTTPConnection(self.socket_path, timeout=self.timeout if timeout is DEFAULT_TIMEOUT else timeout)
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._new_connection()
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        """Close every pooled connection"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _send(self, conn, method, url, body):
+        headers = {"Host": "docker"}
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        conn.request(method, url, body=body, headers=headers)
+        return conn.getresponse()
+
+    @staticmethod
+    def _raise_for_status(response, data):
+        if response.status < 400:
+            return
+        try:
+            message = json.loads(data).get("message", "")
+        except (ValueError, AttributeError):
+            message = data.decode(errors="replace")
+        raise DockerAPIError(response.status, message or response.reason)
+
+    def request_raw(self, method, path, params=None, body=None):
+        """Send a request over a pooled connection and return the raw response body"""
+        url = self._url(path, params)
+        conn = self._acquire()
+        try:
+            try:
+                response = self._send(conn, method, url, body)
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # Idle keep-alive connection was closed by the daemon, retry once on a fresh one
+                conn.close()
+                conn = self._new_connection()
+                response = self._send(conn, method, url, body)
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        self._raise_for_status(response, data)
+        return data
+
+    def request(self, method, path, params=None, body=None):
+        """Send a request and decode the JSON response (None for empty bodies)"""
+        data = self.request_raw(method, path, params, body)
+        return json.loads(data) if data else None
+
+    def _open_stream(self, method, path, params=None, timeout=DEFAULT_TIMEOUT):
+        conn = self._new_connection(timeout=timeout)
+        try:
+            response = self._send(conn, method, self._url(path, params), None)
+            if response.status >= 400:
+                self._raise_for_status(response, response.read())
+        except Exception:
+            conn.close()
+            raise
+        return conn, response
+
+    def stream(self, method, path, params=None, timeout=DEFAULT_TIMEOUT):
+        """Open a long-lived streaming endpoint and return an iterator of its lines
+
+        The request is sent before returning, so connection errors surface
+        here. Streams use their own connection so they never hold a pooled one.
+        timeout=None waits for the next line indefinitely.
+        """
+        conn, response = self._open_stream(method, path, params, timeout)
+        return self._iter_lines(conn, response)
+
+    @staticmethod
+    def _iter_lines(conn, response):
+        try:
+            while True:
+                line = response.readline()
+                if not line:
+                    return
+                yield line
+        finally:
+            conn.close()
+
+    def stream_logs(self, container, follow=True, since=None, tail="all", timestamps=True, tty=False,
+                    timeout=DEFAULT_TIMEOUT):
+        """Yield decoded log lines, demultiplexing the stdout/stderr frames of non-TTY containers"""
+        params = {
+            "stdout": 1, "stderr": 1, "follow": int(follow),
+            "timestamps": int(timestamps), "since": since, "tail": tail,
+        }
+        conn, response = self._open_stream("GET", f"/containers/{quote(container)}/logs", params, timeout)
+        try:
+            if tty:
+                while True:
+                    line = response.readline()
+                    if not line:
+                        return
+                    yield line.decode(errors="replace").rstrip("\r\n")
+            pending = b""
+            while True:
+                header = response.read(8)
+                if len(header) < 8:
+                    if pending:
+                        yield pending.decode(errors="replace").rstrip("\r")
+                    return
+                _, size = struct.unpack(">BxxxL", header)
+                pending += response.read(size)
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    yield line.decode(errors="replace").rstrip("\r")
+        finally:
+            conn.close()
+
+    # Convenience wrappers for the endpoints used by the pages
+
+    def ping(self):
+        return self.request_raw("GET", "/_ping") == b"OK"
+
+    def list_containers(self, all=False, filters=None):
+        params = {"all": int(all)}
+        if filters:
+            params["filters"] = json.dumps(filters)
+        return self.request("GET", "/containers/json", params)
+
+    def inspect_container(self, container):
+        return self.request("GET", f"/containers/{quote(container)}/json")
+
+    def inspect_image(self, image):
+        return self.request("GET", f"/images/{quote(image)}/json")
+
+    def container_stats(self, container):
+        return self.request("GET", f"/containers/{quote(container)}/stats", {"stream": 0})
+
+    def container_logs(self, container, tail=100, stdout=True, stderr=True):
+        data = self.request_raw(
+            "GET",
+            f"/containers/{quote(container)}/logs",
+            {"stdout": int(stdout), "stderr": int(stderr), "tail": tail},
+        )
+        return _demux_stream(data).decode(errors="replace")
+
+    def start_container(self, container):
+        self.request_raw("POST", f"/containers/{quote(container)}/start")
+
+    def stop_container(self, container, timeout=None):
+        self.request_raw("POST", f"/containers/{quote(container)}/stop", {"t": timeout})
+
+    def restart_container(self, container, timeout=None):
+        self.request_raw("POST", f"/containers/{quote(container)}/restart", {"t": timeout})
+
+    def remove_container(self, container, force=False):
+        self.request_raw("DELETE", f"/containers/{quote(container)}", {"force": int(force)})
+
+
+def format_ports(ports):
+    """Render the API port list the same way `docker ps` does"""
+    rendered = []
+    for port in ports or []:
+        private = f"{port.get('PrivatePort')}/{port.get('Type', 'tcp')}"
+        if port.get("PublicPort"):
+            rendered.append(f"{port.get('IP', '0.0.0.0')}:{port['PublicPort']}->{private}")
+        else:
+            rendered.append(private)
+    return ", ".join(dict.fromkeys(rendered))
+
+
+def summarize_container(container):
+    """Map an API container entry onto the `docker ps --format json` field names"""
+    names = container.get("Names") or []
+    return {
+        "ID": container.get("Id", "")[:12],
+        "Names": names[0].lstrip("/") if names else "",
+        "Image": container.get("Image", ""),
+        "State": container.get("State", ""),
+        "Status": container.get("Status", ""),
+        "Ports": format_ports(container.get("Ports")),
+        "Created": container.get("Created"),
+    }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide Docker client shared by all pages"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DockerClient()
+        return _client
+
@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+
+from utils.container_inventory import get_inventory
+from utils.docker_client import get_client
+
+WATCHED_EVENTS = ["create", "start", "die", "stop", "restart", "pause", "unpause", "rename", "destroy", "health_status"]
+
+
+class DockerEventSubscriber:
+    """Background subscriber that patches the container inventory from the Docker events stream"""
+
+    def __init__(self, client=None, inventory=None, max_backoff=30, idle_timeout=300):
+        self.client = client or get_client()
+        self.inventory = inventory or get_inventory()
+        self.max_backoff = max_backoff
+        # The daemon sends nothing on a quiet host, so reconnect (and resync) after this long
+        self.idle_timeout = idle_timeout
+        self.connected = False
+        self.last_event = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="docker-events", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        backoff = 1
+        filters = json.dumps({"type": ["container"], "event": WATCHED_EVENTS})
+        while not self._stop.is_set():
+            try:
+                stream = self.client.stream("GET", "/events", {"filters": filters}, timeout=self.idle_timeout)
+                self.connected = True
+                self.inventory.event_driven = True
+                # Anything may have changed while we were disconnected
+                self.inventory.get(max_age=0)
+                backoff = 1
+                for line in stream:
+                    if self._stop.is_set():
+                        return
+                    if line.strip():
+                        self.handle_event(json.loads(line))
+            except TimeoutError:
+                # Quiet host, reconnect straight away
+                continue
+            except Exception:
+                pass
+            finally:
+                self.connected = False
+                self.inventory.event_driven = False
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def handle_event(self, event):
+        container_id = event.get("id") or event.get("Actor", {}).get("ID")
+        if not container_id:
+            return
+        self.last_event = (time.time(), event.get("Action") or event.get("status"), container_id)
+        self.inventory.update_container(container_id)
+
+
+_subscriber = None
+_subscriber_lock = threading.Lock()
+
+
+def get_event_subscriber():
+    """Return the process-wide events subscriber, starting it on first use"""
+    global _subscriber
+    with _subscriber_lock:
+        if _subscriber is None:
+            _subscriber = DockerEventSubscriber()
+        _subscriber.start()
+        return _subscriber
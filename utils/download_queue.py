@@ -0,0 +1,310 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from utils.hf_download import (
+    HF_DOWNLOAD_CHUNK_WORKERS,
+    HF_DOWNLOAD_FILE_WORKERS,
+    ChunkedDownloader,
+    DownloadProgress,
+    hub_headers,
+    list_remote_files,
+)
+from utils.formatting import human_size
+from utils.integrity import verify_files
+from utils.model_store import MODEL_STORE_MIN_FREE, get_model_store
+
+HF_DOWNLOAD_QUEUE_WORKERS = int(os.getenv("HF_DOWNLOAD_QUEUE_WORKERS", "1"))
+HF_DOWNLOAD_STATE_FILE = os.getenv(
+    "HF_DOWNLOAD_STATE_FILE",
+    os.path.join(os.getenv("MODELS_PATH") or "./models", ".download_queue.json"),
+)
+RATE_WINDOW_SECONDS = 10
+# Statuses of jobs that are queued or still being worked on
+ACTIVE_STATUSES = ("pending", "running", "verifying")
+# Fields written to the state file; everything else is rebuilt at runtime
+PERSISTED_FIELDS = (
+    "id", "repo_id", "revision", "filenames", "output_dir", "file_workers", "chunk_workers",
+    "status", "error", "created_at", "finished_at", "bytes_total", "flat",
+)
+
+
+class DownloadJob:
+    """A queued repository or file download and its live progress"""
+
+    def __init__(self, id, repo_id, output_dir, filenames=None, file_workers=HF_DOWNLOAD_FILE_WORKERS,
+                 chunk_workers=HF_DOWNLOAD_CHUNK_WORKERS, status="pending", error="", created_at=None,
+                 finished_at=None, bytes_total=0, revision=None, flat=False):
+        self.id = id
+        self.repo_id = repo_id
+        self.revision = revision
+        self.output_dir = output_dir
+        self.flat = flat
+        self.filenames = filenames
+        self.file_workers = file_workers
+        self.chunk_workers = chunk_workers
+        self.status = status
+        self.error = error
+        self.created_at = created_at or time.time()
+        self.finished_at = finished_at
+        self.bytes_total = bytes_total
+        self.progress = None
+        self.downloader = None
+        # True while a worker is inside _run for this job, including after a cancel until it unwinds
+        self.active = False
+        self._samples = deque()
+
+    @property
+    def target_dir(self):
+        # Flat jobs put the files straight into the models directory, as LocalAI expects
+        return self.output_dir if self.flat else os.path.join(self.output_dir, self.repo_id)
+
+    @property
+    def description(self):
+        repo = f"{self.repo_id}@{self.revision}" if self.revision else self.repo_id
+        if not self.filenames:
+            return f"{repo} (entire repository)"
+        return f"{repo}: {', '.join(self.filenames)}"
+
+    @property
+    def bytes_done(self):
+        if self.progress:
+            return self.progress.done_bytes
+        return self.bytes_total if self.status == "done" else 0
+
+    @property
+    def fraction(self):
+        return min(self.bytes_done / self.bytes_total, 1.0) if self.bytes_total else 0.0
+
+    @property
+    def rate(self):
+        """Bytes per second over the last few seconds"""
+        if not self.progress or self.status != "running":
+            return 0.0
+        now = time.monotonic()
+        done = self.progress.done_bytes
+        if not self._samples or now - self._samples[-1][0] >= 0.5:
+            self._samples.append((now, done))
+        while len(self._samples) > 2 and now - self._samples[0][0] > RATE_WINDOW_SECONDS:
+            self._samples.popleft()
+        start_time, start_bytes = self._samples[0]
+        if now - start_time < 1.0:
+            # Not enough history yet, use the average since the job started
+            return self.progress.throughput
+        return (done - start_bytes) / (now - start_time)
+
+    @property
+    def eta(self):
+        """Seconds left at the current rate, None if unknown"""
+        rate = self.rate
+        if not rate or not self.bytes_total:
+            return None
+        return max(self.bytes_total - self.bytes_done, 0) / rate
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in PERSISTED_FIELDS}
+
+
+class DownloadQueue:
+    """Server-side download queue that survives browser sessions and process restarts
+
+    Jobs run on a small worker pool inside the Streamlit server process.
+    Their state is written to a JSON file, and jobs that were pending,
+    running or verifying when the process stopped are queued again on load. The
+    chunked downloader's partial files let them pick up where they left off.
+    """
+
+    def __init__(self, state_file=HF_DOWNLOAD_STATE_FILE, workers=HF_DOWNLOAD_QUEUE_WORKERS):
+        self.state_file = state_file
+        self.workers = max(1, workers)
+        self._jobs = {}
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._load()
+        self._ids = itertools.count(max(self._jobs, default=0) + 1)
+
+    def _load(self):
+        try:
+            with open(self.state_file) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for entry in saved.get("jobs", []):
+            job = DownloadJob(**{k: v for k, v in entry.items() if k in PERSISTED_FIELDS})
+            if job.status in ACTIVE_STATUSES:
+                job.status = "pending"
+                self._pending.put(job.id)
+            self._jobs[job.id] = job
+
+    def _save(self):
+        with self._lock:
+            data = {"jobs": [job.to_dict() for job in self._jobs.values()]}
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+        except OSError:
+            # A read-only models path only costs us persistence, not the download
+            pass
+
+    def start(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"download-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(self, repo_id, output_dir, filenames=None, file_workers=HF_DOWNLOAD_FILE_WORKERS,
+               chunk_workers=HF_DOWNLOAD_CHUNK_WORKERS, revision=None, flat=False):
+        """Queue a download and return its job"""
+        job = DownloadJob(next(self._ids), repo_id, output_dir, filenames=filenames,
+                          file_workers=file_workers, chunk_workers=chunk_workers, revision=revision,
+                          flat=flat)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._save()
+        self._pending.put(job.id)
+        return job
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE_STATUSES:
+                return
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            downloader = job.downloader
+        if downloader:
+            downloader.cancel()
+        self._save()
+
+    def retry(self, job_id):
+        """Queue a failed or cancelled job again, once its previous run has finished unwinding"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.active:
+                return False
+            # A running or verifying job no worker owns was left behind and can be queued again too
+            if job.status not in ("failed", "cancelled", "running", "verifying"):
+                return False
+            job.status = "pending"
+            job.error = ""
+            job.finished_at = None
+        self._save()
+        self._pending.put(job.id)
+        return True
+
+    def clear_finished(self):
+        with self._lock:
+            self._jobs = {i: job for i, job in self._jobs.items() if job.status in ACTIVE_STATUSES or job.active}
+        self._save()
+
+    def jobs(self):
+        """Return all jobs, newest first"""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.id, reverse=True)
+
+    def _work(self):
+        while True:
+            job_id = self._pending.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                # A job queued twice must never run on two workers at once
+                if job is None or job.status != "pending" or job.active:
+                    continue
+                job.active = True
+            try:
+                self._run(job)
+            finally:
+                job.active = False
+
+    def _set_status(self, job, status, error=""):
+        """Move a job on unless it was cancelled meanwhile; returns False if it was"""
+        with self._lock:
+            if job.status == "cancelled":
+                return False
+            job.status = status
+            job.error = error
+            return True
+
+    def _run(self, job):
+        job.progress = DownloadProgress()
+        job.downloader = ChunkedDownloader(
+            file_workers=job.file_workers, chunk_workers=job.chunk_workers, headers=hub_headers()
+        )
+        try:
+            if not self._set_status(job, "running"):
+                return
+            self._save()
+            remotes = list_remote_files(job.repo_id, revision=job.revision,
+                                        filenames=set(job.filenames) if job.filenames else None)
+            if not remotes:
+                raise FileNotFoundError(f"No matching files in {job.repo_id}")
+            job.bytes_total = sum(remote.size or 0 for remote in remotes)
+            store = get_model_store()
+            plan = store.plan(remotes, job.target_dir)
+            if not plan.fits:
+                raise OSError(
+                    f"Not enough disk space: {human_size(plan.needed_bytes)} to download, "
+                    f"{human_size(plan.free_bytes)} free, {human_size(MODEL_STORE_MIN_FREE)} reserved"
+                )
+            os.makedirs(job.target_dir, exist_ok=True)
+            # Blobs we already hold are linked in and then skipped by the downloader
+            for remote in plan.linked:
+                store.link(remote.sha256, os.path.join(job.target_dir, remote.path))
+            results = job.downloader.download_files(remotes, job.target_dir, job.progress)
+            errors = [f"{path}: {error}" for path, error in results.items() if isinstance(error, Exception)]
+            if not self._set_status(job, "verifying"):
+                return
+            self._save()
+            errors.extend(self._verify(job, store, plan, results))
+            if errors:
+                self._set_status(job, "failed", "; ".join(errors))
+            else:
+                self._set_status(job, "done")
+        except Exception as e:
+            self._set_status(job, "failed", str(e))
+        finally:
+            with self._lock:
+                job.finished_at = job.finished_at or time.time()
+            self._save()
+
+    @staticmethod
+    def _verify(job, store, plan, results):
+        """Check fetched files against their LFS hashes and move the good ones into the model store"""
+        fetched = [
+            (results[remote.path], remote.sha256) for remote in plan.fetch
+            if remote.sha256 and isinstance(results.get(remote.path), str)
+        ]
+        errors = []
+        for result in verify_files(fetched):
+            if result.status == "ok":
+                store.adopt(result.path, result.sha256)
+            elif result.status == "mismatch":
+                # Remove it so a retry downloads the file again instead of trusting its size
+                os.remove(result.path)
+                errors.append(f"{os.path.relpath(result.path, job.target_dir)}: sha256 mismatch")
+            else:
+                errors.append(f"{os.path.relpath(result.path, job.target_dir)}: {result.error or result.status}")
+        return errors
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_download_queue():
+    """Return the process-wide download queue, resuming saved jobs on first use"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = DownloadQueue()
+        _queue.start()
+        return _queue
@@ -0,0 +1,8 @@
+def human_size(value, binary=False):
+    """Format a byte count with binary (KiB, MiB) or decimal (kB, MB) units"""
+    base = 1024.0 if binary else 1000.0
+    units = ["B", "KiB", "MiB", "GiB", "TiB"] if binary else ["B", "kB", "MB", "GB", "TB"]
+    for unit in units:
+        if value < base or unit == units[-1]:
+            return f"{value:.4g}{unit}"
+        value /= base
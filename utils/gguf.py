@@ -0,0 +1,193 @@
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+GGUF_MAGIC = b"GGUF"
+GGUF_DEFAULT_ALIGNMENT = 32
+GGUF_HEADER_CACHE_SIZE = int(os.getenv("GGUF_HEADER_CACHE_SIZE", "64"))
+# Arrays longer than this (tokenizer vocabularies, merges) are skipped and only their length is kept
+MAX_ARRAY_ITEMS = 64
+SPLIT_RE = re.compile(r"-(\d{5})-of-(\d{5})\.gguf$")
+
+# GGUF metadata value types: struct format per scalar type, 8 = string, 9 = array
+_SCALAR_FORMATS = {0: "<B", 1: "<b", 2: "<H", 3: "<h", 4: "<I", 5: "<i", 6: "<f", 7: "<?", 10: "<Q", 11: "<q", 12: "<d"}
+_STRING = 8
+_ARRAY = 9
+GGML_TYPES = {
+    0: "F32", 1: "F16", 2: "Q4_0", 3: "Q4_1", 6: "Q5_0", 7: "Q5_1", 8: "Q8_0", 9: "Q8_1",
+    10: "Q2_K", 11: "Q3_K", 12: "Q4_K", 13: "Q5_K", 14: "Q6_K", 15: "Q8_K",
+    16: "IQ2_XXS", 17: "IQ2_XS", 18: "IQ3_XXS", 19: "IQ1_S", 20: "IQ4_NL", 21: "IQ3_S", 22: "IQ2_S", 23: "IQ4_XS",
+    24: "I8", 25: "I16", 26: "I32", 27: "I64", 28: "F64", 29: "IQ1_M", 30: "BF16", 34: "TQ1_0", 35: "TQ2_0",
+}
+
+
+@dataclass(slots=True)
+class GGUFTensor:
+    """One entry of the tensor table; size is the distance to the next tensor's data"""
+
+    name: str
+    shape: tuple
+    type: int
+    offset: int
+    size: int = 0
+
+    @property
+    def type_name(self):
+        return GGML_TYPES.get(self.type, str(self.type))
+
+    @property
+    def layer(self):
+        """Repeating block index for 'blk.<n>.*' tensors, None for embeddings and output"""
+        if self.name.startswith("blk."):
+            return int(self.name.split(".", 2)[1])
+        return None
+
+
+@dataclass(slots=True)
+class GGUFHeader:
+    """Metadata and tensor table of a GGUF file (all split parts merged)"""
+
+    path: str
+    version: int
+    metadata: dict = field(default_factory=dict)
+    tensors: list = field(default_factory=list)
+    file_size: int = 0
+
+    @property
+    def architecture(self):
+        return self.metadata.get("general.architecture", "")
+
+    def field(self, key, default=None):
+        """Architecture-specific metadata, e.g. field('block_count') reads 'llama.block_count'"""
+        return self.metadata.get(f"{self.architecture}.{key}", default)
+
+    @property
+    def tensor_bytes(self):
+        return sum(tensor.size for tensor in self.tensors)
+
+
+class _Reader:
+    """Reads GGUF values straight out of an mmap with struct.unpack_from, without copying the file"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.offset = 0
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.buffer, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values[0] if len(values) == 1 else values
+
+    def string(self):
+        length = self.unpack("<Q")
+        start = self.offset
+        self.offset += length
+        return bytes(self.buffer[start:self.offset]).decode("utf-8", errors="replace")
+
+    def skip_string(self):
+        length = self.unpack("<Q")
+        self.offset += length
+
+    def value(self, value_type):
+        if value_type == _STRING:
+            return self.string()
+        if value_type == _ARRAY:
+            item_type, count = self.unpack("<I"), self.unpack("<Q")
+            if count > MAX_ARRAY_ITEMS:
+                self.skip_array(item_type, count)
+                return count
+            return [self.value(item_type) for _ in range(count)]
+        fmt = _SCALAR_FORMATS.get(value_type)
+        if fmt is None:
+            raise ValueError(f"Unknown GGUF value type {value_type}")
+        return self.unpack(fmt)
+
+    def skip_array(self, item_type, count):
+        if item_type == _STRING:
+            for _ in range(count):
+                self.skip_string()
+        elif item_type == _ARRAY:
+            for _ in range(count):
+                self.skip_array(self.unpack("<I"), self.unpack("<Q"))
+        else:
+            self.offset += struct.calcsize(_SCALAR_FORMATS[item_type]) * count
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size < 24:
+            raise ValueError(f"{os.path.basename(path)} is too small to be a GGUF file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:4] != GGUF_MAGIC:
+                raise ValueError(f"{os.path.basename(path)} is not a GGUF file")
+            reader = _Reader(buffer)
+            reader.offset = 4
+            version = reader.unpack("<I")
+            if version < 2:
+                raise ValueError(f"GGUF version {version} is not supported")
+            tensor_count, kv_count = reader.unpack("<QQ")
+            metadata = {}
+            for _ in range(kv_count):
+                key = reader.string()
+                metadata[key] = reader.value(reader.unpack("<I"))
+            tensors = []
+            for _ in range(tensor_count):
+                name = reader.string()
+                dims = reader.unpack("<I")
+                shape = struct.unpack_from(f"<{dims}Q", buffer, reader.offset) if dims else ()
+                reader.offset += 8 * dims
+                tensor_type, offset = reader.unpack("<IQ")
+                tensors.append(GGUFTensor(name, tuple(shape), tensor_type, offset))
+    alignment = metadata.get("general.alignment", GGUF_DEFAULT_ALIGNMENT) or GGUF_DEFAULT_ALIGNMENT
+    data_start = -(-reader.offset // alignment) * alignment
+    # Sizes from the offsets rather than a per-quant block table, so new ggml types need no update
+    ordered = sorted(tensors, key=lambda tensor: tensor.offset)
+    for tensor, following in zip(ordered, ordered[1:] + [None]):
+        end = following.offset if following else file_size - data_start
+        tensor.size = max(0, end - tensor.offset)
+    return GGUFHeader(path, version, metadata, tensors, file_size)
+
+
+def split_paths(path):
+    """All parts of a split GGUF ('...-00001-of-00003.gguf'), or just path"""
+    match = SPLIT_RE.search(path)
+    if not match:
+        return [path]
+    prefix = path[:match.start()]
+    total = int(match.group(2))
+    return [f"{prefix}-{index:05d}-of-{total:05d}.gguf" for index in range(1, total + 1)]
+
+
+_headers = OrderedDict()
+_headers_lock = threading.Lock()
+
+
+def read_gguf_header(path):
+    """Parse the header and tensor table of a GGUF (and its other split parts)
+
+    Only the pages holding the header are touched through the mmap, so
+    this stays fast for files of any size. Results are cached by path, size
+    and mtime.
+    """
+    paths = split_paths(path)
+    key = tuple((part, os.stat(part).st_size, os.stat(part).st_mtime_ns) for part in paths)
+    with _headers_lock:
+        header = _headers.get(key)
+        if header is not None:
+            _headers.move_to_end(key)
+            return header
+    parts = [_read_file(part) for part in paths]
+    header = parts[0]
+    for part in parts[1:]:
+        header.tensors.extend(part.tensors)
+        header.file_size += part.file_size
+    with _headers_lock:
+        _headers[key] = header
+        while len(_headers) > GGUF_HEADER_CACHE_SIZE:
+            _headers.popitem(last=False)
+    return header
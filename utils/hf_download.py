@@ -0,0 +1,273 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HF_DOWNLOAD_FILE_WORKERS = int(os.getenv("HF_DOWNLOAD_FILE_WORKERS", "2"))
+HF_DOWNLOAD_CHUNK_WORKERS = int(os.getenv("HF_DOWNLOAD_CHUNK_WORKERS", "4"))
+HF_DOWNLOAD_CHUNK_SIZE = int(os.getenv("HF_DOWNLOAD_CHUNK_SIZE", str(64 * 1024 * 1024)))
+READ_SIZE = 1024 * 1024
+CHUNK_RETRIES = 3
+
+
+@dataclass(slots=True)
+class RemoteFile:
+    """A file to download; size and sha256 come from the Hub metadata when known"""
+
+    path: str
+    url: str
+    size: int = None
+    sha256: str = None
+
+
+class DownloadProgress:
+    """Thread-safe byte counters shared by every worker of a download"""
+
+    def __init__(self):
+        self.total_bytes = 0
+        self.done_bytes = 0
+        self.files_total = 0
+        self.files_done = 0
+        self.current = set()
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add_total(self, size, files=1):
+        with self._lock:
+            self.total_bytes += size or 0
+            self.files_total += files
+
+    def add(self, nbytes):
+        with self._lock:
+            self.done_bytes += nbytes
+
+    def file_started(self, path):
+        with self._lock:
+            self.current.add(path)
+
+    def file_finished(self, path):
+        with self._lock:
+            self.current.discard(path)
+            self.files_done += 1
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    @property
+    def throughput(self):
+        """Average bytes per second since the download started"""
+        return self.done_bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def fraction(self):
+        return min(self.done_bytes / self.total_bytes, 1.0) if self.total_bytes else 0.0
+
+
+def list_remote_files(repo_id, revision=None, repo_type=None, filenames=None, token=None):
+    """Return RemoteFile entries (with LFS sizes and hashes) for a Hub repository"""
+    from huggingface_hub import HfApi, hf_hub_url
+
+    info = HfApi().repo_info(repo_id, revision=revision, repo_type=repo_type, files_metadata=True, token=token)
+    # Pin every URL to the resolved commit so files of one download never mix revisions
+    pinned_revision = getattr(info, "sha", None) or revision
+    files = []
+    for sibling in info.siblings or []:
+        if filenames is not None and sibling.rfilename not in filenames:
+            continue
+        lfs = sibling.lfs
+        files.append(RemoteFile(
+            path=sibling.rfilename,
+            url=hf_hub_url(repo_id, sibling.rfilename, repo_type=repo_type, revision=pinned_revision),
+            size=lfs.size if lfs else sibling.size,
+            sha256=lfs.sha256 if lfs else None,
+        ))
+    return files
+
+
+def hub_headers(token=None):
+    from huggingface_hub.utils import build_hf_headers
+
+    return build_hf_headers(token=token)
+
+
+class ChunkedDownloader:
+    """Downloads files with parallel HTTP range requests and resumable partial files
+
+    Data goes to '<dest>.part' and the completed chunk indices to
+    '<dest>.part.json', so an interrupted download continues where it
+    stopped. The final file only appears once every byte is written.
+    """
+
+    def __init__(self, file_workers=HF_DOWNLOAD_FILE_WORKERS, chunk_workers=HF_DOWNLOAD_CHUNK_WORKERS,
+                 chunk_size=HF_DOWNLOAD_CHUNK_SIZE, headers=None, session=None, timeout=60):
+        self.file_workers = max(1, file_workers)
+        self.chunk_workers = max(1, chunk_workers)
+        self.chunk_size = max(READ_SIZE, chunk_size)
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.cancelled = threading.Event()
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.file_workers * self.chunk_workers + self.file_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _headers_for(self, url, original_url):
+        # Redirect targets (the LFS CDN) use pre-signed URLs and reject our auth header
+        if urlparse(url).netloc != urlparse(original_url).netloc:
+            return {}
+        return dict(self.headers)
+
+    def _resolve(self, url):
+        """Follow redirects once and report the final URL, size and range support"""
+        response = self.session.head(url, headers=self.headers, allow_redirects=True, timeout=self.timeout)
+        response.raise_for_status()
+        size = response.headers.get("Content-Length")
+        ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        return response.url, int(size) if size is not None else None, ranges
+
+    def download_file(self, remote, dest_path, progress=None):
+        """Download one file to dest_path, resuming a previous partial download if present"""
+        progress = progress or DownloadProgress()
+        if os.path.exists(dest_path) and remote.size is not None and os.path.getsize(dest_path) == remote.size:
+            progress.add(remote.size)
+            return dest_path
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        url, size, ranges = self._resolve(remote.url)
+        if size is None:
+            size = remote.size
+        headers = self._headers_for(url, remote.url)
+        if ranges and size:
+            self._download_chunked(url, headers, size, dest_path, progress)
+        else:
+            self._download_stream(url, headers, ranges, dest_path, progress)
+        return dest_path
+
+    def _load_state(self, state_path, part_path, size):
+        try:
+            with open(state_path) as f:
+                state = json.load(f)
+            if state.get("size") == size and state.get("chunk_size") == self.chunk_size and os.path.exists(part_path):
+                return set(state.get("done", []))
+        except (OSError, ValueError):
+            pass
+        return set()
+
+    def _save_state(self, state_path, size, done):
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"size": size, "chunk_size": self.chunk_size, "done": sorted(done)}, f)
+        os.replace(tmp_path, state_path)
+
+    def _download_chunked(self, url, headers, size, dest_path, progress):
+        part_path = f"{dest_path}.part"
+        state_path = f"{part_path}.json"
+        done = self._load_state(state_path, part_path, size)
+        chunk_count = (size + self.chunk_size - 1) // self.chunk_size
+        progress.add(sum(min(self.chunk_size, size - i * self.chunk_size) for i in done))
+        state_lock = threading.Lock()
+
+        fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if not done:
+                os.ftruncate(fd, size)
+
+            def fetch_chunk(index):
+                start = index * self.chunk_size
+                end = min(start + self.chunk_size, size) - 1
+                self._fetch_range(url, headers, fd, start, end, progress)
+                with state_lock:
+                    done.add(index)
+                    self._save_state(state_path, size, done)
+
+            pending = [i for i in range(chunk_count) if i not in done]
+            with ThreadPoolExecutor(max_workers=self.chunk_workers) as executor:
+                for future in as_completed([executor.submit(fetch_chunk, i) for i in pending]):
+                    future.result()
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(part_path, dest_path)
+        os.remove(state_path)
+
+    def _fetch_range(self, url, headers, fd, start, end, progress):
+        for attempt in range(CHUNK_RETRIES):
+            offset = start
+            try:
+                if self.cancelled.is_set():
+                    raise InterruptedError("Download cancelled")
+                request_headers = dict(headers, Range=f"bytes={start}-{end}")
+                with self.session.get(url, headers=request_headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code != 206:
+                        raise IOError(f"Expected a partial response for bytes {start}-{end}, got {response.status_code}")
+                    for data in response.iter_content(READ_SIZE):
+                        if self.cancelled.is_set():
+                            raise InterruptedError("Download cancelled")
+                        os.pwrite(fd, data, offset)
+                        offset += len(data)
+                        progress.add(len(data))
+                if offset != end + 1:
+                    raise IOError(f"Short read for bytes {start}-{end}")
+                return
+            except InterruptedError:
+                progress.add(start - offset)
+                raise
+            except (requests.RequestException, IOError):
+                # Roll back the counted bytes, the whole chunk is fetched again
+                progress.add(start - offset)
+                if attempt == CHUNK_RETRIES - 1:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def _download_stream(self, url, headers, ranges, dest_path, progress):
+        """Single-connection fallback for servers without range support or unknown sizes"""
+        part_path = f"{dest_path}.part"
+        offset = os.path.getsize(part_path) if ranges and os.path.exists(part_path) else 0
+        request_headers = dict(headers)
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+        with self.session.get(url, headers=request_headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                offset = 0
+            progress.add(offset)
+            with open(part_path, "ab" if offset else "wb") as f:
+                for data in response.iter_content(READ_SIZE):
+                    if self.cancelled.is_set():
+                        raise InterruptedError("Download cancelled")
+                    f.write(data)
+                    progress.add(len(data))
+        os.replace(part_path, dest_path)
+
+    def download_files(self, remotes, output_dir, progress=None):
+        """Download many files concurrently into output_dir, returning {path: local path or exception}"""
+        progress = progress or DownloadProgress()
+        for remote in remotes:
+            progress.add_total(remote.size)
+
+        def fetch(remote):
+            progress.file_started(remote.path)
+            try:
+                return self.download_file(remote, os.path.join(output_dir, remote.path), progress)
+            finally:
+                progress.file_finished(remote.path)
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.file_workers) as executor:
+            futures = {executor.submit(fetch, remote): remote for remote in remotes}
+            for future in as_completed(futures):
+                remote = futures[future]
+                try:
+                    results[remote.path] = future.result()
+                except Exception as e:
+                    results[remote.path] = e
+        return results
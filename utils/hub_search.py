@@ -0,0 +1,112 @@
+import inspect
+import os
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+HUB_SEARCH_CACHED_QUERIES = int(os.getenv("HUB_SEARCH_CACHED_QUERIES", "16"))
+SORT_OPTIONS = {
+    "Downloads": "downloads",
+    "Likes": "likes",
+    "Trending": "trending_score",
+    "Recently updated": "last_modified",
+    "Recently created": "created_at",
+}
+
+
+def hub_list_function(repo_type, api=None):
+    """Return the HfApi listing method for a repository type"""
+    if api is None:
+        from huggingface_hub import HfApi
+
+        api = HfApi()
+    if repo_type == "model":
+        return api.list_models
+    elif repo_type == "dataset":
+        return api.list_datasets
+    elif repo_type == "space":
+        return api.list_spaces
+    else:
+        raise ValueError("Invalid repository type. Must be 'model', 'dataset', or 'space'.")
+
+
+def supported_filters(list_function, filters):
+    """Drop filters the listing method does not accept (e.g. 'task' for spaces)"""
+    parameters = inspect.signature(list_function).parameters
+    return {key: value for key, value in filters.items() if key in parameters and value not in (None, "")}
+
+
+class HubSearchPager:
+    """Pulls results from a lazy Hub listing only as far as the pages requested so far"""
+
+    def __init__(self, results, page_size=20):
+        self.page_size = page_size
+        self.items = []
+        self.exhausted = False
+        self._results = iter(results)
+        self._lock = threading.Lock()
+
+    def page(self, number):
+        """Return the items of a 1-based page, fetching more from the Hub if needed"""
+        end = number * self.page_size
+        with self._lock:
+            if len(self.items) < end and not self.exhausted:
+                fetched = list(islice(self._results, end - len(self.items)))
+                self.items.extend(fetched)
+                if len(self.items) < end:
+                    self.exhausted = True
+        return self.items[(number - 1) * self.page_size:end]
+
+    @property
+    def known_pages(self):
+        return max(1, (len(self.items) + self.page_size - 1) // self.page_size)
+
+    @property
+    def has_more(self):
+        return not self.exhausted
+
+
+class HubSearchCache:
+    """LRU cache of pagers keyed by repository type and search options"""
+
+    def __init__(self, max_queries=HUB_SEARCH_CACHED_QUERIES):
+        self.max_queries = max_queries
+        self._pagers = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(repo_type, filters, page_size):
+        return (repo_type, page_size, tuple(sorted((k, str(v)) for k, v in filters.items())))
+
+    def get(self, key):
+        with self._lock:
+            pager = self._pagers.get(key)
+            if pager is not None:
+                self._pagers.move_to_end(key)
+            return pager
+
+    def search(self, repo_type, filters, page_size=20, api=None):
+        """Return the cached pager for a query, starting a new lazy listing on a miss"""
+        list_function = hub_list_function(repo_type, api)
+        filters = supported_filters(list_function, filters)
+        key = self.key(repo_type, filters, page_size)
+        pager = self.get(key)
+        if pager is None:
+            pager = HubSearchPager(list_function(**filters), page_size)
+            with self._lock:
+                self._pagers[key] = pager
+                while len(self._pagers) > self.max_queries:
+                    self._pagers.popitem(last=False)
+        return key, pager
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HubSearchCache()
+        return _cache
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+TOKEN_CHUNK_CACHE_SIZE = int(os.getenv("TOKEN_CHUNK_CACHE_SIZE", "50000"))
+# Chunks shorter than this are merged with the next one
+MIN_CHUNK_CHARS = 256
+# On average one word in CUT_MODULUS starts a new chunk inside long paragraphs
+CUT_MODULUS = 32
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\S+")
+
+
+def split_chunks(text, min_chars=MIN_CHUNK_CHARS):
+    """Split text at content-defined boundaries so an edit only changes the chunks it touches
+
+    Cuts go right before the last whitespace character ahead of a word, at
+    newlines, blank runs, or words whose hash picks them. That is where
+    GPT-style pre-tokenizers already split, so chunks tokenize independently.
+    """
+    chunks = []
+    start = 0
+    for match in _WHITESPACE_RE.finditer(text):
+        cut = match.end() - 1
+        if match.end() >= len(text) or cut - start < min_chars:
+            continue
+        run = match.group()
+        if "\n" not in run and len(run) < 2:
+            word = _WORD_RE.match(text, match.end()).group()
+            if zlib.crc32(word.encode()) % CUT_MODULUS:
+                continue
+        chunks.append(text[start:cut])
+        start = cut
+    chunks.append(text[start:])
+    return chunks
+
+
+@dataclass(slots=True)
+class IncrementalCount:
+    """Result of one incremental count and how much work it reused"""
+
+    tokens: int
+    chunks: int = 0
+    reused_chunks: int = 0
+    encoded_chars: int = 0
+    verified: bool = False
+    exact: bool = None
+
+
+class IncrementalTokenCounter:
+    """Counts tokens chunk by chunk, memoizing per-chunk counts in a bounded LRU
+
+    The first count for each tokenizer is also checked against a full
+    encode. Tokenizers whose pattern does not split cleanly at chunk
+    boundaries are remembered and always get a full encode from then on.
+    """
+
+    def __init__(self, max_entries=TOKEN_CHUNK_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._counts = OrderedDict()
+        self._exact = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key):
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+            return count
+
+    def _store(self, key, count):
+        with self._lock:
+            self._counts[key] = count
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+    def count(self, model_name, tokenizer, text, clean_newlines=True, verify=False):
+        """Count tokens of text, re-encoding only chunks not seen before"""
+        if self._exact.get(model_name) is False:
+            cleaned = text.replace("\n", " ") if clean_newlines else text
+            return IncrementalCount(tokens=len(tokenizer.encode(cleaned)), encoded_chars=len(cleaned), exact=False)
+
+        result = IncrementalCount(tokens=0)
+        for chunk in split_chunks(text):
+            if clean_newlines:
+                chunk = chunk.replace("\n", " ")
+            key = (model_name, hashlib.blake2b(chunk.encode(), digest_size=16).digest())
+            count = self._cached(key)
+            if count is None:
+                count = len(tokenizer.encode(chunk))
+                self._store(key, count)
+                result.encoded_chars += len(chunk)
+            else:
+                result.reused_chunks += 1
+            result.tokens += count
+            result.chunks += 1
+
+        if verify or model_name not in self._exact:
+            cleaned = text.replace("\n", " ") if clean_newlines else text
+            full_count = len(tokenizer.encode(cleaned))
+            result.verified = True
+            result.exact = full_count == result.tokens
+            self._exact[model_name] = self._exact.get(model_name, True) and result.exact
+            result.tokens = full_count
+        return result
+
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_token_counter():
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            _counter = IncrementalTokenCounter()
+        return _counter
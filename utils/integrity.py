@@ -0,0 +1,197 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MANIFEST_FILE = os.getenv(
+    "HASH_MANIFEST_FILE",
+    os.path.join(os.getenv("MODELS_PATH") or "./models", ".hash_manifest.json"),
+)
+HASH_BLOCK_SIZE = 16 * 1024 * 1024
+# Work files of the downloader and the model store, never worth hashing
+SKIPPED_SUFFIXES = (".part", ".part.json", ".tmp", ".link")
+
+
+def hash_file(path):
+    """sha256 of a file, read through mmap in large blocks
+
+    hashlib releases the GIL while digesting large buffers, so several
+    of these run truly in parallel on a thread pool.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, size, HASH_BLOCK_SIZE):
+                    digest.update(view[offset:offset + HASH_BLOCK_SIZE])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+
+@dataclass(slots=True)
+class VerifyResult:
+    """Hash check of one file; status is ok, mismatch, unverified, missing or error"""
+
+    path: str
+    size: int = 0
+    sha256: str = None
+    expected: str = None
+    status: str = "unverified"
+    cached: bool = False
+    error: str = ""
+
+
+class HashManifest:
+    """Persistent sha256 cache keyed by path and validated by size and mtime
+
+    Expected hashes from the Hub are kept alongside, so a later scan of the
+    models directory can still tell whether a file matches what was downloaded.
+    """
+
+    def __init__(self, path=HASH_MANIFEST_FILE):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                self._entries = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def save(self):
+        with self._lock:
+            data = {"files": dict(self._entries)}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def key(path):
+        return os.path.realpath(path)
+
+    def lookup(self, path, stat):
+        """Return the cached sha256 if the file is unchanged since it was hashed"""
+        with self._lock:
+            entry = self._entries.get(self.key(path))
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry.get("sha256")
+        return None
+
+    def expected(self, path):
+        with self._lock:
+            return (self._entries.get(self.key(path)) or {}).get("expected")
+
+    def record(self, path, stat, sha256=None, expected=None):
+        with self._lock:
+            entry = self._entries.setdefault(self.key(path), {})
+            if entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns:
+                entry.pop("sha256", None)
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            if sha256:
+                entry["sha256"] = sha256
+            if expected:
+                entry["expected"] = expected
+
+    def forget_missing(self):
+        with self._lock:
+            self._entries = {path: entry for path, entry in self._entries.items() if os.path.exists(path)}
+
+
+def verify_files(items, manifest=None, workers=HASH_WORKERS):
+    """Hash (path, expected sha256 or None) pairs in parallel and compare them
+
+    Unchanged files are answered from the manifest without reading them
+    again, and hard links to the same data are hashed only once.
+    """
+    manifest = manifest or get_hash_manifest()
+    results = []
+    to_hash = {}
+    for path, expected in items:
+        result = VerifyResult(path=path, expected=expected or manifest.expected(path))
+        results.append(result)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            result.status = "missing"
+            continue
+        result.size = stat.st_size
+        manifest.record(path, stat, expected=expected)
+        result.sha256 = manifest.lookup(path, stat)
+        if result.sha256:
+            result.cached = True
+        else:
+            to_hash.setdefault((stat.st_dev, stat.st_ino), []).append((result, stat))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(hash_file, entries[0][0].path): entries for entries in to_hash.values()}
+        for future, entries in futures.items():
+            try:
+                sha256 = future.result()
+            except OSError as e:
+                for result, _ in entries:
+                    result.status = "error"
+                    result.error = str(e)
+                continue
+            for result, stat in entries:
+                result.sha256 = sha256
+                manifest.record(result.path, stat, sha256=sha256)
+
+    for result in results:
+        if result.status in ("missing", "error"):
+            continue
+        if not result.expected:
+            result.status = "unverified"
+        elif result.sha256 == result.expected:
+            result.status = "ok"
+        else:
+            result.status = "mismatch"
+    manifest.save()
+    return results
+
+
+def iter_model_files(models_dir):
+    """Yield every regular file under models_dir except hidden and in-progress files"""
+    for dirpath, dirnames, filenames in os.walk(models_dir):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if name.startswith(".") or name.endswith(SKIPPED_SUFFIXES):
+                continue
+            path = os.path.join(dirpath, name)
+            if os.path.isfile(path):
+                yield path
+
+
+def verify_models_dir(models_dir, workers=HASH_WORKERS):
+    """Verify every model file against the hashes recorded when it was downloaded"""
+    manifest = get_hash_manifest()
+    manifest.forget_missing()
+    return verify_files([(path, None) for path in iter_model_files(models_dir)], manifest, workers)
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_hash_manifest():
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = HashManifest()
+        return _manifest
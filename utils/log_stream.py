@@ -0,0 +1,145 @@
+import os
+import re
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+from utils.docker_client import get_client
+
+LOG_BUFFER_LINES = int(os.getenv("LOG_BUFFER_LINES", "5000"))
+# A quiet follow stream is reopened from the cursor this often, which is also how long a stop can take
+LOG_FOLLOW_POLL_SECONDS = float(os.getenv("LOG_FOLLOW_POLL_SECONDS", "5"))
+_TIMESTAMP_RE = re.compile(r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d+))?Z ?")
+
+
+def parse_timestamp(line):
+    """Split a `timestamps=1` log line into ((seconds, nanos), message)"""
+    match = _TIMESTAMP_RE.match(line)
+    if not match:
+        return None, line
+    seconds = int(datetime.strptime(match.group(1), "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp())
+    nanos = int((match.group(2) or "0").ljust(9, "0")[:9])
+    return (seconds, nanos), line[match.end():]
+
+
+class ContainerLogBuffer:
+    """Bounded in-memory log tail for one container with a `since` cursor
+
+    Every fetch only asks Docker for lines newer than the cursor, either
+    on demand or continuously from a background follow thread.
+    """
+
+    def __init__(self, container, client=None, max_lines=LOG_BUFFER_LINES):
+        self.container = container
+        self.client = client or get_client()
+        self.lines = deque(maxlen=max_lines)
+        self.cursor = None
+        self._tty = None
+        self._lock = threading.Lock()
+        self._follow_thread = None
+        self._follow_lock = threading.Lock()
+        self._followers = set()
+        self._stop = threading.Event()
+
+    def _is_tty(self):
+        if self._tty is None:
+            self._tty = bool(self.client.inspect_container(self.container).get("Config", {}).get("Tty"))
+        return self._tty
+
+    def _since(self):
+        return f"{self.cursor[0]}.{self.cursor[1]:09d}" if self.cursor else None
+
+    def _append(self, raw_line):
+        timestamp, message = parse_timestamp(raw_line)
+        with self._lock:
+            # `since` is inclusive, so skip lines we already hold
+            if timestamp is not None and self.cursor is not None and timestamp <= self.cursor:
+                return False
+            if timestamp is not None:
+                self.cursor = timestamp
+            self.lines.append(message)
+            return True
+
+    def fetch(self, initial_tail=100):
+        """Pull lines written since the last fetch and return how many were added"""
+        tail = "all" if self.cursor else initial_tail
+        added = 0
+        for line in self.client.stream_logs(self.container, follow=False, since=self._since(),
+                                            tail=tail, tty=self._is_tty(), timeout=30):
+            added += self._append(line)
+        return added
+
+    @property
+    def following(self):
+        """A follow thread is running and has not been asked to stop"""
+        thread = self._follow_thread
+        return thread is not None and thread.is_alive() and not self._stop.is_set()
+
+    def is_following(self, viewer):
+        return self.following and viewer in self._followers
+
+    def follow(self, viewer=None, initial_tail=100):
+        """Start streaming new lines into the buffer from a background thread
+
+        The buffer is shared between sessions, so each viewer registers
+        itself and the stream runs until the last one calls stop().
+        """
+        with self._follow_lock:
+            self._followers.add(viewer)
+            if self.following:
+                return
+            # A thread that was asked to stop may still be waiting on its read; it exits on its own
+            self._stop = threading.Event()
+            self._follow_thread = threading.Thread(
+                target=self._follow, args=(initial_tail, self._stop), name=f"logs-{self.container}", daemon=True
+            )
+            self._follow_thread.start()
+
+    def stop(self, viewer=None):
+        with self._follow_lock:
+            self._followers.discard(viewer)
+            if not self._followers:
+                self._stop.set()
+
+    def _follow(self, initial_tail, stop):
+        while not stop.is_set():
+            tail = "all" if self.cursor else initial_tail
+            try:
+                for line in self.client.stream_logs(self.container, follow=True, since=self._since(), tail=tail,
+                                                    tty=self._is_tty(), timeout=LOG_FOLLOW_POLL_SECONDS):
+                    if stop.is_set():
+                        return
+                    self._append(line)
+                # The stream ends when the container stops
+                return
+            except TimeoutError:
+                # Nothing logged for a while: reconnect from the cursor, checking for a stop first
+                continue
+            except Exception:
+                # Container stopped or the daemon went away; the viewer can resume from the cursor
+                return
+
+    def view(self, pattern=None, limit=500, ignore_case=True):
+        """Return the newest buffered lines, optionally only those matching a regex or substring"""
+        with self._lock:
+            lines = list(self.lines)
+        if pattern:
+            try:
+                regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+            except re.error:
+                regex = re.compile(re.escape(pattern), re.IGNORECASE if ignore_case else 0)
+            lines = [line for line in lines if regex.search(line)]
+        return lines[-limit:]
+
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def get_log_buffer(container):
+    """Return the shared log buffer of a container, creating it on first use"""
+    with _buffers_lock:
+        buffer = _buffers.get(container)
+        if buffer is None:
+            buffer = _buffers[container] = ContainerLogBuffer(container)
+        return buffer
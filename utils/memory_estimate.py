@@ -0,0 +1,195 @@
+import bisect
+import os
+from dataclasses import dataclass, field
+
+from utils.gguf import read_gguf_header
+from utils.model_configs import MODELS_PATH
+
+# Bytes per element of the KV cache for LocalAI's cache_type_k / cache_type_v
+KV_CACHE_TYPES = {
+    "f32": 4.0, "f16": 2.0, "bf16": 2.0,
+    "q8_0": 34 / 32, "q5_1": 24 / 32, "q5_0": 22 / 32, "q4_1": 20 / 32, "q4_0": 18 / 32, "iq4_nl": 18 / 32,
+}
+# Always kept in system RAM by llama.cpp
+CPU_TENSORS = ("token_embd.weight",)
+
+
+@dataclass(slots=True)
+class DeviceUsage:
+    """Estimated memory on one device"""
+
+    device: str
+    layers: int = 0
+    weights: int = 0
+    kv_cache: int = 0
+
+    @property
+    def total(self):
+        return self.weights + self.kv_cache
+
+
+@dataclass(slots=True)
+class MemoryEstimate:
+    """Where weights and KV cache of a model config end up for its gpu_layers and context size"""
+
+    model_file: str
+    architecture: str
+    block_count: int
+    gpu_layers: int
+    context_size: int
+    kv_type: str
+    layer_bytes: list = field(default_factory=list)
+    kv_bytes_per_layer: int = 0
+    gpus: list = field(default_factory=list)
+    ram: DeviceUsage = None
+    notes: list = field(default_factory=list)
+
+    @property
+    def gpu_total(self):
+        return sum(gpu.total for gpu in self.gpus)
+
+    @property
+    def kv_total(self):
+        return sum(gpu.kv_cache for gpu in self.gpus) + self.ram.kv_cache
+
+    def rows(self):
+        return [
+            {"Device": usage.device, "Layers": usage.layers, "Weights": usage.weights,
+             "KV cache": usage.kv_cache, "Total": usage.total}
+            for usage in self.gpus + [self.ram]
+        ]
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _tensor_split(raw):
+    value = raw.get("tensor_split")
+    if value in (None, ""):
+        return []
+    parts = value if isinstance(value, list) else str(value).replace("/", ",").split(",")
+    try:
+        return [float(part) for part in parts if str(part).strip()]
+    except ValueError:
+        return []
+
+
+def _device_of_layers(start, count, splits):
+    """llama.cpp's layer split: offloaded layers go to GPUs in contiguous runs proportional to splits"""
+    total = sum(splits)
+    cumulative = []
+    running = 0.0
+    for split in splits:
+        running += split / total
+        cumulative.append(running)
+
+    def device(layer):
+        return min(bisect.bisect_right(cumulative, (layer - start) / count), len(splits) - 1)
+
+    return device
+
+
+def estimate_memory(config, models_dir=MODELS_PATH, gpu_layers=None, context_size=None):
+    """Estimate VRAM and RAM use of a ModelConfig from its GGUF header and YAML settings
+
+    Weights per layer come from the GGUF tensor table, the KV cache from the
+    attention head metadata. gpu_layers and context_size override the YAML.
+    Compute and scratch buffers of the backend are not included.
+    """
+    if not config.model_file:
+        raise ValueError("The config has no parameters.model")
+    path = os.path.join(models_dir, config.model_file)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Model file '{config.model_file}' not found in {models_dir}")
+    header = read_gguf_header(path)
+    raw = config.raw
+    notes = []
+
+    block_count = int(header.field("block_count") or 0)
+    layer_bytes = [0] * block_count
+    other = {"ram": 0, "output": 0}
+    for tensor in header.tensors:
+        layer = tensor.layer
+        if layer is not None and layer < block_count:
+            layer_bytes[layer] += tensor.size
+        elif tensor.name in CPU_TENSORS:
+            other["ram"] += tensor.size
+        else:
+            other["output"] += tensor.size
+
+    if gpu_layers is None:
+        gpu_layers = config.gpu_layers
+        if gpu_layers is None:
+            notes.append("gpu_layers is not set; assuming everything stays on the CPU")
+            gpu_layers = 0
+    offloaded = max(0, min(gpu_layers, block_count))
+    if context_size is None:
+        context_size = config.context_size
+        if context_size is None:
+            context_size = int(header.field("context_length") or 0)
+            notes.append(f"context_size is not set; using the model's trained length ({context_size})")
+
+    # Grouped-query attention: K/V only have head_count_kv heads
+    embedding = int(header.field("embedding_length") or 0)
+    heads = int(header.field("attention.head_count") or 0) or 1
+    heads_kv = header.field("attention.head_count_kv", heads)
+    if isinstance(heads_kv, list):
+        heads_kv = max(heads_kv) if heads_kv else heads
+    key_length = int(header.field("attention.key_length") or embedding // heads)
+    value_length = int(header.field("attention.value_length") or embedding // heads)
+    default_kv = "f16" if _as_bool(raw.get("f16", True)) else "f32"
+    kv_type_k = str(raw.get("cache_type_k") or default_kv).lower()
+    kv_type_v = str(raw.get("cache_type_v") or default_kv).lower()
+    for kv_type in {kv_type_k, kv_type_v} - set(KV_CACHE_TYPES):
+        notes.append(f"Unknown KV cache type '{kv_type}'; counted as f16")
+    kv_bytes_per_layer = int(context_size * int(heads_kv) * (
+        key_length * KV_CACHE_TYPES.get(kv_type_k, 2.0) + value_length * KV_CACHE_TYPES.get(kv_type_v, 2.0)
+    ))
+    kv_offload = not _as_bool(raw.get("no_kv_offloading", False))
+
+    splits = _tensor_split(raw)
+    if splits and sum(splits) > 0:
+        gpus = [DeviceUsage(f"GPU {index}") for index in range(len(splits))]
+    else:
+        splits = [1.0]
+        gpus = [DeviceUsage(f"GPU {raw.get('main_gpu') or 0}")]
+    ram = DeviceUsage("System RAM", weights=other["ram"])
+    start = block_count - offloaded
+    device_of = _device_of_layers(start, offloaded or 1, splits)
+    for layer, size in enumerate(layer_bytes):
+        if layer < start:
+            target = ram
+        else:
+            target = gpus[device_of(layer)]
+        target.layers += 1
+        target.weights += size
+        if target is ram or not kv_offload:
+            ram.kv_cache += kv_bytes_per_layer
+        else:
+            target.kv_cache += kv_bytes_per_layer
+    # The output layer counts as one extra layer: only offloaded when gpu_layers exceeds block_count
+    if gpu_layers > block_count:
+        gpus[-1].weights += other["output"]
+    else:
+        ram.weights += other["output"]
+    if not kv_offload and offloaded:
+        notes.append("no_kv_offloading is set; the KV cache stays in system RAM")
+    if gpu_layers > block_count + 1:
+        notes.append(f"gpu_layers {gpu_layers} is more than the {block_count + 1} offloadable layers")
+
+    return MemoryEstimate(
+        model_file=config.model_file,
+        architecture=header.architecture,
+        block_count=block_count,
+        gpu_layers=gpu_layers,
+        context_size=context_size,
+        kv_type=kv_type_k if kv_type_k == kv_type_v else f"{kv_type_k}/{kv_type_v}",
+        layer_bytes=layer_bytes,
+        kv_bytes_per_layer=kv_bytes_per_layer,
+        gpus=gpus,
+        ram=ram,
+        notes=notes,
+    )
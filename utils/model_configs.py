@@ -0,0 +1,103 @@
+import os
+from dataclasses import dataclass, field
+
+import yaml
+
+MODELS_PATH = os.getenv("MODELS_PATH", default="models")
+TEMPLATE_KINDS = ("chat_message", "chat", "completion")
+# Settings that name files LocalAI loads from the models directory
+REFERENCE_KEYS = ("parameters.model", "mmproj", "draft_model")
+
+
+@dataclass(slots=True)
+class ModelConfig:
+    """The parts of a LocalAI model YAML the tools work with"""
+
+    name: str
+    path: str
+    backend: str = None
+    context_size: int = None
+    gpu_layers: int = None
+    model_file: str = None
+    templates: dict = field(default_factory=dict)
+    roles: dict = field(default_factory=dict)
+    stopwords: list = field(default_factory=list)
+    max_tokens: int = None
+    raw: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data, path):
+        # A hand-edited file can hold any value here ('parameters: foo'); treat non-mappings as missing
+        parameters = data.get("parameters") if isinstance(data.get("parameters"), dict) else {}
+        templates = data.get("template") if isinstance(data.get("template"), dict) else {}
+        roles = data.get("roles") if isinstance(data.get("roles"), dict) else {}
+        stopwords = data.get("stopwords") if isinstance(data.get("stopwords"), list) else []
+        return cls(
+            name=str(data.get("name") or os.path.splitext(os.path.basename(path))[0]),
+            path=path,
+            backend=data.get("backend"),
+            context_size=_as_int(data.get("context_size")),
+            gpu_layers=_as_int(data.get("gpu_layers")),
+            model_file=parameters.get("model"),
+            templates={kind: value for kind, value in templates.items() if isinstance(value, str)},
+            roles=roles,
+            stopwords=stopwords,
+            max_tokens=_as_int(parameters.get("max_tokens")),
+            raw=data,
+        )
+
+    @property
+    def references(self):
+        """Model, projector and draft files the config points at, as written in the YAML"""
+        references = []
+        for key in REFERENCE_KEYS:
+            value = self.raw
+            for part in key.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            if isinstance(value, str) and value:
+                references.append(value)
+        return references
+
+    def template(self, kind, models_dir=None):
+        """Return a template's text; LocalAI also accepts the name of a '<name>.tmpl' file next to the YAML"""
+        value = self.templates.get(kind)
+        if not value:
+            return None
+        models_dir = models_dir or os.path.dirname(self.path)
+        if "{{" not in value:
+            for candidate in (value, f"{value}.tmpl"):
+                template_path = os.path.join(models_dir, candidate)
+                if os.path.isfile(template_path):
+                    with open(template_path) as f:
+                        return f.read()
+        return value
+
+
+def _as_int(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def load_config_file(path):
+    """Parse one YAML file into ModelConfig entries (a file may hold a list of models)"""
+    with open(path) as f:
+        data = yaml.safe_load(f)
+    entries = data if isinstance(data, list) else [data]
+    return [ModelConfig.from_dict(entry, path) for entry in entries if isinstance(entry, dict)]
+
+
+def load_model_configs(models_dir=MODELS_PATH):
+    """Return every model config in the models directory, skipping files that do not parse"""
+    configs = []
+    try:
+        names = sorted(name for name in os.listdir(models_dir) if name.endswith((".yaml", ".yml")))
+    except OSError:
+        return configs
+    for name in names:
+        try:
+            configs.extend(load_config_file(os.path.join(models_dir, name)))
+        except (OSError, yaml.YAMLError):
+            continue
+    return configs
@@ -0,0 +1,242 @@
+import errno
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+
+from utils.integrity import hash_file, verify_files
+
+MODEL_STORE_DIR = os.getenv(
+    "MODEL_STORE_DIR",
+    os.path.join(os.getenv("MODELS_PATH") or "./models", ".blobs"),
+)
+# Keep this much space free after a download; a full models disk breaks LocalAI too
+MODEL_STORE_MIN_FREE = int(os.getenv("MODEL_STORE_MIN_FREE", str(1024 ** 3)))
+# Files below this size are not worth hashing when looking for duplicates
+DEDUP_MIN_SIZE = int(os.getenv("MODEL_STORE_DEDUP_MIN_SIZE", str(1024 * 1024)))
+
+
+def allocated_size(path):
+    """Bytes actually on disk; partial downloads are sparse files"""
+    try:
+        return os.stat(path).st_blocks * 512
+    except (OSError, AttributeError):
+        return 0
+
+
+@dataclass(slots=True)
+class DownloadPlan:
+    """What a download will fetch, link from the store or skip, and whether it fits on disk"""
+
+    needed_bytes: int = 0
+    linked_bytes: int = 0
+    present_bytes: int = 0
+    free_bytes: int = 0
+    fetch: list = field(default_factory=list)
+    linked: list = field(default_factory=list)
+    present: list = field(default_factory=list)
+
+    @property
+    def fits(self):
+        return not self.needed_bytes or self.needed_bytes + MODEL_STORE_MIN_FREE <= self.free_bytes
+
+
+@dataclass(slots=True)
+class DuplicateGroup:
+    """Files with identical content that are stored more than once"""
+
+    sha256: str
+    size: int
+    paths: list
+
+    @property
+    def wasted_bytes(self):
+        return self.size * (len(self.paths) - 1)
+
+
+class ModelStore:
+    """Content-addressed blob store for model files
+
+    Blobs live in '<store>/sha256/<hash>' and the readable model files are
+    hard links to them, so one copy on disk can appear under several repos,
+    revisions or names. When a hard link is impossible (another filesystem)
+    a relative symlink is used instead, which still resolves inside a
+    container that mounts the whole models directory.
+    """
+
+    def __init__(self, root=MODEL_STORE_DIR):
+        self.root = root
+        self.blob_dir = os.path.join(root, "sha256")
+        self._lock = threading.Lock()
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blob_dir, sha256)
+
+    def has_blob(self, sha256, size=None):
+        if not sha256:
+            return False
+        try:
+            return size is None or os.path.getsize(self.blob_path(sha256)) == size
+        except OSError:
+            return False
+
+    def link(self, sha256, dest_path):
+        """Make dest_path point at a stored blob, replacing whatever was there"""
+        blob = self.blob_path(sha256)
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        if os.path.exists(dest_path) and os.path.samefile(blob, dest_path):
+            return dest_path
+        tmp_path = f"{dest_path}.link"
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(blob, tmp_path)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            os.symlink(os.path.relpath(blob, os.path.dirname(dest_path) or "."), tmp_path)
+        os.replace(tmp_path, dest_path)
+        return dest_path
+
+    def adopt(self, path, sha256=None):
+        """Move a downloaded file into the store and leave a link in its place
+
+        Returns the blob hash. When the blob already exists the file is
+        simply replaced by a link to it, freeing its space.
+        """
+        if os.path.islink(path):
+            return sha256
+        sha256 = sha256 or hash_file(path)
+        with self._lock:
+            os.makedirs(self.blob_dir, exist_ok=True)
+            blob = self.blob_path(sha256)
+            if not os.path.exists(blob):
+                try:
+                    os.link(path, blob)
+                    return sha256
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    # The store is on another filesystem: copy once, link back via symlink
+                    shutil.copy2(path, f"{blob}.tmp")
+                    os.replace(f"{blob}.tmp", blob)
+        self.link(sha256, path)
+        return sha256
+
+    def plan(self, remotes, target_dir):
+        """Split a download into files already present, files linkable from the store and files to fetch"""
+        plan = DownloadPlan(free_bytes=self.free_space(target_dir))
+        for remote in remotes:
+            size = remote.size or 0
+            dest_path = os.path.join(target_dir, remote.path)
+            if remote.size is not None and os.path.isfile(dest_path) and os.path.getsize(dest_path) == remote.size:
+                plan.present.append(remote)
+                plan.present_bytes += size
+            elif self.has_blob(remote.sha256, remote.size):
+                plan.linked.append(remote)
+                plan.linked_bytes += size
+            else:
+                plan.fetch.append(remote)
+                plan.needed_bytes += max(size - allocated_size(f"{dest_path}.part"), 0)
+        return plan
+
+    @staticmethod
+    def free_space(path):
+        path = os.path.abspath(path)
+        while not os.path.exists(path):
+            path = os.path.dirname(path)
+        return shutil.disk_usage(path).free
+
+    def usage(self):
+        """Return (blob count, bytes stored) for the blob directory"""
+        count = total = 0
+        try:
+            entries = list(os.scandir(self.blob_dir))
+        except OSError:
+            return 0, 0
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                count += 1
+                total += entry.stat(follow_symlinks=False).st_size
+        return count, total
+
+    def _symlinked_blobs(self, models_dir):
+        targets = set()
+        store_root = os.path.abspath(self.root)
+        for dirpath, dirnames, filenames in os.walk(models_dir):
+            dirnames[:] = [d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != store_root]
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if os.path.islink(path):
+                    targets.add(os.path.realpath(path))
+        return targets
+
+    def prune(self, models_dir):
+        """Delete blobs no model file links to any more, returning the bytes freed"""
+        symlinked = self._symlinked_blobs(models_dir)
+        freed = 0
+        with self._lock:
+            try:
+                entries = list(os.scandir(self.blob_dir))
+            except OSError:
+                return 0
+            for entry in entries:
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_nlink <= 1 and os.path.realpath(entry.path) not in symlinked:
+                    os.remove(entry.path)
+                    freed += stat.st_size
+        return freed
+
+    def find_duplicates(self, models_dir, min_size=DEDUP_MIN_SIZE):
+        """Find model files stored more than once (hard links to one blob are not duplicates)
+
+        Files are grouped by size first so only same-size candidates get hashed,
+        and hashes from the integrity manifest are reused.
+        """
+        by_size = {}
+        store_root = os.path.abspath(self.root)
+        for dirpath, dirnames, filenames in os.walk(models_dir):
+            dirnames[:] = [d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != store_root]
+            for name in filenames:
+                if name.endswith((".part", ".part.json", ".tmp", ".link")):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path, follow_symlinks=False)
+                except OSError:
+                    continue
+                if os.path.islink(path) or stat.st_size < min_size:
+                    continue
+                by_size.setdefault(stat.st_size, {}).setdefault((stat.st_dev, stat.st_ino), path)
+
+        candidates = [path for inodes in by_size.values() if len(inodes) > 1 for path in inodes.values()]
+        by_hash = {}
+        for result in verify_files([(path, None) for path in candidates]):
+            if result.sha256:
+                by_hash.setdefault((result.sha256, result.size), []).append(result.path)
+        return [
+            DuplicateGroup(sha256=sha256, size=size, paths=sorted(paths))
+            for (sha256, size), paths in by_hash.items()
+            if len(paths) > 1
+        ]
+
+    def deduplicate(self, groups):
+        """Replace every copy in the groups with links to a single blob, returning the bytes freed"""
+        freed = 0
+        for group in groups:
+            for path in group.paths:
+                self.adopt(path, group.sha256)
+            freed += group.wasted_bytes
+        return freed
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_model_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ModelStore()
+        return _store
@@ -0,0 +1,116 @@
+import fnmatch
+import os
+import re
+import threading
+import time
+
+from utils.hf_download import list_remote_files
+
+HF_REPO_INDEX_TTL = float(os.getenv("HF_REPO_INDEX_TTL", "600"))
+HF_REPO_INDEX_MAX = int(os.getenv("HF_REPO_INDEX_MAX", "64"))
+# Failed lookups (typos, private repos, a half-typed id) are remembered this long before asking the Hub again
+HF_REPO_INDEX_ERROR_TTL = float(os.getenv("HF_REPO_INDEX_ERROR_TTL", "60"))
+# GGUF quantization tags such as Q4_K_M, Q8_0, IQ3_XXS, F16 or BF16
+_QUANT_RE = re.compile(r"(?<![A-Za-z0-9])(I?Q\d(?:_[A-Z0-9]+)*|BF16|F16|F32)(?=[.\-]|$)", re.IGNORECASE)
+_SHARD_RE = re.compile(r"-(\d{5})-of-(\d{5})\.gguf$", re.IGNORECASE)
+
+
+def parse_quant(filename):
+    """Return the quantization tag of a GGUF file name, or None"""
+    name = os.path.basename(filename)
+    if not name.lower().endswith(".gguf"):
+        return None
+    name = _SHARD_RE.sub(".gguf", name)
+    matches = _QUANT_RE.findall(name)
+    return matches[-1].upper() if matches else None
+
+
+class RepoIndex:
+    """File listing of one repository revision with sizes, LFS hashes and quant tags"""
+
+    def __init__(self, repo_id, revision, files):
+        self.repo_id = repo_id
+        self.revision = revision
+        self.files = files
+        self.quants = {remote.path: parse_quant(remote.path) for remote in files}
+        self.fetched_at = time.monotonic()
+
+    @property
+    def paths(self):
+        return [remote.path for remote in self.files]
+
+    @property
+    def available_quants(self):
+        return sorted({quant for quant in self.quants.values() if quant})
+
+    def filter(self, pattern=None, quant=None):
+        """Return files matching a glob (e.g. '*Q4_K_M*.gguf') and/or quant tag"""
+        matched = []
+        for remote in self.files:
+            if pattern and not fnmatch.fnmatch(remote.path, pattern) and not fnmatch.fnmatch(
+                os.path.basename(remote.path), pattern
+            ):
+                continue
+            if quant and self.quants.get(remote.path) != quant:
+                continue
+            matched.append(remote)
+        return matched
+
+    @staticmethod
+    def total_size(files):
+        return sum(remote.size or 0 for remote in files)
+
+
+class RepoIndexCache:
+    """TTL cache of repository indexes keyed by (repo id, revision)
+
+    Errors are cached too, for error_ttl seconds, so reruns with a bad repo
+    id re-raise the same error instead of hitting the Hub again.
+    """
+
+    def __init__(self, ttl=HF_REPO_INDEX_TTL, max_entries=HF_REPO_INDEX_MAX, error_ttl=HF_REPO_INDEX_ERROR_TTL):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.error_ttl = error_ttl
+        self._indexes = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def get(self, repo_id, revision=None, refresh=False):
+        key = (repo_id, revision or "main")
+        now = time.monotonic()
+        with self._lock:
+            index = self._indexes.get(key)
+            error = self._errors.get(key)
+        if not refresh:
+            if index is not None and now - index.fetched_at < self.ttl:
+                return index
+            if error is not None and now - error[1] < self.error_ttl:
+                raise error[0]
+        try:
+            index = RepoIndex(repo_id, key[1], list_remote_files(repo_id, revision=revision))
+        except Exception as e:
+            with self._lock:
+                self._errors[key] = (e, time.monotonic())
+                if len(self._errors) > self.max_entries:
+                    del self._errors[min(self._errors, key=lambda k: self._errors[k][1])]
+            raise
+        with self._lock:
+            self._errors.pop(key, None)
+            self._indexes[key] = index
+            if len(self._indexes) > self.max_entries:
+                oldest = min(self._indexes, key=lambda k: self._indexes[k].fetched_at)
+                del self._indexes[oldest]
+        return index
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_repo_index_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RepoIndexCache()
+        return _cache
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+from array import array
+
+from utils.container_inventory import get_inventory
+from utils.container_metrics import METRIC_FIELDS, ContainerMetrics
+from utils.docker_client import get_client
+
+STATS_HISTORY_SECONDS = int(os.getenv("STATS_HISTORY_SECONDS", "600"))
+STATS_SYNC_INTERVAL = float(os.getenv("STATS_SYNC_INTERVAL", "5"))
+
+
+class StatsSeries:
+    """Fixed-size ring buffer of stats samples for one container
+
+    Each field is kept in its own array of doubles so memory stays
+    constant no matter how long the collector runs.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = array("d", [0.0]) * capacity
+        self.fields = {name: array("d", [0.0]) * capacity for name in METRIC_FIELDS}
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, metrics):
+        with self._lock:
+            self.timestamps[self._next] = metrics.timestamp
+            for name, buffer in self.fields.items():
+                buffer[self._next] = getattr(metrics, name)
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def _ordered(self, buffer):
+        start = (self._next - self._count) % self.capacity
+        if start + self._count <= self.capacity:
+            return buffer[start:start + self._count].tolist()
+        return buffer[start:].tolist() + buffer[:self._next].tolist()
+
+    def history(self, field):
+        """Return the buffered values of one field, oldest first"""
+        with self._lock:
+            return self._ordered(self.fields[field])
+
+    def latest(self):
+        """Return the newest sample (None if nothing was collected yet)"""
+        with self._lock:
+            if not self._count:
+                return None
+            index = (self._next - 1) % self.capacity
+            return ContainerMetrics(
+                timestamp=self.timestamps[index],
+                **{name: buffer[index] for name, buffer in self.fields.items()},
+            )
+
+
+class StatsCollector:
+    """Background collector that follows the streaming stats endpoint of every running container"""
+
+    def __init__(self, client=None, inventory=None, history_seconds=STATS_HISTORY_SECONDS,
+                 sync_interval=STATS_SYNC_INTERVAL):
+        self.client = client or get_client()
+        self.inventory = inventory or get_inventory()
+        # The daemon emits roughly one stats sample per second per container
+        self.capacity = max(1, int(history_seconds))
+        self.sync_interval = sync_interval
+        self._series = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stats-collector", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync(self.inventory.get().running)
+            except Exception:
+                # Docker may be temporarily unreachable; try again on the next tick
+                pass
+            self._stop.wait(self.sync_interval)
+
+    def sync(self, running_containers):
+        """Start streams for newly running containers and drop series of removed ones"""
+        running_ids = {c.get("ID") for c in running_containers if c.get("ID")}
+        with self._lock:
+            for container_id in running_ids:
+                thread = self._streams.get(container_id)
+                if thread is None or not thread.is_alive():
+                    self._series.setdefault(container_id, StatsSeries(self.capacity))
+                    thread = threading.Thread(
+                        target=self._follow, args=(container_id,),
+                        name=f"stats-{container_id}", daemon=True,
+                    )
+                    self._streams[container_id] = thread
+                    thread.start()
+            for container_id in list(self._series):
+                if container_id not in running_ids and not self._streams[container_id].is_alive():
+                    del self._series[container_id]
+                    del self._streams[container_id]
+
+    def _follow(self, container_id):
+        series = self._series[container_id]
+        try:
+            for line in self.client.stream("GET", f"/containers/{container_id}/stats", {"stream": 1}, timeout=30):
+                if self._stop.is_set():
+                    return
+                line = line.strip()
+                if line:
+                    series.append(ContainerMetrics.from_stats(json.loads(line), time.time()))
+        except Exception:
+            # Stream ends when the container stops; the next sync restarts it if needed
+            pass
+
+    def series(self, container_id):
+        return self._series.get(container_id)
+
+    def latest(self, container_id):
+        series = self._series.get(container_id)
+        return series.latest() if series else None
+
+    def snapshot(self):
+        """Return the latest metrics of every tracked container keyed by container ID"""
+        return {container_id: series.latest() for container_id, series in list(self._series.items())}
+
+
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def get_stats_collector():
+    """Return the process-wide stats collector, starting it on first use"""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = StatsCollector()
+        _collector.start()
+        return _collector
@@ -0,0 +1,217 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+from array import array
+from dataclasses import dataclass
+
+TOKEN_BATCH_SIZE = int(os.getenv("TOKEN_BATCH_SIZE", "256"))
+TOKEN_BATCH_THREADS = int(os.getenv("TOKEN_BATCH_THREADS", str(os.cpu_count() or 1)))
+# Rows kept in memory for the on-screen table; the full table goes to a spooled CSV
+TOKEN_TABLE_PREVIEW_ROWS = int(os.getenv("TOKEN_TABLE_PREVIEW_ROWS", "1000"))
+# Larger per-document tables are not offered as a browser download; the file stays on the server
+TOKEN_EXPORT_MAX_BYTES = int(os.getenv("TOKEN_EXPORT_MAX_BYTES", str(64 * 1024 * 1024)))
+# Tables of sessions that closed without counting again are deleted once they are this old
+TOKEN_TABLE_TTL = int(os.getenv("TOKEN_TABLE_TTL", str(24 * 60 * 60)))
+TABLE_PREFIX = "token_counts_"
+PERCENTILES = (50, 90, 95, 99)
+
+csv.field_size_limit(2 ** 31 - 1)
+
+
+@dataclass(slots=True)
+class TokenCount:
+    """Token count of one document"""
+
+    name: str
+    characters: int
+    tokens: int
+
+
+def _text_stream(binary):
+    return io.TextIOWrapper(binary, encoding="utf-8", errors="replace", newline="")
+
+
+def _field_text(value):
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def _iter_jsonl(name, binary, text_column):
+    for line_number, line in enumerate(_text_stream(binary), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield f"{name}:{line_number}", line
+            continue
+        if isinstance(record, dict) and text_column:
+            yield f"{name}:{line_number}", _field_text(record.get(text_column))
+        else:
+            yield f"{name}:{line_number}", _field_text(record)
+
+
+def _iter_csv(name, binary, text_column):
+    reader = csv.DictReader(_text_stream(binary))
+    if text_column not in (reader.fieldnames or []):
+        raise ValueError(f"{name} has no column '{text_column}' (columns: {', '.join(reader.fieldnames or [])})")
+    for row_number, row in enumerate(reader, start=1):
+        yield f"{name}:{row_number}", row.get(text_column) or ""
+
+
+def iter_documents(name, binary, text_column="text"):
+    """Yield (document name, text) pairs from an uploaded file
+
+    JSONL and CSV files yield one document per row (taken from text_column),
+    zip archives are walked member by member, and anything else is one
+    document. Rows are read as a stream, so large files never sit in memory whole.
+    """
+    lower = name.lower()
+    if lower.endswith(".zip"):
+        with zipfile.ZipFile(binary) as archive:
+            for member in archive.infolist():
+                if member.is_dir() or os.path.basename(member.filename).startswith("."):
+                    continue
+                with archive.open(member) as member_file:
+                    yield from iter_documents(f"{name}/{member.filename}", member_file, text_column)
+    elif lower.endswith(".jsonl"):
+        yield from _iter_jsonl(name, binary, text_column)
+    elif lower.endswith(".csv"):
+        yield from _iter_csv(name, binary, text_column)
+    else:
+        yield name, binary.read().decode("utf-8", errors="replace")
+
+
+def _nearest_rank(ordered, percent):
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[rank - 1]
+
+
+def _batches(documents, batch_size):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class TokenStats:
+    """Running aggregate of per-document token counts
+
+    Only one integer per document is kept (for the percentiles), plus a
+    preview of the first rows; the full per-document table is written to a
+    temporary CSV file on disk (table_path) for export, which outlives
+    close() until discard() removes it. Starting a new table also sweeps
+    away tables older than TOKEN_TABLE_TTL.
+    """
+
+    def __init__(self, preview_rows=TOKEN_TABLE_PREVIEW_ROWS):
+        self.counts = array("q")
+        self.total_tokens = 0
+        self.total_characters = 0
+        self.preview = []
+        self.preview_rows = preview_rows
+        sweep_tables()
+        self._table = tempfile.NamedTemporaryFile(mode="w+", newline="", prefix=TABLE_PREFIX, suffix=".csv",
+                                                  delete=False)
+        self.table_path = self._table.name
+        self._writer = csv.writer(self._table)
+        self._writer.writerow(["document", "characters", "tokens"])
+
+    def add(self, result):
+        self.counts.append(result.tokens)
+        self.total_tokens += result.tokens
+        self.total_characters += result.characters
+        if len(self.preview) < self.preview_rows:
+            self.preview.append(result)
+        self._writer.writerow([result.name, result.characters, result.tokens])
+
+    @property
+    def documents(self):
+        return len(self.counts)
+
+    def summary(self):
+        ordered = sorted(self.counts)
+        if not ordered:
+            return {"documents": 0, "total_tokens": 0}
+        summary = {
+            "documents": len(ordered),
+            "total_tokens": self.total_tokens,
+            "total_characters": self.total_characters,
+            "mean": round(self.total_tokens / len(ordered), 1),
+            "min": ordered[0],
+            "max": ordered[-1],
+        }
+        for percent in PERCENTILES:
+            summary[f"p{percent}"] = _nearest_rank(ordered, percent)
+        return summary
+
+    def table_csv(self):
+        """The full per-document table as CSV text"""
+        self._table.flush()
+        self._table.seek(0)
+        data = self._table.read()
+        self._table.seek(0, io.SEEK_END)
+        return data
+
+    def close(self):
+        self._table.close()
+
+    def discard(self):
+        """Close and delete the exported table"""
+        self.close()
+        remove_table(self.table_path)
+
+
+def remove_table(path):
+    try:
+        os.remove(path)
+    except (OSError, TypeError):
+        pass
+
+
+def sweep_tables(max_age=TOKEN_TABLE_TTL, directory=None):
+    """Delete exported tables last written more than max_age seconds ago, returning how many were removed"""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        with os.scandir(directory or tempfile.gettempdir()) as entries:
+            for entry in entries:
+                if not (entry.name.startswith(TABLE_PREFIX) and entry.name.endswith(".csv")):
+                    continue
+                try:
+                    if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return removed
+
+
+def count_tokens(encoding, documents, stats=None, clean_newlines=True, batch_size=TOKEN_BATCH_SIZE,
+                 num_threads=TOKEN_BATCH_THREADS):
+    """Tokenize (name, text) documents in batches and add their counts to stats
+
+    tiktoken encodes each batch on its own native thread pool with the GIL
+    released. Yields the running stats after every batch so callers can show
+    progress.
+    """
+    stats = stats or TokenStats()
+    for batch in _batches(documents, batch_size):
+        texts = [text.replace("\n", " ") if clean_newlines else text for _, text in batch]
+        # Special-token strings inside documents count as plain text instead of raising
+        encoded = encoding.encode_batch(texts, num_threads=num_threads, disallowed_special=())
+        for (name, text), tokens in zip(batch, encoded):
+            stats.add(TokenCount(name=name, characters=len(text), tokens=len(tokens)))
+        yield stats
@@ -0,0 +1,237 @@
+import base64
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.incremental_tokens import get_token_counter
+
+TOKENIZER_POOL_SIZE = int(os.getenv("TOKENIZER_POOL_SIZE", "8"))
+TOKENIZER_LOAD_WORKERS = int(os.getenv("TOKENIZER_LOAD_WORKERS", "4"))
+TOKENIZER_CACHE_DIR = os.getenv(
+    "TOKENIZER_CACHE_DIR",
+    os.path.join(os.getenv("MODELS_PATH") or "./models", ".tokenizers"),
+)
+# Comma separated model names loaded in the background when the app starts
+TOKENIZER_PREWARM = os.getenv("TOKENIZER_PREWARM", "")
+
+
+def _cache_paths(model_name, cache_dir):
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "--", model_name.strip("/"))
+    base = os.path.join(cache_dir, slug)
+    return f"{base}.json", f"{base}.tiktoken"
+
+
+def save_cached_tokenizer(model_name, encoding, cache_dir=TOKENIZER_CACHE_DIR, source=""):
+    """Write a converted encoding as '<model>.tiktoken' ranks plus a '<model>.json' header
+
+    Returns False without writing anything when the encoding does not
+    expose what is needed, e.g. after a tiktoken upgrade.
+    """
+    try:
+        # tiktoken has no public accessor for these; requirements.txt pins a version that has them
+        mergeable_ranks, pat_str, special_tokens = (
+            dict(encoding._mergeable_ranks), encoding._pat_str, dict(encoding._special_tokens)
+        )
+    except (AttributeError, TypeError, ValueError):
+        return False
+    meta_path, ranks_path = _cache_paths(model_name, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(f"{ranks_path}.tmp", "wb") as f:
+        for token, rank in sorted(mergeable_ranks.items(), key=lambda item: item[1]):
+            f.write(base64.b64encode(token) + b" " + str(rank).encode() + b"\n")
+    with open(f"{meta_path}.tmp", "w") as f:
+        json.dump({
+            "model": model_name,
+            "name": encoding.name,
+            "pat_str": pat_str,
+            "special_tokens": special_tokens,
+            "source": source,
+        }, f)
+    # The header goes last, so a cache entry only counts once its ranks are complete
+    os.replace(f"{ranks_path}.tmp", ranks_path)
+    os.replace(f"{meta_path}.tmp", meta_path)
+    return True
+
+
+def load_cached_tokenizer(model_name, cache_dir=TOKENIZER_CACHE_DIR):
+    """Return the encoding saved for a model, or None when it is not cached"""
+    import tiktoken
+
+    meta_path, ranks_path = _cache_paths(model_name, cache_dir)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(ranks_path, "rb") as f:
+            ranks = {
+                base64.b64decode(token): int(rank)
+                for token, rank in (line.split() for line in f if line.strip())
+            }
+        # An entry written by another tiktoken version falls back to converting the tokenizer again
+        return tiktoken.Encoding(
+            meta["name"], pat_str=meta["pat_str"], mergeable_ranks=ranks, special_tokens=meta["special_tokens"]
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def cached_tokenizers(cache_dir=TOKENIZER_CACHE_DIR):
+    """Model names with a converted tokenizer on disk"""
+    models = []
+    try:
+        names = sorted(os.listdir(cache_dir))
+    except OSError:
+        return models
+    for name in names:
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(cache_dir, name)) as f:
+                    models.append(json.load(f)["model"])
+            except (OSError, ValueError, KeyError):
+                continue
+    return models
+
+
+def find_local_tokenizer(model_name, models_dir=None):
+    """Return a folder with the model's tokenizer.json (a path, or a downloaded repo under MODELS_PATH)"""
+    models_dir = models_dir or os.getenv("MODELS_PATH") or "./models"
+    for candidate in (model_name, os.path.join(models_dir, model_name)):
+        if all(os.path.isfile(os.path.join(candidate, name)) for name in ("tokenizer.json", "tokenizer_config.json")):
+            return candidate
+    return None
+
+
+def load_tokenizer(model_name):
+    """Load a tokenizer from the disk cache, a local model folder or the Hub, in that order
+
+    Whatever had to be converted is written to the disk cache, so later
+    loads need neither the network nor the conversion.
+    """
+    encoding = load_cached_tokenizer(model_name)
+    if encoding is not None:
+        return encoding
+
+    from autotiktokenizer import AutoTikTokenizer
+
+    source = find_local_tokenizer(model_name)
+    encoding = AutoTikTokenizer.from_pretrained(source or model_name)
+    try:
+        save_cached_tokenizer(model_name, encoding, source=source or "hub")
+    except OSError:
+        # A read-only cache only costs us the next cold start
+        pass
+    return encoding
+
+
+def parse_model_names(value):
+    """Split model names entered one per line or comma separated, dropping duplicates"""
+    names = []
+    for part in value.replace(",", "\n").splitlines():
+        name = part.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+class TokenizerPool:
+    """Process-wide LRU cache of tokenizers shared by every session
+
+    Each tokenizer is loaded once even when several sessions ask for it at
+    the same time, and the least recently used one is dropped once more
+    than max_size are held.
+    """
+
+    def __init__(self, max_size=TOKENIZER_POOL_SIZE, loader=load_tokenizer):
+        self.max_size = max(1, max_size)
+        self.loader = loader
+        self._tokenizers = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name):
+        while True:
+            with self._lock:
+                if model_name in self._tokenizers:
+                    self._tokenizers.move_to_end(model_name)
+                    return self._tokenizers[model_name]
+                event = self._loading.get(model_name)
+                if event is None:
+                    event = self._loading[model_name] = threading.Event()
+                    break
+            # Someone else is loading it; take theirs, or try ourselves if their load failed
+            event.wait()
+        try:
+            tokenizer = self.loader(model_name)
+            with self._lock:
+                self._tokenizers[model_name] = tokenizer
+                while len(self._tokenizers) > self.max_size:
+                    self._tokenizers.popitem(last=False)
+            return tokenizer
+        finally:
+            with self._lock:
+                del self._loading[model_name]
+            event.set()
+
+    def get_many(self, model_names, max_workers=TOKENIZER_LOAD_WORKERS):
+        """Load several tokenizers concurrently, returning {model name: tokenizer or exception}"""
+        def load(model_name):
+            try:
+                return self.get(model_name)
+            except Exception as e:
+                return e
+
+        if not model_names:
+            return {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(model_names)))) as executor:
+            return dict(zip(model_names, executor.map(load, model_names)))
+
+    @property
+    def loaded(self):
+        with self._lock:
+            return list(self._tokenizers)
+
+
+def compare_token_counts(model_names, text, pool=None):
+    """Count the tokens of one text with several models, returning one row per model"""
+    pool = pool or get_tokenizer_pool()
+    tokenizers = pool.get_many(model_names)
+    rows = []
+    for model_name in model_names:
+        tokenizer = tokenizers[model_name]
+        if isinstance(tokenizer, Exception):
+            rows.append({"model": model_name, "tokens": None, "error": str(tokenizer)})
+            continue
+        tokens = get_token_counter().count(model_name, tokenizer, text, clean_newlines=False).tokens
+        rows.append({"model": model_name, "tokens": tokens, "error": ""})
+    return rows
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_tokenizer_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = TokenizerPool()
+        return _pool
+
+
+_prewarm_thread = None
+
+
+def prewarm_tokenizers(model_names=None):
+    """Load the configured tokenizers into the pool on a background thread, once per process"""
+    global _prewarm_thread
+    model_names = parse_model_names(TOKENIZER_PREWARM) if model_names is None else model_names
+    with _pool_lock:
+        if _prewarm_thread is not None or not model_names:
+            return _prewarm_thread
+        _prewarm_thread = threading.Thread(
+            target=lambda: get_tokenizer_pool().get_many(model_names), name="tokenizer-prewarm", daemon=True
+        )
+        _prewarm_thread.start()
+        return _prewarm_thread
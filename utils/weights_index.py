@@ -0,0 +1,260 @@
+import os
+import threading
+from dataclasses import dataclass, field
+
+from utils.config_validation import REMOTE_MODEL_PREFIXES
+from utils.gguf import split_paths
+from utils.model_configs import MODELS_PATH
+from utils.model_store import get_model_store
+
+WEIGHT_EXTENSIONS = (".gguf", ".ggml", ".bin", ".safetensors", ".pt", ".pth", ".onnx")
+
+
+@dataclass(slots=True)
+class WeightFile:
+    """A weight file under the models directory and the configs that use it"""
+
+    path: str
+    size: int
+    mtime: float
+    inode: tuple
+    nlink: int = 1
+    symlink: bool = False
+    configs: list = field(default_factory=list)
+
+    @property
+    def orphaned(self):
+        return not self.configs
+
+
+@dataclass(slots=True)
+class ConfigLink:
+    """One file reference of a config, resolved against the models directory"""
+
+    config: str
+    model: str
+    reference: str
+    paths: list = field(default_factory=list)
+    size: int = 0
+    remote: bool = False
+
+    @property
+    def dangling(self):
+        return not self.remote and not self.paths
+
+
+@dataclass(slots=True)
+class WeightsReport:
+    """Cross-index of configs and weight files"""
+
+    weights: list = field(default_factory=list)
+    links: list = field(default_factory=list)
+    # (config file, error) of configs that could not be read; the files they use are unknown
+    broken: list = field(default_factory=list)
+    reclaimable_bytes: int = 0
+    stats_reused: int = 0
+    stats_taken: int = 0
+
+    @property
+    def orphans(self):
+        return [weight for weight in self.weights if weight.orphaned]
+
+    @property
+    def dangling(self):
+        return [link for link in self.links if link.dangling]
+
+    @property
+    def cleanup_blocked(self):
+        """An unreadable config may use any of the orphans, so none of them may be deleted"""
+        return bool(self.broken)
+
+
+class WeightsIndex:
+    """Incremental index of the weight files in a models directory
+
+    Directory listings and the stat results of their entries are cached
+    with the directory's mtime; a directory whose mtime did not change is
+    not listed or stat-ed again. Renames, downloads and deletions all
+    change the mtime, so only directories that saw such a change are
+    rescanned. Hidden directories (the blob store, tokenizer cache,
+    backups) are skipped.
+    """
+
+    def __init__(self, models_dir=MODELS_PATH):
+        self.models_dir = models_dir
+        self._dirs = {}
+        self._lock = threading.Lock()
+
+    def _list_dir(self, path, counters):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return []
+        cached = self._dirs.get(path)
+        if cached and cached[0] == mtime:
+            counters[0] += len(cached[1])
+            return cached[1]
+        entries = []
+        try:
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    if entry.name.startswith("."):
+                        continue
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        size = stat.st_size
+                        if entry.is_symlink():
+                            # Size of what the link points at, e.g. a Hugging Face snapshot blob
+                            size = os.stat(entry.path).st_size
+                    except OSError:
+                        continue
+                    entries.append((entry.name, is_dir, entry.is_symlink(), size, stat.st_mtime,
+                                    (stat.st_dev, stat.st_ino), stat.st_nlink))
+        except OSError:
+            return []
+        counters[1] += len(entries)
+        self._dirs[path] = (mtime, entries)
+        return entries
+
+    def scan(self):
+        """Return ({relative path: WeightFile}, stats reused, stats taken)"""
+        weights = {}
+        counters = [0, 0]
+        seen = set()
+        with self._lock:
+            pending = [self.models_dir]
+            while pending:
+                directory = pending.pop()
+                seen.add(directory)
+                for name, is_dir, symlink, size, mtime, inode, nlink in self._list_dir(directory, counters):
+                    path = os.path.join(directory, name)
+                    if is_dir:
+                        pending.append(path)
+                    elif name.lower().endswith(WEIGHT_EXTENSIONS):
+                        relative = os.path.relpath(path, self.models_dir)
+                        weights[relative] = WeightFile(relative, size, mtime, inode, nlink, symlink)
+            for stale in set(self._dirs) - seen:
+                del self._dirs[stale]
+        return weights, counters[0], counters[1]
+
+    def _resolve(self, reference, weights):
+        """Weight files a reference names: the file, all parts of a split GGUF, or everything under a directory"""
+        path = os.path.normpath(os.path.join(self.models_dir, reference))
+        relative = os.path.relpath(path, self.models_dir)
+        if os.path.isdir(path):
+            prefix = relative + os.sep
+            return [key for key in weights if key.startswith(prefix)]
+        paths = [os.path.relpath(part, self.models_dir) for part in split_paths(path)]
+        return [part for part in paths if part in weights or os.path.isfile(os.path.join(self.models_dir, part))]
+
+    def report(self, summaries):
+        """Link the references of config summaries (from the config catalog) to the scanned weight files"""
+        weights, reused, taken = self.scan()
+        report = WeightsReport(stats_reused=reused, stats_taken=taken)
+        # Symlinked files count as used when the config points at their target instead
+        by_realpath = {}
+        for weight in weights.values():
+            by_realpath.setdefault(os.path.realpath(os.path.join(self.models_dir, weight.path)), []).append(weight)
+
+        for summary in summaries:
+            if summary.error:
+                report.broken.append((summary.file, summary.error))
+            for model, reference in summary.references:
+                link = ConfigLink(summary.file, model, reference)
+                report.links.append(link)
+                if reference.startswith(REMOTE_MODEL_PREFIXES):
+                    link.remote = True
+                    continue
+                link.paths = self._resolve(reference, weights)
+                for path in link.paths:
+                    weight = weights.get(path)
+                    link.size += weight.size if weight else os.path.getsize(os.path.join(self.models_dir, path))
+                    targets = by_realpath.get(os.path.realpath(os.path.join(self.models_dir, path)), [])
+                    for target in targets + ([weight] if weight and weight not in targets else []):
+                        if summary.file not in target.configs:
+                            target.configs.append(summary.file)
+
+        report.weights = sorted(weights.values(), key=lambda weight: weight.path)
+        if not report.cleanup_blocked:
+            report.reclaimable_bytes = self.reclaimable(report.orphans, weights.values())
+        return report
+
+    @staticmethod
+    def _store_inodes():
+        store = get_model_store()
+        inodes = set()
+        try:
+            with os.scandir(store.blob_dir) as iterator:
+                for entry in iterator:
+                    stat = entry.stat(follow_symlinks=False)
+                    inodes.add((stat.st_dev, stat.st_ino))
+        except OSError:
+            pass
+        return inodes
+
+    def reclaimable(self, orphans, weights):
+        """Bytes freed by deleting orphans: a hard-linked file only frees space once every other link is gone too
+
+        Links into the model store count as gone, because prune() removes
+        blobs nothing else links to. Deleting a symlink frees nothing.
+        """
+        store_inodes = self._store_inodes()
+        used_inodes = {weight.inode for weight in weights if not weight.orphaned}
+        orphan_links = {}
+        for weight in orphans:
+            if not weight.symlink:
+                orphan_links.setdefault(weight.inode, []).append(weight)
+        freed = 0
+        for inode, links in orphan_links.items():
+            if inode in used_inodes:
+                continue
+            if len(links) + (inode in store_inodes) >= links[0].nlink:
+                freed += links[0].size
+        return freed
+
+    def delete(self, paths, report):
+        """Delete orphaned weight files and empty directories left behind, then prune unused blobs
+
+        Only paths that are still orphans in report are touched, and nothing
+        is while a config can't be read. Returns (deleted paths,
+        {path: error}, bytes freed by pruning the store).
+        """
+        if report.cleanup_blocked:
+            files = ", ".join(file for file, _ in report.broken)
+            return [], {path: f"Not deleted while these configs can't be read: {files}" for path in paths}, 0
+        orphans = {weight.path for weight in report.orphans}
+        deleted, errors = [], {}
+        root = os.path.abspath(self.models_dir)
+        for path in paths:
+            if path not in orphans:
+                errors[path] = "Not an orphaned weight file"
+                continue
+            full_path = os.path.abspath(os.path.join(root, path))
+            if os.path.commonpath([root, full_path]) != root:
+                errors[path] = "Outside the models directory"
+                continue
+            try:
+                os.remove(full_path)
+            except OSError as e:
+                errors[path] = str(e)
+                continue
+            deleted.append(path)
+            directory = os.path.dirname(full_path)
+            while directory != root and not os.listdir(directory):
+                os.rmdir(directory)
+                directory = os.path.dirname(directory)
+        freed = get_model_store().prune(self.models_dir) if deleted else 0
+        return deleted, errors, freed
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_weights_index(models_dir=MODELS_PATH):
+    with _indexes_lock:
+        index = _indexes.get(models_dir)
+        if index is None:
+            index = _indexes[models_dir] = WeightsIndex(models_dir)
+        return index